@@ -0,0 +1,361 @@
+import asyncio
+import logging
+import math
+import os
+import time
+import weakref
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+from metrics import Counter, Gauge, Histogram
+
+log = logging.getLogger("autoflights.admission")
+
+_controllers: "weakref.WeakSet[AdmissionController]" = weakref.WeakSet()
+
+
+def _state():
+    for ctl in list(_controllers):
+        yield {"state": "active"}, ctl.active
+        yield {"state": "queued"}, ctl.queued
+
+
+def _rss():
+    for ctl in list(_controllers):
+        yield {}, ctl.browser_rss
+
+
+ADMISSION_WAIT = Histogram("autoflights_admission_wait_seconds", "Time scrapes waited for admission.", ["outcome"])
+ADMISSION_REJECTED = Counter("autoflights_admission_rejected_total", "Scrapes turned away with 429 by reason.", ["reason"])
+Gauge("autoflights_admission_scrapes", "Scrapes holding or waiting for a browser slot.", ["state"], collect=_state)
+Gauge("autoflights_browser_rss_bytes", "Resident memory of the browser processes under the API.", collect=_rss)
+
+
+def process_tree_rss(pid: Optional[int] = None, include_self: bool = False) -> int:
+    """
+    Resident memory in bytes of every descendant of `pid` (this process by
+    default), read from /proc. Playwright's driver and the Chromium processes
+    it spawns are all descendants of the API. Returns 0 where /proc is missing.
+    """
+    root = pid or os.getpid()
+    try:
+        entries = [int(e) for e in os.listdir("/proc") if e.isdigit()]
+        page = os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+    children, rss = defaultdict(list), {}
+    for p in entries:
+        try:
+            with open(f"/proc/{p}/stat", encoding="utf-8", errors="replace") as f:
+                # The command name may contain spaces; fields resume after its ')'
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{p}/statm", encoding="utf-8") as f:
+                rss[p] = int(f.read().split()[1]) * page
+        except (OSError, ValueError, IndexError):
+            continue
+        children[ppid].append(p)
+    total = rss.get(root, 0) if include_self else 0
+    stack = list(children.get(root, ()))
+    while stack:
+        p = stack.pop()
+        total += rss.get(p, 0)
+        stack.extend(children.get(p, ()))
+    return total
+
+
+def _default_memory_budget() -> int:
+    """Half of the host's memory, or 0 (no limit) where /proc/meminfo is missing."""
+    try:
+        with open("/proc/meminfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) * 1024 // 2
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+class Overloaded(Exception):
+    """Raised when a scrape cannot even be queued; carries a Retry-After hint in seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Too many scrapes in progress ({reason}); retry in {retry_after}s.")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    """One caller's place in line for a browser slot."""
+
+    def __init__(self, client: str, future: asyncio.Future):
+        self.client = client
+        self.future = future
+        self.created_at = time.perf_counter()
+        # Set once the slot is taken by slot() or handed back by release()
+        self.settled = False
+
+
+class Reservation:
+    """
+    A caller's claim on browser slots, entered (`async with reservation.slot():`)
+    only around the code that actually drives a browser, i.e. after a cache
+    miss. A ticket reserved up front serves the first slot; later or
+    ticketless entries queue on the spot. Tracks how long it spent waiting,
+    so job deadlines can leave that out.
+    """
+
+    def __init__(self, controller: "AdmissionController", client: str, ticket: Optional[_Ticket] = None):
+        self.controller = controller
+        self.client = client
+        self.ticket = ticket
+        self._waiting = 0
+        self._waiting_since = 0.0
+        self._waited = 0.0
+
+    def waited(self) -> float:
+        """Seconds spent waiting for a slot so far, including a wait in progress."""
+        if self._waiting:
+            return self._waited + time.monotonic() - self._waiting_since
+        return self._waited
+
+    @asynccontextmanager
+    async def slot(self):
+        # A ticket is good for one slot
+        ticket, self.ticket = self.ticket, None
+        if not self._waiting:
+            self._waiting_since = time.monotonic()
+        self._waiting += 1
+        waiting = True
+        try:
+            async with self.controller.slot(self.client, ticket):
+                self._stop_waiting()
+                waiting = False
+                yield
+        finally:
+            if waiting:
+                self._stop_waiting()
+
+    def _stop_waiting(self) -> bool:
+        self._waiting -= 1
+        if not self._waiting:
+            self._waited += time.monotonic() - self._waiting_since
+
+    def release(self):
+        """Hand back the up-front ticket if no slot used it; safe to call any number of times."""
+        ticket, self.ticket = self.ticket, None
+        if ticket is not None:
+            self.controller.release(ticket)
+
+
+class AdmissionController:
+    """
+    Bounds how many scrapes hold a browser at once, by count and by measured
+    browser memory. Work beyond that waits in a bounded queue; past
+    `max_queue` (or `max_per_client` for a single caller) it is rejected with
+    a Retry-After hint instead of piling up. Waiting scrapes are admitted
+    round-robin across clients, so one caller's burst only delays its own.
+
+    Memory is the RSS of the browser processes under the API, sampled every
+    `sample_interval` seconds. From it the controller learns how much one
+    running scrape adds on top of the idle pool and only admits another when
+    that still fits in `memory_mb`. One scrape is always allowed to run.
+    """
+
+    def __init__(
+        self,
+        max_active: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_per_client: Optional[int] = None,
+        memory_mb: Optional[int] = None,
+        scrape_mb: Optional[int] = None,
+        sample_interval: Optional[float] = None,
+    ):
+        self.max_active = max_active or int(os.getenv("SCRAPE_CONCURRENCY", "2"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("ADMISSION_QUEUE_DEPTH", "20"))
+        self.max_per_client = max_per_client or int(os.getenv("ADMISSION_CLIENT_QUEUE", str(max(1, self.max_queue // 4))))
+        budget_mb = memory_mb if memory_mb is not None else int(os.getenv("ADMISSION_MEMORY_MB", "0"))
+        self.memory_budget = budget_mb * 1024 * 1024 or _default_memory_budget()
+        # Starting estimate for one scrape's memory, refined from samples
+        self.scrape_bytes = float((scrape_mb or int(os.getenv("ADMISSION_SCRAPE_MB", "300"))) * 1024 * 1024)
+        self.sample_interval = sample_interval or float(os.getenv("ADMISSION_SAMPLE_INTERVAL", "2"))
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.browser_rss = 0
+        self.idle_rss: Optional[int] = None
+        # Seconds a scrape holds its slot, for Retry-After
+        self.hold_seconds = 30.0
+        # client -> its waiting tickets; rotated for round-robin admission
+        self._waiting: "OrderedDict[str, Deque[_Ticket]]" = OrderedDict()
+        self._sampler: Optional[asyncio.Task] = None
+        _controllers.add(self)
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._waiting.values())
+
+    async def start(self):
+        await self.sample()
+        self._sampler = asyncio.create_task(self._sample_forever())
+        limit = f"{self.memory_budget // 2**20} MB" if self.memory_budget else "no memory limit"
+        log.info(f"Admission control: {self.max_active} active, {self.max_queue} queued, {limit}.")
+
+    async def stop(self):
+        if self._sampler:
+            self._sampler.cancel()
+            await asyncio.gather(self._sampler, return_exceptions=True)
+            self._sampler = None
+        for queue in self._waiting.values():
+            for ticket in queue:
+                ticket.future.cancel()
+        self._waiting.clear()
+
+    def check(self, client: str):
+        """
+        Raise Overloaded if a scrape from `client` could not be queued now,
+        so endpoints can answer 429 before starting any work.
+        """
+        if self._has_room():
+            return
+        if self.queued >= self.max_queue:
+            self._reject("queue_full")
+        if len(self._waiting.get(client, ())) >= self.max_per_client:
+            self._reject("client_queue_full")
+
+    def reserve(self, client: str) -> _Ticket:
+        """
+        Take a place in line for `client` right away, raising Overloaded when
+        it cannot be queued. Endpoints that hand work to a background job
+        reserve in the request handler, so an overload is a 429 rather than a
+        failed job; the job then passes the ticket to slot(), and whoever
+        owns it calls release() if the job ends without using it.
+        """
+        self.check(client)
+        ticket = _Ticket(client, asyncio.get_running_loop().create_future())
+        self._waiting.setdefault(client, deque()).append(ticket)
+        self._dispatch()
+        return ticket
+
+    def reservation(self, client: str, reserve: bool = True) -> Reservation:
+        """
+        A Reservation for `client`; with `reserve`, its ticket is taken now
+        (raising Overloaded), for work that is known to need a browser.
+        """
+        return Reservation(self, client, self.reserve(client) if reserve else None)
+
+    def release(self, ticket: _Ticket):
+        """Hand back a reservation that will not be used; a no-op once slot() took it."""
+        if ticket.settled:
+            return
+        ticket.settled = True
+        self._withdraw(ticket)
+        if not ticket.future.done():
+            ticket.future.cancel()
+
+    @asynccontextmanager
+    async def slot(self, client: str, ticket: Optional[_Ticket] = None):
+        """Wait for a browser slot (or raise Overloaded) and hold it for the block."""
+        ticket = ticket or self.reserve(client)
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            self.release(ticket)
+            ADMISSION_WAIT.observe(time.perf_counter() - ticket.created_at, outcome="cancelled")
+            raise
+        ticket.settled = True
+        started = time.perf_counter()
+        ADMISSION_WAIT.observe(started - ticket.created_at, outcome="admitted")
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.hold_seconds = 0.8 * self.hold_seconds + 0.2 * (time.perf_counter() - started)
+            self._dispatch()
+
+    async def sample(self):
+        """Re-read browser memory, refine the per-scrape estimate and admit what now fits."""
+        self.browser_rss = await asyncio.to_thread(process_tree_rss)
+        if self.active == 0:
+            self.idle_rss = self.browser_rss
+        elif self.idle_rss is not None:
+            per_scrape = (self.browser_rss - self.idle_rss) / self.active
+            if per_scrape > 0:
+                self.scrape_bytes = 0.7 * self.scrape_bytes + 0.3 * per_scrape
+        self._dispatch()
+
+    def retry_after(self) -> int:
+        """Seconds until a new request would likely get a slot."""
+        waves = (self.queued + 1) / max(1, self.max_active)
+        return max(1, math.ceil(self.hold_seconds * waves))
+
+    def stats(self) -> Dict:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "queued_by_client": {c: len(q) for c, q in self._waiting.items()},
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "max_active": self.max_active,
+            "max_queue": self.max_queue,
+            "max_per_client": self.max_per_client,
+            "browser_rss_bytes": self.browser_rss,
+            "idle_rss_bytes": self.idle_rss,
+            "scrape_bytes_estimate": int(self.scrape_bytes),
+            "memory_budget_bytes": self.memory_budget,
+            "retry_after": self.retry_after(),
+        }
+
+    def _has_room(self) -> bool:
+        if self.active == 0:
+            return True
+        if self.active >= self.max_active:
+            return False
+        if not self.memory_budget:
+            return True
+        # Scrapes admitted since the last sample are not in browser_rss yet
+        projected = (self.idle_rss or 0) + (self.active + 1) * self.scrape_bytes
+        return max(projected, self.browser_rss + self.scrape_bytes) <= self.memory_budget
+
+    def _dispatch(self):
+        while self._waiting and self._has_room():
+            # Take the head of the longest-waiting client's queue, then move that client to the back
+            client, queue = next(iter(self._waiting.items()))
+            ticket = queue.popleft()
+            if queue:
+                self._waiting.move_to_end(client)
+            else:
+                del self._waiting[client]
+            if ticket.future.done():
+                continue
+            self.active += 1
+            self.admitted += 1
+            ticket.future.set_result(None)
+
+    def _withdraw(self, ticket: _Ticket):
+        if ticket.future.done() and not ticket.future.cancelled():
+            # Admitted just as it was cancelled; give the slot back
+            self.active -= 1
+            self._dispatch()
+            return
+        queue = self._waiting.get(ticket.client)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._waiting[ticket.client]
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        ADMISSION_REJECTED.inc(reason=reason)
+        retry_after = self.retry_after()
+        log.warning(f"Rejecting scrape: {reason}, retry in {retry_after}s.",
+                    extra={"fields": {"reason": reason, "active": self.active, "queued": self.queued}})
+        raise Overloaded(reason, retry_after)
+
+    async def _sample_forever(self):
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            try:
+                await self.sample()
+            except Exception as e:
+                log.warning(f"Could not sample browser memory: {e}")
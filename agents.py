@@ -2,45 +2,108 @@ from autogen_agentchat.agents import AssistantAgent
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 from autogen_agentchat.messages import TextMessage
 from autogen_core import CancellationToken
-from sidekick_tools import autogen_tools
+from autogen_core.models import SystemMessage, UserMessage
+from sidekick_tools import get_autogen_tools
 from dotenv import load_dotenv
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Optional, Tuple, Union
 import os
+import time
 
+SYSTEM_MESSAGE = (
+    "You are AutoFlights AI — a travel assistant that analyzes real flight data "
+    "from Google Flights (recorded in the AutoFlights price-history store) and summarizes the best deals. "
+)
+SUMMARY_SYSTEM_MESSAGE = SYSTEM_MESSAGE + "Answer directly from the flight table you are given."
 
-class FlightSearchAgent(AssistantAgent):
-    # Autogen agent for summarizing flight data
-    def __init__(self, name="flight_agent"):
-        load_dotenv()
-        api_key = os.getenv("GROQ_API_KEY")
-
-        # Model setup
-        model_info = {
-            "family": "llama3.1",              
-            "function_calling": True,
-            "vision": False,
-            "supports_response_format": True,
-            "json_output": True,
-            "structured_output": True,               
-        }
-
-        # Groq LLaMa 3.1 model
-        model_client = OpenAIChatCompletionClient(
-            model="llama-3.1-8b-instant",
-            api_key=api_key,
-            base_url="https://api.groq.com/openai/v1",
-            model_info=model_info,
-        )
 
+@lru_cache(maxsize=1)
+def get_model_client() -> OpenAIChatCompletionClient:
+    # One Groq client per process, so its HTTP connection pool stays warm
+    load_dotenv()
+    api_key = os.getenv("GROQ_API_KEY")
+
+    # Model setup
+    model_info = {
+        "family": "llama3.1",              
+        "function_calling": True,
+        "vision": False,
+        "supports_response_format": True,
+        "json_output": True,
+        "structured_output": True,               
+    }
+
+    # Groq LLaMa 3.1 model; LLM_BASE_URL points it at any OpenAI-compatible server (e.g. the load-test fake)
+    return OpenAIChatCompletionClient(
+        model=os.getenv("LLM_MODEL", "llama-3.1-8b-instant"),
+        api_key=api_key,
+        base_url=os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1"),
+        model_info=model_info,
+    )
+
+
+async def summarize_flights(user_query: str) -> Tuple[str, Dict]:
+    """
+    Tool-free fast path: exactly one chat completion on the shared client.
+    Returns the summary and its usage (tokens and latency in seconds).
+    """
+    started = time.perf_counter()
+    result = await get_model_client().create([
+        SystemMessage(content=SUMMARY_SYSTEM_MESSAGE),
+        UserMessage(content=user_query, source="user"),
+    ])
+    usage = {
+        "prompt_tokens": result.usage.prompt_tokens,
+        "completion_tokens": result.usage.completion_tokens,
+        "latency": round(time.perf_counter() - started, 3),
+    }
+    return result.content, usage
+
+
+def _estimate_tokens(text: str) -> int:
+    # About four characters per token for English text
+    return max(1, round(len(text) / 4)) if text else 0
+
+
+async def stream_summary(user_query: str) -> AsyncIterator[Union[str, Dict]]:
+    """
+    Same single completion as summarize_flights, streamed: yields text chunks
+    as they arrive, then one final usage dict. Usage is requested from the
+    server; if it sends none, token counts are estimated from the text and
+    the dict is flagged `estimated`.
+    """
+    started = time.perf_counter()
+    stream = get_model_client().create_stream([
+        SystemMessage(content=SUMMARY_SYSTEM_MESSAGE),
+        UserMessage(content=user_query, source="user"),
+    ], include_usage=True)
+    chunks = []
+    async for chunk in stream:
+        if isinstance(chunk, str):
+            chunks.append(chunk)
+            yield chunk
+        else:
+            usage = {
+                "prompt_tokens": chunk.usage.prompt_tokens,
+                "completion_tokens": chunk.usage.completion_tokens,
+                "latency": round(time.perf_counter() - started, 3),
+            }
+            if not (usage["prompt_tokens"] or usage["completion_tokens"]):
+                usage["prompt_tokens"] = _estimate_tokens(SUMMARY_SYSTEM_MESSAGE) + _estimate_tokens(user_query)
+                usage["completion_tokens"] = _estimate_tokens("".join(chunks) or str(chunk.content))
+                usage["estimated"] = True
+            yield usage
+
+
+class FlightSearchAgent(AssistantAgent):
+    # Autogen agent for summarizing flight data with tools
+    def __init__(self, name="flight_agent", model_client: Optional[OpenAIChatCompletionClient] = None):
         # Initialize agent
         super().__init__(
             name=name,
-            model_client=model_client,
-            system_message=(
-                "You are AutoFlights AI — a travel assistant that analyzes real flight data "
-                "from Google Flights (saved in flight_results.txt) and summarizes the best deals. "
-                "Use available tools to read, search, and reason about flight information."
-            ),
-            tools=autogen_tools,
+            model_client=model_client or get_model_client(),
+            system_message=SYSTEM_MESSAGE + "Use available tools to read, search, and reason about flight information.",
+            tools=get_autogen_tools(),
             reflect_on_tool_use=True,
         )
 
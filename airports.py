@@ -0,0 +1,308 @@
+import csv
+import os
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# Bundled offline dataset: major airports plus metro codes for multi-airport cities
+AIRPORTS_CSV = os.getenv(
+    "AIRPORTS_CSV", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "airports.csv")
+)
+
+# Country abbreviations people type after a comma, e.g. 'London, UK'
+COUNTRY_ALIASES = {
+    "us": "united states", "usa": "united states", "uk": "united kingdom", "gb": "united kingdom",
+    "uae": "united arab emirates", "korea": "south korea",
+}
+# Countries whose places are commonly qualified by state or province ('Dallas, TX')
+STATE_COUNTRIES = {"united states", "canada", "australia", "brazil", "india", "mexico"}
+
+# Match quality, best first
+EXACT_CODE, EXACT_NAME, PHRASE_PREFIX, TOKEN_PREFIX, FUZZY = range(5)
+
+_PUNCTUATION = str.maketrans({c: " " for c in "-/.,'()&"})
+
+
+def fold(text: str) -> str:
+    """'  São Paulo/Guarulhos ' -> 'sao paulo guarulhos': case, accents and punctuation folded."""
+    text = unicodedata.normalize("NFKD", (text or "").casefold().translate(_PUNCTUATION))
+    return " ".join("".join(c for c in text if not unicodedata.combining(c)).split())
+
+
+@dataclass(slots=True)
+class Place:
+    """An airport, or a city whose metro code covers several airports."""
+    code: str
+    kind: str  # "airport" or "city"
+    name: str
+    city: str
+    country: str
+    metro: str = ""
+    aliases: Tuple[str, ...] = ()
+    rank: int = 0  # dataset order, roughly busiest first
+
+    @property
+    def canonical(self) -> str:
+        """The code a search should use: a city's metro code, else the airport's own."""
+        return self.code if self.kind == "city" else (self.metro or self.code)
+
+    def to_dict(self) -> Dict:
+        return {
+            "code": self.code,
+            "kind": self.kind,
+            "name": self.name,
+            "city": self.city,
+            "country": self.country,
+            "metro": self.metro or None,
+            "label": f"{self.name} ({self.code})",
+        }
+
+
+class UnknownPlace(ValueError):
+    """Raised when text does not resolve to exactly one airport or city (or is blank)."""
+
+    def __init__(self, text: str, suggestions: List[Place]):
+        hint = f" Did you mean {', '.join(f'{p.city} ({p.code})' for p in suggestions[:3])}?" if suggestions else ""
+        super().__init__(f"Unknown or ambiguous airport/city: {text!r}.{hint}")
+        self.text = text
+        self.suggestions = suggestions
+
+
+def _deletes(token: str, distance: int) -> Set[str]:
+    """Every string reachable from `token` by deleting up to `distance` characters."""
+    found, frontier = {token}, {token}
+    for _ in range(distance):
+        frontier = {t[:i] + t[i + 1:] for t in frontier for i in range(len(t))}
+        found |= frontier
+    return found
+
+
+def _max_typos(token: str) -> int:
+    return 0 if len(token) < 4 else 1 if len(token) < 8 else 2
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal-string-alignment distance (adjacent swaps cost 1), cut off above `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if prev2 is not None and i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class AirportIndex:
+    """
+    In-memory airport/city index. Lookups go exact code, then exact name,
+    then a token prefix trie (every query word must start a word of the
+    place's code, name, city or aliases), and only when nothing matches,
+    a typo-tolerant pass over the word vocabulary using precomputed
+    deletion neighbourhoods (one typo in words of 4+ letters, two in 8+).
+    Everything is precomputed at build time, so a lookup is a few dict
+    probes and set intersections.
+    """
+
+    def __init__(self, places: Iterable[Place]):
+        self.places: List[Place] = list(places)
+        self._by_code: Dict[str, int] = {}
+        self._exact: Dict[str, Set[int]] = {}
+        self._phrases: List[Tuple[str, ...]] = []
+        token_ids: Dict[str, Set[int]] = {}
+        for i, place in enumerate(self.places):
+            # Metro rows win code lookups over the same-coded airport (e.g. DFW)
+            if place.code not in self._by_code or place.kind == "city":
+                self._by_code[place.code] = i
+            phrases = tuple({fold(t) for t in (place.name, place.city, *place.aliases) if t})
+            self._phrases.append(phrases)
+            for phrase in phrases:
+                self._exact.setdefault(phrase, set()).add(i)
+                for token in phrase.split():
+                    token_ids.setdefault(token, set()).add(i)
+            token_ids.setdefault(place.code.lower(), set()).add(i)
+
+        # Prefix trie flattened to {prefix: ids}: one dict probe per query word
+        grouped: Dict[str, Set[int]] = {}
+        for token, ids in token_ids.items():
+            for end in range(1, len(token) + 1):
+                grouped.setdefault(token[:end], set()).update(ids)
+        self._prefixes = {p: frozenset(ids) for p, ids in grouped.items()}
+        self._tokens = {t: frozenset(ids) for t, ids in token_ids.items()}
+
+        self._countries = {fold(p.country) for p in self.places}
+
+        self._neighbours: Dict[str, Set[str]] = {}
+        for token in self._tokens:
+            for variant in _deletes(token, _max_typos(token)):
+                self._neighbours.setdefault(variant, set()).add(token)
+
+    @classmethod
+    def from_csv(cls, path: str = AIRPORTS_CSV) -> "AirportIndex":
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        return cls(
+            Place(
+                code=r["code"].strip().upper(), kind=r["kind"].strip(), name=r["name"].strip(),
+                city=r["city"].strip(), country=r["country"].strip(), metro=(r.get("metro") or "").strip(),
+                aliases=tuple(a.strip() for a in (r.get("aliases") or "").split("|") if a.strip()), rank=rank,
+            )
+            for rank, r in enumerate(rows)
+        )
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def search(self, query: str, limit: int = 8) -> List[Place]:
+        """Best matches for autocomplete, metro entries and busier airports first; one entry per code."""
+        places, seen = [], set()
+        for _, i in self._matches(query):
+            place = self.places[i]
+            if place.code not in seen:
+                seen.add(place.code)
+                places.append(place)
+                if len(places) == limit:
+                    break
+        return places
+
+    def resolve(self, text: str) -> Optional[Place]:
+        """
+        The single place `text` means, or None. A city match wins over its
+        airports, and several airports of one metro resolve to the metro.
+        Exact codes and names always resolve (to the best-ranked match when
+        a name is shared); prefix and fuzzy matches only when unambiguous.
+        """
+        matches = self._matches(text)
+        if not matches:
+            return None
+        best = matches[0][0]
+        top = [self.places[i] for quality, i in matches if quality == best]
+        if best == EXACT_CODE or len(top) == 1:
+            return top[0]
+        if len({p.canonical for p in top}) == 1:
+            return self._canonical_place(top[0])
+        return top[0] if best == EXACT_NAME else None
+
+    def canonical(self, text: str) -> str:
+        """Canonical code for `text`; raises UnknownPlace with suggestions otherwise."""
+        place = self.resolve(text)
+        if place is None:
+            raise UnknownPlace(text, self.search(text, limit=5))
+        return place.code
+
+    def exact(self, text: str) -> Optional[str]:
+        """Canonical code when `text` is exactly a code, name, city or alias; no guessing."""
+        place = self.exact_place(text)
+        return place.code if place else None
+
+    def exact_place(self, text: str) -> Optional[Place]:
+        matches = self._matches(text, fuzzy=False)
+        if matches and matches[0][0] <= EXACT_NAME:
+            return self.resolve(text)
+        return None
+
+    def resolve_qualified(self, text: str) -> Optional[Place]:
+        """
+        'Dallas, TX' or 'Paris, France': the exact place named before the
+        comma. A suffix naming a country must agree with the place's; any
+        other suffix is read as a state or province, so only places in
+        STATE_COUNTRIES match ('Paris, TX' is not Paris, France).
+        """
+        head, _, region = text.partition(",")
+        place = self.exact_place(head)
+        if place is None:
+            return None
+        region = fold(region)
+        region = COUNTRY_ALIASES.get(region, region)
+        if region in self._countries:
+            return place if region == fold(place.country) else None
+        return place if fold(place.country) in STATE_COUNTRIES else None
+
+    def _canonical_place(self, place: Place) -> Place:
+        if place.kind == "city" or not place.metro:
+            return place
+        return self.places[self._by_code.get(place.metro, self.places.index(place))]
+
+    def _matches(self, query: str, fuzzy: bool = True) -> List[Tuple[int, int]]:
+        """(quality, place index) pairs, best first."""
+        q = fold(query)
+        if not q:
+            return []
+        scored: Dict[int, int] = {}
+        code = q.upper()
+        if len(code) == 3 and code in self._by_code:
+            scored[self._by_code[code]] = EXACT_CODE
+        for i in self._exact.get(q, ()):
+            scored.setdefault(i, EXACT_NAME)
+
+        words = q.split()
+        candidates = self._lookup(words, self._prefix_ids)
+        if not candidates and not scored and fuzzy:
+            candidates = self._lookup(words, self._fuzzy_ids)
+            for i in candidates:
+                scored.setdefault(i, FUZZY)
+        else:
+            for i in candidates:
+                phrase_start = any(p.startswith(q) for p in self._phrases[i])
+                scored.setdefault(i, PHRASE_PREFIX if phrase_start else TOKEN_PREFIX)
+
+        places = self.places
+        return sorted(((quality, i) for i, quality in scored.items()),
+                      key=lambda qi: (qi[0], places[qi[1]].kind != "city", places[qi[1]].rank))
+
+    @staticmethod
+    def _lookup(words: List[str], ids_for) -> FrozenSet[int]:
+        result: Optional[FrozenSet[int]] = None
+        for word in words:
+            ids = ids_for(word)
+            result = ids if result is None else result & ids
+            if not result:
+                return frozenset()
+        return result or frozenset()
+
+    def _prefix_ids(self, word: str) -> FrozenSet[int]:
+        return self._prefixes.get(word, frozenset())
+
+    def _fuzzy_ids(self, word: str) -> FrozenSet[int]:
+        ids: Set[int] = set(self._prefixes.get(word, ()))
+        limit = _max_typos(word)
+        if not limit:
+            return frozenset(ids)
+        for variant in _deletes(word, limit):
+            for token in self._neighbours.get(variant, ()):
+                if _edit_distance(word, token, limit) <= limit:
+                    ids |= self._tokens[token]
+        return frozenset(ids)
+
+
+@lru_cache(maxsize=1)
+def get_index() -> AirportIndex:
+    """The bundled index, built on first use (a few milliseconds)."""
+    return AirportIndex.from_csv()
+
+
+def resolve_place(text: str) -> str:
+    """
+    Canonical IATA code for user input such as 'Dallas', 'Dallas, TX', 'dfw'
+    or 'Dalas'. Places the bundled index does not know are passed through
+    as typed (whitespace collapsed) for Google to interpret, as before the
+    index existed; only blank input raises UnknownPlace.
+    """
+    text = " ".join((text or "").split())
+    if not text:
+        raise UnknownPlace(text, [])
+    index = get_index()
+    place = index.resolve_qualified(text) if "," in text else index.resolve(text)
+    return place.code if place else text
+
+
+@lru_cache(maxsize=4096)
+def exact_code(text: str) -> Optional[str]:
+    """Canonical code for an exact code/name/alias, or None; safe for cache keys."""
+    return get_index().exact(text)
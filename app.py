@@ -1,14 +1,92 @@
 import asyncio
-from fastapi import FastAPI
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from functools import partial
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from dotenv import load_dotenv
-from agents import FlightSearchAgent
-import subprocess, json, sys, os
+from admission import AdmissionController, Overloaded
+from airports import UnknownPlace, get_index, resolve_place
+from browser_pool import BrowserPool
+from jobs import JobScheduler
+from googleflights_auto import format_table
+from logs import configure_logging, request_id
+from metrics import CONTENT_TYPE, REGISTRY, REQUEST_SECONDS, REQUESTS, monitor_loop_lag
+from pipeline import (
+    QUEUE_TIMEOUT, SCRAPE_BACKEND, calendar_cache, calendar_route, history, llm_stats, rank_history, route_key,
+    run_batch_pipeline, run_scrape_pipeline, scrape_cache, scrape_cached, scrape_queue, scrape_route,
+    stream_scrape_pipeline, summarize_table, summary_cache,
+)
+from watches import WatchScheduler, check_webhook
+from wire import MSGPACK, NDJSON, dumps, negotiate, parse_fields, project, shape_result, wants_msgpack
+import os, json, importlib
 
 load_dotenv()
+configure_logging()
+log = logging.getLogger("autoflights.api")
+
+# Warm headless browsers shared by every /scrape request
+browser_pool = BrowserPool()
+# Scrapes running at once (at most one per pooled browser by default) and queued behind them
+admission = AdmissionController(max_active=int(os.getenv("SCRAPE_CONCURRENCY", browser_pool.size)))
+# Background scrape jobs; admission decides when their scrape gets a browser. With the queue backend
+# a job may also wait up to SCRAPE_QUEUE_TIMEOUT for a worker, on top of the usual job budget
+scheduler = JobScheduler(
+    concurrency=admission.max_active + admission.max_queue,
+    deadline=float(os.getenv("SCRAPE_JOB_TIMEOUT", "300")) + (QUEUE_TIMEOUT if SCRAPE_BACKEND == "queue" else 0),
+)
+
+def needs_browser(origin: str, destination: str, month: str) -> bool:
+    """False when a scrape of this route is answered from the cache (or fails before it starts)."""
+    try:
+        return not scrape_cached(resolve_place(origin), resolve_place(destination), month)
+    except UnknownPlace:
+        return False
+
+async def watch_scrape(origin: str, destination: str, month: str):
+    # Checks always scrape afresh (and refresh the scrape cache): a cached result could be the
+    # watch's own last snapshot. They queue for a browser slot like everyone else
+    return await scrape_route(browser_pool, origin, destination, month, refresh=True,
+                              admit=admission.reservation("watches", reserve=False))
 
-app = FastAPI(title="AutoFlights API")
+# Background price watches, sharing the browser pool and its admission queue
+watcher = WatchScheduler(watch_scrape)
+
+def log_preload_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        log.warning(f"Preloading the LLM stack failed; /summarize will retry the import: {task.exception()}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # With the queue backend browsers live in worker.py processes; the stub backend needs none
+    if SCRAPE_BACKEND not in ("queue", "stub"):
+        await browser_pool.start()
+    loop_lag = asyncio.create_task(monitor_loop_lag())
+    await admission.start()
+    # Build the airport index now so the first autocomplete keystroke is fast
+    await asyncio.to_thread(get_index)
+    await watcher.start()
+    # Load the LLM stack in the background so it never delays the first request
+    app.state.preload = asyncio.create_task(asyncio.to_thread(importlib.import_module, "agents"))
+    app.state.preload.add_done_callback(log_preload_failure)
+    try:
+        yield
+    finally:
+        loop_lag.cancel()
+        # The import runs in a thread and cannot be cancelled; let it finish before tearing down
+        await asyncio.gather(app.state.preload, return_exceptions=True)
+        await watcher.stop()
+        await scheduler.shutdown()
+        await admission.stop()
+        await browser_pool.stop()
+
+app = FastAPI(title="AutoFlights API", lifespan=lifespan)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -19,169 +97,415 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request IDs, access logs and per-endpoint metrics
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    rid = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id.set(rid)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = rid
+        return response
+    finally:
+        # Label by route template so /jobs/{job_id} stays one series
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        outcome = "ok" if status < 400 else "client_error" if status < 500 else "error"
+        elapsed = time.perf_counter() - started
+        REQUESTS.inc(endpoint=endpoint, outcome=outcome)
+        REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, outcome=outcome)
+        log.info(f"{request.method} {request.url.path} {status} in {elapsed:.3f}s", extra={"fields": {
+            "method": request.method, "path": request.url.path, "endpoint": endpoint,
+            "status": status, "seconds": round(elapsed, 4),
+        }})
+        request_id.reset(token)
+
+def client_id(request: Request) -> str:
+    """Who a request counts against for fair queuing: `X-Client-ID`, else the caller's address."""
+    return request.headers.get("X-Client-ID") or (request.client.host if request.client else "unknown")
+
+def flight_fields(fields: Optional[str]):
+    """Parse a `fields=` projection of flight rows, answering 400 for unknown names."""
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "reason": exc.reason, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(UnknownPlace)
+async def unknown_place_handler(request: Request, exc: UnknownPlace):
+    return JSONResponse(
+        status_code=400,
+        content={"detail": str(exc), "query": exc.text, "suggestions": [p.to_dict() for p in exc.suggestions]},
+    )
+
+# Health endpoint
+@app.get("/healthz")
+async def health_endpoint():
+    """
+    Cheap liveness probe, also used to measure time-to-first-request.
+    """
+    return {"status": "ok"}
+
+# Prometheus scrape target
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Request counts and latencies per endpoint, per-stage pipeline timings
+    (pool_wait, scrape_*, llm_summary, history_write), job outcomes and
+    cache counters in Prometheus text format.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+class RankWeights(BaseModel):
+    price: Optional[float] = Field(None, ge=0)
+    duration: Optional[float] = Field(None, ge=0)
+    stops: Optional[float] = Field(None, ge=0)
+
 class ScrapeRequest(BaseModel):
     origin: str
     destination: str
     month: str  
+    # Optional re-ranking by weighted price/duration/stops score
+    weights: Optional[RankWeights] = None
+    per_airline: Optional[int] = Field(None, ge=1)
 
 # Scrape endpoint
 @app.post("/scrape")
-async def scrape_flights_endpoint(req: ScrapeRequest):
+async def scrape_flights_endpoint(req: ScrapeRequest, request: Request):
     """
-    Runs the Playwright scraper in a safe external subprocess with user inputs,
-    then summarizes results using Groq + Autogen.
-    Now streams live scraper + summarizer logs to the frontend in real time
-    while still returning raw flights, table text, and summary as JSON.
+    Queues a scrape + summarize job and returns its ID immediately.
+    Poll GET /jobs/{job_id} for status and results. With `weights` and/or
+    `per_airline` the flights are ranked by weighted score and the result
+    includes their Pareto frontier. Answers 429 with Retry-After when the
+    scrape queue is full.
     """
+    log.info(f"Received scrape request: {req.origin} -> {req.destination} ({req.month})")
 
-    try:
-        print(f" Received scrape request: {req.origin} -> {req.destination} ({req.month})")
-        print(" Launching scraper subprocess...")
-
-        # Windows-specific loop policy
-        if sys.platform == "win32":
-            try:                
-                asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-                print("Event loop policy set to WindowsProactorEventLoopPolicy")
-            except Exception as e:
-                print("Could not set event loop policy:", e)
-        # Run scraper as subprocess   
-        venv_python = sys.executable
-        result = subprocess.run([venv_python, "scrape_runner.py", 
-        req.origin, req.destination, req.month], 
-        capture_output=True, 
-        text=True, 
-        timeout=300 
-        )
-
-        if result.returncode != 0:
-            print("Subprocess error:", result.stderr)
-            return { "status": "error", "message": "Scraper failed to run properly. Check terminal for details." }
-        # Parse output
+    # Known places become IATA codes (shared cache keys); anything else goes to Google as typed
+    params = {**req.model_dump(), "origin": resolve_place(req.origin), "destination": resolve_place(req.destination)}
+    client = client_id(request)
+    # Reserve now so an overload is a 429 here, not a failed job later; cache hits need no browser.
+    # Time spent waiting for the slot does not count toward the job deadline
+    admit = admission.reservation(client, reserve=needs_browser(params["origin"], params["destination"], req.month))
+    queued = scheduler.submit(partial(run_scrape_pipeline, browser_pool), params, admit=admit)
+    queued.task.add_done_callback(lambda _: admit.release())
+    return {"status": "queued", "job_id": queued.id, "origin": params["origin"], "destination": params["destination"]}
+
+# Streaming scrape endpoint
+@app.get("/scrape/stream")
+async def stream_scrape_endpoint(origin: str, destination: str, month: str, request: Request, fields: Optional[str] = None):
+    """
+    Server-Sent Events version of /scrape for EventSource clients: streams
+    scraper phase events and each flight row as it is extracted, then the
+    summary token by token, and finally a 'done' event with the full result.
+    `fields` (comma-separated) trims every flight row to those keys.
+    """
+    log.info(f"Received streaming scrape request: {origin} -> {destination} ({month})")
+
+    projection = flight_fields(fields)
+    origin, destination = resolve_place(origin), resolve_place(destination)
+    client = client_id(request)
+    admit = admission.reservation(client, reserve=needs_browser(origin, destination, month))
+
+    async def stream():
         try:
-            scraped = json.loads(result.stdout)
-            flights = scraped.get("flights", [])
-            table_text = scraped.get("table", "")
+            async for event in stream_scrape_pipeline(browser_pool, origin, destination, month, admit=admit):
+                if projection and event["type"] == "flight":
+                    event = {**event, "flight": project([event["flight"]], projection)[0]}
+                elif projection and event["type"] == "done":
+                    event = {**event, "result": shape_result(event["result"], projection)}
+                yield f"event: {event['type']}\ndata: {dumps(event).decode()}\n\n"
         except Exception as e:
-            print("JSON parse error:", e) 
-            print("Raw output:", result.stdout)
-            
-            return { "status": "error", 
-            "message": "Invalid data received from scraper subprocess." }
-
-        if not flights:
-            print(" No flights found in subprocess output.")
-            return {"status": "no_results", 
-            "message": "No priced flights found. Try again with different cities or month.", 
-            "flights": [], "table": "", 
-            "summary": "" 
-            }
-        print(f"Subprocess returned {len(flights)} flights successfully.")
-
-        # Summarize results with Groq + Autogen
-        agent = FlightSearchAgent()            
-        user_query = (
-                "You are a precise and funny AI travel assistant. "
-                "Analyze the following flight listings and output two sections.\n\n"
-                "1️ TOP CHEAPEST FLIGHTS — show ONLY a neat table with exactly these columns:\n"
-                "Airline | Price | Duration | Stops | Departure | Arrival\n"
-                "Include only the 3 cheapest flights (even if prices repeat).\n\n"
-                "2️ THOUGHTS SECTION — below the table, add a heading in bold 'Thoughts:'\n"
-                "For each line under Thoughts, start it with a bullet point.\n"
-                "Then give one short, witty line per flight — light humor, friendly tone, no negativity.\n"
-                "Add a blank line before this section so it visually separates from the table.\n"
-                "Keep it conversational like a fun travel buddy.\n\n"
-                f"{table_text}"
-            )
-
-        print("Running Autogen + Groq summarizer...")
-        summary = await agent.run_flight_search(user_query)
-        table_flights = flights[:3]
-
-        return { "status": "ok", 
-        "message": f"Scraped {len(flights)} flights successfully.", 
-        "flights": flights, 
-        "table_flights": table_flights, 
-        "summary": summary 
-        }
-
-    except subprocess.TimeoutExpired:
-        print("Scraper took too long — timeout.")
-        return {"status": "error", "message": "Scraper timeout — took longer than expected."}
-    
-    except Exception as e:
-        print("Error while scraping:", e) 
-        return {"status": "error", "error": str(e)}
+            log.warning(f"Error while streaming scrape: {e}")
+            error = {"type": "error", "message": str(e)}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+
+    # Also frees the reservation if the stream never starts
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"},
+                             background=BackgroundTask(admit.release))
+
+class BatchScrapeRequest(BaseModel):
+    queries: List[ScrapeRequest]
+    concurrency: Optional[int] = None
+
+# Batch scrape endpoint
+@app.post("/scrape/batch")
+async def batch_scrape_endpoint(
+    req: BatchScrapeRequest,
+    request: Request,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+):
+    """
+    Scrapes many routes/months concurrently in one pooled browser and streams
+    one NDJSON line per query as soon as it finishes. A failed query only
+    reports its own error. `fields` trims flight rows to those keys and
+    `limit` caps the flights per query. Clients that accept
+    application/msgpack get a stream of MessagePack objects instead.
+    """
+    projection = flight_fields(fields)
+    msgpack = wants_msgpack(request)
+    queries = [(q.origin, q.destination, q.month) for q in req.queries]
+    log.info(f"Received batch scrape request with {len(queries)} queries")
+
+    client = client_id(request)
+    # The uncached queries share one browser, so the batch takes one slot, and none if all are cached
+    admit = admission.reservation(client, reserve=any(needs_browser(*q) for q in queries))
+
+    async def stream():
+        kwargs = {"concurrency": req.concurrency} if req.concurrency else {}
+        async for result in run_batch_pipeline(browser_pool, queries, admit=admit, **kwargs):
+            # No `cursor` here to resume from, so no next_cursor either
+            result = shape_result(result, projection, limit, paged=False)
+            yield dumps(result, msgpack) if msgpack else dumps(result) + b"\n"
+
+    return StreamingResponse(stream(), media_type=MSGPACK if msgpack else NDJSON, headers={"Vary": "Accept"},
+                             background=BackgroundTask(admit.release))
+
+# Price calendar endpoint
+@app.get("/calendar")
+async def calendar_endpoint(origin: str, destination: str, month: str, request: Request):
+    """
+    Lowest fare for every departure day of `month`, read from one browser
+    session instead of a scrape per date. `prices[d - 1]` is day d's fare
+    (null where none was found) and `cheapest` names the best day. Cached
+    per route and month like scrapes; answers 429 when the scrape queue is full
+    and 504 when the browser session outlasts SCRAPE_JOB_TIMEOUT.
+    """
+    log.info(f"Received calendar request: {origin} -> {destination} ({month})")
+
+    if SCRAPE_BACKEND == "queue":
+        raise HTTPException(status_code=501, detail="Price calendars need a local browser; SCRAPE_BACKEND=queue has none.")
+    origin, destination = resolve_place(origin), resolve_place(destination)
+    client = client_id(request)
+    # Like /scrape: a 429 up front when the queue is full, and no browser slot for a cached calendar
+    admit = admission.reservation(client, reserve=not calendar_cache.has(route_key(origin, destination, month)))
+    try:
+        calendar = await calendar_route(browser_pool, origin, destination, month, admit=admit)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Reading the price calendar took too long; try again later.")
+    priced = [(price, day) for day, price in enumerate(calendar["prices"], 1) if price is not None]
+    cheapest = None
+    if priced:
+        price, day = min(priced)
+        cheapest = {"day": day, "date": f"{calendar['month']}-{day:02d}", "price": price}
+    payload = {"origin": origin, "destination": destination, **calendar, "cheapest": cheapest}
+    return await negotiate(request, payload)
+
+# Job status endpoint
+@app.get("/jobs/{job_id}")
+async def job_status_endpoint(
+    job_id: str,
+    request: Request,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+):
+    """
+    Returns the job status and, once finished, the scraped flights,
+    table flights and summary under `result`. `fields` trims flight rows to
+    those keys; `limit` pages the flights, with `next_cursor` to pass back
+    as `cursor` for the next page. The body is orjson-encoded JSON, or
+    MessagePack for Accept: application/msgpack, and zstd/gzip-compressed
+    when Accept-Encoding allows.
+    """
+    job = scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job ID.")
+    payload = job.to_dict()
+    if payload["result"] is not None:
+        projection = flight_fields(fields)
+        try:
+            payload["result"] = shape_result(payload["result"], projection, limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return await negotiate(request, payload)
+
+# Job cancel endpoint
+@app.delete("/jobs/{job_id}")
+async def cancel_job_endpoint(job_id: str):
+    """
+    Cancels a queued or running job and closes the browser context behind it.
+    """
+    job = scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job ID.")
+    cancelled = scheduler.cancel(job_id)
+    return {"job_id": job_id, "cancelled": cancelled, "status": job.status}
+
+# Cache stats endpoint
+@app.get("/cache/stats")
+async def cache_stats_endpoint():
+    """
+    Hit, miss and coalesce counters for the scrape, summary and calendar
+    caches, plus LLM calls, latency and tokens spent and saved by the summary cache.
+    """
+    return {
+        "scrape": scrape_cache.stats(), "summary": summary_cache.stats(), "calendar": calendar_cache.stats(),
+        "llm": llm_stats,
+    }
+
+# Worker queue stats endpoint
+@app.get("/queue/stats")
+async def queue_stats_endpoint():
+    """
+    Jobs queued, leased, done, failed and cancelled in the durable scrape queue, busy
+    workers and the age of the oldest queued job (SCRAPE_BACKEND=queue only).
+    """
+    if scrape_queue is None:
+        raise HTTPException(status_code=404, detail="The durable queue is only used with SCRAPE_BACKEND=queue.")
+    return await asyncio.to_thread(scrape_queue.stats)
+
+# Airport autocomplete endpoint
+@app.get("/airports")
+async def airports_endpoint(q: str = "", limit: int = Query(8, ge=1, le=50)):
+    """
+    Airports and cities matching `q` by IATA code, name prefix or, failing
+    that, a close spelling. `resolved` is exactly what a scrape of `q` would
+    search for (resolve_place): its IATA code, or the text as typed when the
+    index does not know it; null for a blank query.
+    """
+    index = get_index()
+    return {
+        "query": q,
+        "resolved": resolve_place(q) if q.strip() else None,
+        "results": [p.to_dict() for p in index.search(q, limit)],
+    }
+
+# Admission stats endpoint
+@app.get("/admission/stats")
+async def admission_stats_endpoint():
+    """
+    Scrapes running and queued (per client), admissions and rejections,
+    measured browser memory and the current Retry-After estimate.
+    """
+    return admission.stats()
+
+class WatchRequest(BaseModel):
+    origin: str
+    destination: str
+    month: str
+    webhook: Optional[str] = None
+
+# Price watch endpoints
+@app.post("/watches")
+async def create_watch_endpoint(req: WatchRequest):
+    """
+    Watches a route/month in the background. Each check is diffed against
+    the previous one; changes are POSTed to `webhook` when given. Checks
+    come more often while prices move and less often while they are stable.
+    """
+    if req.webhook:
+        try:
+            await check_webhook(req.webhook)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    watch = await watcher.add(resolve_place(req.origin), resolve_place(req.destination), req.month, req.webhook)
+    return watch.to_dict()
+
+@app.get("/watches")
+async def list_watches_endpoint():
+    return {"watches": [w.to_dict() for w in watcher.list()]}
+
+@app.get("/watches/{watch_id}")
+async def get_watch_endpoint(watch_id: str):
+    watch = watcher.get(watch_id)
+    if watch is None:
+        raise HTTPException(status_code=404, detail="Unknown watch ID.")
+    return watch.to_dict()
+
+@app.delete("/watches/{watch_id}")
+async def delete_watch_endpoint(watch_id: str):
+    if not await watcher.remove(watch_id):
+        raise HTTPException(status_code=404, detail="Unknown watch ID.")
+    return {"status": "deleted", "watch_id": watch_id}
+
+# Price history endpoints
+@app.get("/history/cheapest")
+async def history_cheapest_endpoint(origin: str, destination: str, month: Optional[str] = None, limit: int = 10):
+    """
+    Cheapest flights ever recorded for a route, optionally limited to one month.
+    """
+    flights = await asyncio.to_thread(history.cheapest, origin, destination, month, limit)
+    return {"flights": flights}
+
+@app.get("/history/prices")
+async def history_prices_endpoint(origin: str, destination: str, month: Optional[str] = None):
+    """
+    Lowest and average price of each recorded scrape for a route, oldest first.
+    """
+    points = await asyncio.to_thread(history.price_over_time, origin, destination, month)
+    return {"prices": points}
+
+@app.get("/history/latest")
+async def history_latest_endpoint(origin: str, destination: str, month: Optional[str] = None):
+    """
+    Most recent recorded snapshot for a route.
+    """
+    snapshot = await asyncio.to_thread(history.latest_snapshot, origin, destination, month)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="No recorded scrapes for this route.")
+    return snapshot
+
+@app.get("/history/ranked")
+async def history_ranked_endpoint(
+    origin: str,
+    destination: str,
+    month: Optional[str] = None,
+    price: Optional[float] = Query(None, ge=0),
+    duration: Optional[float] = Query(None, ge=0),
+    stops: Optional[float] = Query(None, ge=0),
+    per_airline: Optional[int] = Query(None, ge=1),
+    limit: int = Query(50, ge=1),
+):
+    """
+    Latest recorded flights of every month for a route, ranked by a weighted
+    price/duration/stops score, with the Pareto frontier across all of them.
+    """
+    weights = {"price": price, "duration": duration, "stops": stops}
+    return await asyncio.to_thread(rank_history, origin, destination, month, weights, per_airline, limit)
 
 # Summarize endpoint
 @app.get("/summarize")
-async def summarize_endpoint():
+async def summarize_endpoint(origin: Optional[str] = None, destination: Optional[str] = None, month: Optional[str] = None):
     """
-    Old helper: reads the last scraped flight_results.txt and re-summarizes it.
+    Re-summarizes the latest recorded snapshot from the price-history store,
+    for one route if origin and destination are given, otherwise the newest overall.
     Use /scrape for live scraping instead.
     """
-    try:
-        with open("flight_results.txt", "r", encoding="utf-8") as f:
-            flight_data = f.read().strip()
-    except FileNotFoundError:
-        return {"summary": "No flight_results.txt found. Run the scraper first."}
-
-    if not flight_data:
-        return {"summary": " flight_results.txt is empty. Run the scraper again."}
-
-    agent = FlightSearchAgent()
-    user_query = (
-        "You are a precise and funny AI travel assistant. "
-        "Analyze the following flight listings and output two sections.\n\n"
-        "1️ TOP CHEAPEST FLIGHTS — show ONLY a neat table with exactly these columns:\n"
-        "Airline | Price | Duration | Stops | Departure | Arrival\n"
-        "Include only the 3 cheapest flights (even if prices repeat).\n\n"
-        "2️ THOUGHTS SECTION — below the table, add a heading in bold 'Thoughts:'\n"
-        "For each line under Thoughts, start it with a bullet point.\n"
-        "Then give one short, witty line per flight — light humor, friendly tone, no negativity.\n"
-        "Add a blank line before this section so it visually separates from the table.\n"
-        "Keep it conversational like a fun travel buddy.\n\n"
-        f"{flight_data}"
-    )
+    snapshot = await asyncio.to_thread(history.latest_snapshot, origin, destination, month)
+    if snapshot is None:
+        return {"summary": "No recorded flights found. Run the scraper first."}
 
-    summary = await agent.run_flight_search(user_query)
+    summary = await summarize_table(format_table(snapshot["flights"]))
     return {"summary": summary}
 
 # CLI mode
 async def main():
     print(" Welcome to AutoFlights Smart Summarizer!\n")
-    print("Reading flight_results.txt (generated from Playwright scraper)...")
+    print("Reading the latest scrape from the price-history store...")
 
-    try:
-        with open("flight_results.txt", "r", encoding="utf-8") as f:
-            flight_data = f.read().strip()
-    except FileNotFoundError:
-        print(" No flight_results.txt found. Run googleflights_auto.py first.")
-        return
-
-    if not flight_data:
-        print("flight_results.txt is empty. Run the scraper again.")
+    snapshot = history.latest_snapshot()
+    if snapshot is None:
+        print(" No recorded flights found. Run googleflights_auto.py first.")
         return
+    flight_data = format_table(snapshot["flights"])
 
-    agent = FlightSearchAgent()
     print("\n Analyzing flight data with Groq...\n")
 
-    user_query = (
-        "You are a precise and funny AI travel assistant. "
-        "Analyze the following flight listings and output two sections.\n\n"
-        "1️ TOP CHEAPEST FLIGHTS — show ONLY a neat table with exactly these columns:\n"
-        "Airline | Price | Duration | Stops | Departure | Arrival\n"
-        "Include only the 3 cheapest flights (even if prices repeat).\n\n"
-        "2️ THOUGHTS SECTION — below the table, add a heading in bold 'Thoughts:'\n"
-        "For each line under Thoughts, start it with a bullet point.\n"
-        "Then give one short, witty line per flight — light humor, friendly tone, no negativity.\n"
-        "Add a blank line before this section so it visually separates from the table.\n"
-        "Keep it conversational like a fun travel buddy.\n\n"
-        f"{flight_data}"
-    )
-
     try:
-        summary = await agent.run_flight_search(user_query)
+        summary = await summarize_table(flight_data)
         print(" Smart Summary with Humor:\n")
         print(summary)
 
@@ -0,0 +1,61 @@
+"""
+Airport index lookup benchmark.
+
+    python -m benchmarks.airports [--repeat 2000]
+
+Times building the index from data/airports.csv, then search() and
+resolve() per query kind: exact codes, exact city names, typed prefixes
+and misspellings (which fall through to the fuzzy pass). Results are
+appended to benchmarks/results/airports.jsonl.
+"""
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+from airports import AirportIndex
+from benchmarks.startup import RESULTS_DIR, git_revision
+
+QUERIES: Dict[str, List[str]] = {
+    "code": ["DFW", "jfk", "CDG", "LHR", "NRT", "SYD"],
+    "name": ["Dallas", "paris", "New York", "São Paulo", "Los Angeles", "Bali"],
+    "prefix": ["da", "new yo", "fran", "sao p", "lon", "heath"],
+    "typo": ["Dalas", "lndon", "Frankfrut", "tokio", "Barcelnoa", "Amsterdm"],
+}
+
+
+def per_call_us(fn, queries: List[str], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            fn(q)
+    return (time.perf_counter() - started) / (repeat * len(queries)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = AirportIndex.from_csv()
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"Built index of {len(index)} places in {build_ms:.1f} ms")
+
+    results = {"places": len(index), "build_ms": build_ms}
+    for kind, queries in QUERIES.items():
+        search_us = per_call_us(index.search, queries, args.repeat)
+        resolve_us = per_call_us(index.resolve, queries, args.repeat)
+        results[f"{kind}_search_us"] = search_us
+        results[f"{kind}_resolve_us"] = resolve_us
+        print(f"{kind:>7}  search {search_us:8.1f} us  resolve {resolve_us:8.1f} us  "
+              f"e.g. {queries[0]!r} -> {getattr(index.resolve(queries[0]), 'code', None)}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, "airports.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"timestamp": time.time(), "revision": git_revision(), **results}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
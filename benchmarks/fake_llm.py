@@ -0,0 +1,107 @@
+"""
+Local OpenAI-compatible chat completions server for offline load tests.
+
+    python -m benchmarks.fake_llm [--port 8100] [--first-token 0.2] [--token-latency 0.01] [--tokens 120]
+
+Point the API at it with LLM_BASE_URL=http://127.0.0.1:8100/v1. Answers
+POST /v1/chat/completions, streamed or not, with a canned summary of
+`--tokens` tokens: the first after `--first-token` seconds and each next
+one `--token-latency` seconds later. Usage is reported like the real API.
+The same settings can be passed as FAKE_LLM_* environment variables.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+FIRST_TOKEN = float(os.getenv("FAKE_LLM_FIRST_TOKEN", "0.2"))
+TOKEN_LATENCY = float(os.getenv("FAKE_LLM_TOKEN_LATENCY", "0.01"))
+TOKENS = int(os.getenv("FAKE_LLM_TOKENS", "120"))
+
+WORDS = (
+    "**Thoughts:** The cheapest option is a solid deal for a one-stop trip, "
+    "and the nonstop is worth a look if time matters more than money. "
+).split()
+
+app = FastAPI(title="Fake LLM")
+
+
+def _prompt_tokens(body: dict) -> int:
+    # Rough word count; close enough for load numbers
+    return sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+
+
+def _tokens(n: int):
+    return [w + " " for w in itertools.islice(itertools.cycle(WORDS), n)]
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "fake", "object": "model", "owned_by": "benchmarks"}]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "fake")
+    tokens = _tokens(TOKENS)
+    usage = {"prompt_tokens": _prompt_tokens(body), "completion_tokens": len(tokens),
+             "total_tokens": _prompt_tokens(body) + len(tokens)}
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(FIRST_TOKEN + TOKEN_LATENCY * max(0, len(tokens) - 1))
+        return {
+            "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                         "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+    def chunk(delta: dict, finish=None, **extra) -> str:
+        payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                   "choices": [{"index": 0, "delta": delta, "finish_reason": finish}], **extra}
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def stream():
+        await asyncio.sleep(FIRST_TOKEN)
+        yield chunk({"role": "assistant", "content": ""})
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(TOKEN_LATENCY)
+            yield chunk({"content": token})
+        yield chunk({}, finish="stop")
+        if include_usage:
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                       "model": model, "choices": [], "usage": usage}
+            yield f"data: {json.dumps(payload)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+def main():
+    global FIRST_TOKEN, TOKEN_LATENCY, TOKENS
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--first-token", type=float, default=FIRST_TOKEN)
+    parser.add_argument("--token-latency", type=float, default=TOKEN_LATENCY)
+    parser.add_argument("--tokens", type=int, default=TOKENS)
+    args = parser.parse_args()
+    FIRST_TOKEN, TOKEN_LATENCY, TOKENS = args.first_token, args.token_latency, args.tokens
+
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
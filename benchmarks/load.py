@@ -0,0 +1,298 @@
+"""
+Offline load test for the API: no browser, no Groq.
+
+    python -m benchmarks.load [--scenario scrape summarize batch] [--requests 200] [--concurrency 20]
+                              [--routes 20] [--scrape-latency 0.5] [--first-token 0.2] [--token-latency 0.01]
+                              [--url http://127.0.0.1:8000]
+
+Starts benchmarks.fake_llm and `uvicorn app:app` with SCRAPE_BACKEND=stub
+and LLM_BASE_URL pointing at the fake server (or, with --url, targets an
+API that is already running), then fires --requests requests per scenario
+from --concurrency concurrent clients:
+
+    scrape     POST /scrape, then poll GET /jobs/{id} until it finishes
+    summarize  GET /summarize for a scraped route (routes are seeded first)
+    batch      POST /scrape/batch with --batch-size queries, reading all NDJSON lines
+
+Requests are spread over --routes distinct routes, so more routes means
+fewer cache hits. Reports throughput, p50/p95/p99 latency, 429s and errors,
+and the server's event-loop lag over the run (from /metrics). Results are
+appended to benchmarks/results/load.jsonl and compared with the previous
+run of the same configuration.
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.startup import RESULTS_DIR, ROOT, free_port, git_revision
+
+SCENARIOS = ("scrape", "summarize", "batch")
+CODES = ["JFK", "LAX", "ORD", "DFW", "ATL", "SFO", "SEA", "MIA", "BOS", "DEN",
+         "LHR", "CDG", "FRA", "AMS", "MAD", "NRT", "SIN", "DXB", "SYD", "YYZ"]
+# Each scenario scrapes its own month so one does not warm the next one's cache
+MONTHS = {"scrape": "March 2027", "summarize": "March 2027", "batch": "April 2027"}
+LAG_METRIC = "autoflights_event_loop_lag_seconds"
+
+
+def routes(count: int, seed: int = 0) -> List[Tuple[str, str]]:
+    pairs = [(a, b) for a, b in itertools.permutations(CODES, 2)]
+    random.Random(seed).shuffle(pairs)
+    return pairs[:count]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+async def wait_ready(url: str, proc: Optional[subprocess.Popen], path: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc is not None and proc.poll() is not None:
+                raise RuntimeError(f"{url} exited with code {proc.returncode}")
+            try:
+                if (await client.get(url + path, timeout=1)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    raise TimeoutError(f"No response from {url}{path} within {timeout:.0f}s")
+
+
+@contextlib.contextmanager
+def spawn(args: List[str], env: Dict[str, str]):
+    proc = subprocess.Popen([sys.executable, *args], cwd=ROOT, env={**os.environ, **env})
+    try:
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# Server-side event-loop lag, from the histogram in /metrics
+async def lag_buckets(client: httpx.AsyncClient) -> Dict[float, float]:
+    text = (await client.get("/metrics")).text
+    buckets = {}
+    for line in text.splitlines():
+        if line.startswith(f"{LAG_METRIC}_bucket{{"):
+            labels, value = line.rsplit(" ", 1)
+            le = labels.split('le="', 1)[1].split('"', 1)[0]
+            buckets[float(le)] = float(value)
+    return buckets
+
+
+def lag_summary(before: Dict[float, float], after: Dict[float, float]) -> Dict:
+    """Bucket upper bounds (ms) holding p50/p95/p99 of the lag samples taken during the run."""
+    cumulative = sorted((le, after[le] - before.get(le, 0.0)) for le in after)
+    total = cumulative[-1][1] if cumulative else 0.0
+    summary = {"lag_samples": int(total)}
+    for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        bound = next((le for le, n in cumulative if total and n >= q * total), None)
+        summary[f"lag_{name}_ms"] = None if bound is None or bound == float("inf") else bound * 1000
+    return summary
+
+
+# Scenarios: each returns the HTTP status of the request it timed
+async def scrape_once(client: httpx.AsyncClient, origin: str, destination: str, month: str,
+                      headers: Optional[Dict] = None, poll: float = 0.05) -> int:
+    res = await client.post("/scrape", json={"origin": origin, "destination": destination, "month": month},
+                            headers=headers)
+    if res.status_code != 200:
+        return res.status_code
+    job_id = res.json()["job_id"]
+    while True:
+        job = (await client.get(f"/jobs/{job_id}")).json()
+        if job["status"] == "done":
+            return 200
+        if job["status"] in ("failed", "timeout", "cancelled"):
+            return 500
+        await asyncio.sleep(poll)
+
+
+async def summarize_once(client: httpx.AsyncClient, origin: str, destination: str, month: str,
+                         headers: Optional[Dict] = None) -> int:
+    res = await client.get("/summarize", params={"origin": origin, "destination": destination}, headers=headers)
+    return res.status_code
+
+
+async def batch_once(client: httpx.AsyncClient, queries: List[Dict], headers: Optional[Dict] = None) -> int:
+    async with client.stream("POST", "/scrape/batch", json={"queries": queries}, headers=headers) as res:
+        if res.status_code != 200:
+            return res.status_code
+        lines = [json.loads(line) async for line in res.aiter_lines() if line.strip()]
+    return 500 if len(lines) != len(queries) or any(line.get("error") for line in lines) else 200
+
+
+async def run_scenario(base_url: str, scenario: str, args) -> Dict:
+    pool = routes(args.routes)
+    month = MONTHS[scenario]
+    rng = random.Random(scenario)
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        if scenario == "summarize":
+            await asyncio.gather(*(scrape_once(client, o, d, month, {"X-Client-ID": f"seed-{i}"})
+                                   for i, (o, d) in enumerate(pool)))
+
+        def request(worker: int):
+            # One client ID per virtual user, so admission queues them fairly
+            headers = {"X-Client-ID": f"load-{worker}"}
+            if scenario == "batch":
+                queries = [{"origin": o, "destination": d, "month": month}
+                           for o, d in rng.sample(pool, min(args.batch_size, len(pool)))]
+                return batch_once(client, queries, headers)
+            origin, destination = rng.choice(pool)
+            fn = scrape_once if scenario == "scrape" else summarize_once
+            return fn(client, origin, destination, month, headers)
+
+        counter = itertools.count()
+        latencies: List[float] = []
+        statuses: Dict[int, int] = {}
+
+        async def user(worker: int):
+            # Closed loop: each client sends its next request when the last one answers
+            while next(counter) < args.requests:
+                started = time.perf_counter()
+                try:
+                    status = await request(worker)
+                except httpx.HTTPError:
+                    status = 0
+                if status == 200:
+                    latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        before = await lag_buckets(client)
+        started = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        after = await lag_buckets(client)
+        llm = (await client.get("/cache/stats")).json().get("llm", {})
+
+    return {
+        "requests": args.requests,
+        "ok": statuses.get(200, 0),
+        "rejected": statuses.get(429, 0),
+        "errors": sum(n for s, n in statuses.items() if s not in (200, 429)),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(statuses.get(200, 0) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 1),
+        **lag_summary(before, after),
+        "llm_calls": llm.get("calls"),
+    }
+
+
+def previous_run(path: str, scenario: str, config: Dict) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry.get("scenario") == scenario and entry.get("config") == config:
+                last = entry
+    return last
+
+
+def report(scenario: str, result: Dict, previous: Optional[Dict]):
+    lag = "/".join("-" if result[f"lag_{p}_ms"] is None else f"<={result[f'lag_{p}_ms']:g}"
+                   for p in ("p50", "p95", "p99"))
+    print(f"{scenario:>9}  {result['throughput_rps']:8.2f} req/s  "
+          f"p50 {result['p50_ms']:8.1f}  p95 {result['p95_ms']:8.1f}  p99 {result['p99_ms']:8.1f} ms  "
+          f"429 {result['rejected']:4d}  errors {result['errors']:4d}  loop lag {lag} ms")
+    if previous:
+        old = previous["result"]
+        deltas = []
+        for key in ("throughput_rps", "p95_ms", "p99_ms"):
+            if old.get(key):
+                deltas.append(f"{key} {(result[key] - old[key]) / old[key] * 100:+.1f}%")
+        print(f"{'':>9}  vs {previous.get('revision') or 'previous run'}: {', '.join(deltas)}")
+
+
+async def run(args):
+    config = {k: getattr(args, k) for k in (
+        "requests", "concurrency", "routes", "batch_size", "scrape_latency",
+        "first_token", "token_latency", "tokens", "scrape_concurrency",
+    )}
+    if args.url:
+        config["url"] = args.url
+    path = os.path.join(RESULTS_DIR, "load.jsonl")
+
+    async def run_all(base_url: str):
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        for scenario in args.scenario:
+            result = await run_scenario(base_url, scenario, args)
+            report(scenario, result, previous_run(path, scenario, config))
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"timestamp": time.time(), "revision": git_revision(),
+                                    "scenario": scenario, "config": config, "result": result}) + "\n")
+
+    if args.url:
+        await wait_ready(args.url, None, "/healthz")
+        await run_all(args.url.rstrip("/"))
+        return
+
+    llm_port, api_port = free_port(), free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        llm_env = {
+            "FAKE_LLM_FIRST_TOKEN": str(args.first_token),
+            "FAKE_LLM_TOKEN_LATENCY": str(args.token_latency),
+            "FAKE_LLM_TOKENS": str(args.tokens),
+        }
+        api_env = {
+            "SCRAPE_BACKEND": "stub",
+            "SCRAPE_STUB_LATENCY": str(args.scrape_latency),
+            "SCRAPE_CONCURRENCY": str(args.scrape_concurrency),
+            "ADMISSION_QUEUE_DEPTH": str(max(20, args.concurrency * 2)),
+            "LLM_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+            "GROQ_API_KEY": "fake",
+            "AUTOFLIGHTS_DB": os.path.join(tmp, "load.db"),
+            "LOG_LEVEL": "WARNING",
+        }
+        with spawn(["-m", "uvicorn", "benchmarks.fake_llm:app", "--port", str(llm_port), "--log-level", "warning"],
+                   llm_env) as llm, \
+             spawn(["-m", "uvicorn", "app:app", "--port", str(api_port), "--log-level", "warning"], api_env) as api:
+            await wait_ready(f"http://127.0.0.1:{llm_port}", llm, "/v1/models")
+            await wait_ready(f"http://127.0.0.1:{api_port}", api, "/healthz")
+            await run_all(f"http://127.0.0.1:{api_port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent clients")
+    parser.add_argument("--routes", type=int, default=20, help="distinct routes; fewer means more cache hits")
+    parser.add_argument("--batch-size", type=int, default=5, help="queries per batch request")
+    parser.add_argument("--scrape-latency", type=float, default=0.5, help="seconds per stub scrape")
+    parser.add_argument("--first-token", type=float, default=0.2, help="fake LLM seconds to first token")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="fake LLM seconds per later token")
+    parser.add_argument("--tokens", type=int, default=120, help="fake LLM tokens per completion")
+    parser.add_argument("--scrape-concurrency", type=int, default=16, help="SCRAPE_CONCURRENCY for the API")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--url", help="load an API that is already running instead of starting one")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
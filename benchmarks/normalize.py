@@ -0,0 +1,130 @@
+"""
+Micro-benchmark for flight row parsing and text normalisation.
+
+    python -m benchmarks.normalize [--rows 10000] [--repeat 5]
+
+Builds a corpus by cycling the rows in flight_data.json (which include the
+glued airline/time junk seen in real scrapes) and times the previous
+clean-up chain (str.replace chain, latin1 round-trip and normalize_spacing's
+regex passes) against Flight.from_row plus dedupe_and_sort. Results are
+appended to benchmarks/results/normalize.jsonl.
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.startup import RESULTS_DIR, ROOT, git_revision
+from flights import Flight, dedupe_and_sort
+
+FIELDS = ["airline", "price", "duration", "stops", "departure", "arrival"]
+
+
+def load_corpus(rows: int) -> List[Dict[str, str]]:
+    """`rows` rows cycled from flight_data.json, each pass repriced so every row stays unique."""
+    with open(os.path.join(ROOT, "flight_data.json"), encoding="utf-8") as f:
+        seed = [{k: str(r.get(k, "")) for k in FIELDS} for r in json.load(f)]
+    corpus = []
+    for i, row in enumerate(itertools.islice(itertools.cycle(seed), rows)):
+        price = int(re.sub(r"[^\d]", "", row["price"])) + i // len(seed)
+        corpus.append({**row, "price": f"${price:,}"})
+    return corpus
+
+
+# The pre-Flight pipeline, kept here as the baseline
+def _legacy_spacing(text: str) -> str:
+    if not text:
+        return ""
+    text = re.sub(r'(?<=\d)(AM|PM)(?=\S)', r' \1 ', text)
+    text = re.sub(r'(?<=\d)\s*(AM|PM)', r' \1', text)
+    text = re.sub(r'(AM|PM)(?=[A-Za-z])', r'\1 ', text)
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    text = re.sub(r"(\d)([A-Z])", r"\1 \2", text)
+    text = re.sub(r"([A-Z]{3})([A-Z])", r"\1 \2", text)
+    text = re.sub(r"([a-z])([A-Z]{3})", r"\1 \2", text)
+    text = text.replace("Airport ", "Airport, ")
+    text = text.replace("min", " min")
+    text = text.replace("  ", " ")
+    return text.strip()
+
+
+def legacy(rows: List[Dict[str, str]]) -> List[Dict]:
+    flights = []
+    for row in rows:
+        lines = [ln.strip() for ln in row["airline"].splitlines() if ln.strip()]
+        airline = lines[-1].replace("round trip", "").strip() if lines else "N/A"
+        m = re.search(r'([$€£]\s?\d[\d,]*)', row["price"])
+        if not m or airline in ("", "N/A") or airline.isdigit():
+            continue
+        price = m.group(1).replace(" ", "")
+        duration = row["duration"].strip().splitlines()[0].strip() if row["duration"] else ""
+        flights.append({
+            "airline": airline, "price": price, "price_number": int(re.sub(r"[^\d]", "", price)),
+            "duration": re.sub(r"[A-Z]{3}–[A-Z]{3}", "", duration).strip(),
+            "stops": row["stops"].strip().splitlines()[0].strip() if row["stops"] else "",
+            "departure": row["departure"], "arrival": row["arrival"],
+        })
+    seen, deduped = set(), []
+    for f in flights:
+        key = (f["airline"], f["departure"], f["arrival"], f["price"])
+        if key not in seen:
+            seen.add(key)
+            deduped.append(f)
+    flights = sorted(deduped, key=lambda x: x["price_number"])
+    for f in flights:
+        for k in ["departure", "arrival", "airline", "duration", "stops"]:
+            if f.get(k):
+                f[k] = (
+                    f[k].encode("latin1", "ignore").decode("utf-8", "ignore")
+                    .replace("â€¯", " ").replace("â€“", "-").replace("â€”", "-")
+                    .replace("Â", "").replace("Ã", "").replace("\u202f", " ").replace("\xa0", " ")
+                    .replace("†", "").replace("¤", "").replace("‰", "").replace("œ", "oe")
+                    .replace("”", "").replace("“", "").replace("‘", "").replace("’", "")
+                    .replace("�", "").strip()
+                )
+                f[k] = _legacy_spacing(f[k])
+    return flights
+
+
+def typed(rows: List[Dict[str, str]]) -> List[Dict]:
+    parsed = [f for f in map(Flight.from_row, rows) if f is not None]
+    return [f.to_dict() for f in dedupe_and_sort(parsed)]
+
+
+def bench(fn: Callable, rows: List[Dict[str, str]], repeat: int) -> Dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn(rows)
+        samples.append(time.perf_counter() - started)
+    best = min(samples)
+    return {"best": best, "median": statistics.median(samples),
+            "us_per_row": best / len(rows) * 1e6, "flights_out": len(out)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = load_corpus(args.rows)
+    results = {name: bench(fn, rows, args.repeat) for name, fn in [("legacy", legacy), ("typed", typed)]}
+    for name, r in results.items():
+        print(f"{name:<7} best {r['best'] * 1000:8.1f} ms   {r['us_per_row']:6.2f} us/row   "
+              f"{r['flights_out']} unique flights")
+    speedup = results["legacy"]["best"] / results["typed"]["best"]
+    print(f"speedup {speedup:.2f}x over {args.rows} rows")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, "normalize.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"timestamp": time.time(), "revision": git_revision(), "rows": args.rows,
+                            "speedup": speedup, **results}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
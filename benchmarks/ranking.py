@@ -0,0 +1,100 @@
+"""
+Ranking benchmark on synthetic result sets.
+
+    python -m benchmarks.ranking [--sizes 10000 100000 1000000] [--repeat 3]
+
+For each size, times the NumPy weighted score, Pareto frontier and top-k
+per airline on columnar data, and, up to --python-max rows, rank_flights
+end to end on flight dicts next to the old pure-Python price sort.
+Results are appended to benchmarks/results/ranking.jsonl.
+"""
+import argparse
+import json
+import os
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.startup import RESULTS_DIR, git_revision
+from ranking import pareto_frontier, rank_flights, top_k_per_airline, weighted_scores
+
+AIRLINES = 40
+
+
+def synthetic_columns(n: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    stops = rng.integers(0, 4, n).astype(np.float64)
+    duration = rng.integers(60, 600, n) + stops * rng.integers(45, 300, n)
+    # Fewer stops tend to cost more, so the frontier is non-trivial
+    price = rng.integers(80, 1500, n) + (3 - stops) * 60
+    return {
+        "price": price.astype(np.float64),
+        "duration": duration.astype(np.float64),
+        "stops": stops,
+        "airline": rng.integers(0, AIRLINES, n),
+    }
+
+
+def to_dicts(columns: Dict[str, np.ndarray]) -> List[Dict]:
+    return [
+        {"airline": f"Airline {a}", "price_number": int(p), "duration_minutes": int(d), "stop_count": int(s)}
+        for p, d, s, a in zip(*(columns[k].tolist() for k in ("price", "duration", "stops", "airline")))
+    ]
+
+
+def best_of(fn: Callable, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return min(samples)
+
+
+def run_size(n: int, repeat: int, python_max: int) -> Dict:
+    cols = synthetic_columns(n)
+    score = weighted_scores(cols)
+    result = {
+        "rows": n,
+        "score_ms": best_of(lambda: weighted_scores(cols), repeat) * 1000,
+        "argsort_ms": best_of(lambda: np.argsort(score, kind="stable"), repeat) * 1000,
+        "pareto_ms": best_of(lambda: pareto_frontier(cols["price"], cols["duration"], cols["stops"]), repeat) * 1000,
+        "top3_per_airline_ms": best_of(lambda: top_k_per_airline(cols["airline"], score, 3), repeat) * 1000,
+        "pareto_size": int(len(pareto_frontier(cols["price"], cols["duration"], cols["stops"]))),
+    }
+    if n <= python_max:
+        flights = to_dicts(cols)
+        result["rank_flights_ms"] = best_of(lambda: rank_flights(flights, per_airline=3), repeat) * 1000
+        result["python_price_sort_ms"] = best_of(
+            lambda: sorted(flights, key=lambda x: x["price_number"]), repeat
+        ) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--python-max", type=int, default=100_000,
+                        help="largest size to also run on flight dicts")
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        r = run_size(n, args.repeat, args.python_max)
+        results.append(r)
+        line = (f"{n:>9,} rows  score {r['score_ms']:8.2f} ms  argsort {r['argsort_ms']:8.2f} ms  "
+                f"pareto {r['pareto_ms']:8.2f} ms ({r['pareto_size']} rows)  top3/airline {r['top3_per_airline_ms']:8.2f} ms")
+        if "rank_flights_ms" in r:
+            line += f"  rank_flights {r['rank_flights_ms']:8.1f} ms  python sort {r['python_price_sort_ms']:8.1f} ms"
+        print(line)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, "ranking.jsonl"), "a", encoding="utf-8") as f:
+        for r in results:
+            f.write(json.dumps({"timestamp": time.time(), "revision": git_revision(), **r}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
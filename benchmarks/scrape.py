@@ -0,0 +1,187 @@
+"""
+End-to-end scrape benchmark over recorded fixtures, fully offline.
+
+Record a fixture once (needs network):
+
+    python -m benchmarks.scrape record Dallas Paris "Jan 2026"
+
+Replay every recorded fixture with cold (fresh browser per run) and warm
+(one pooled browser) runs:
+
+    python -m benchmarks.scrape run [--runs 5] [--mode cold|warm|both]
+
+Reports wall time per phase (launch, goto, wait, scroll, extract,
+normalise) and rows per second, and appends each run to
+benchmarks/results/scrape.jsonl.
+
+Measure what a persistent profile (disk HTTP cache + saved consent
+cookies) saves on live repeat queries (needs network):
+
+    python -m benchmarks.scrape repeat Dallas Paris "Jan 2026" [--runs 5] [--profile DIR]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.startup import RESULTS_DIR, ROOT, git_revision
+from browser_pool import BrowserPool
+from googleflights_auto import scrape_flights
+from logs import configure_logging
+from replay import fixture_name, list_fixtures
+
+PHASES = ["launch", "goto", "wait", "scroll", "extract", "normalise", "total"]
+DEFAULT_FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+
+
+async def record(origin: str, destination: str, month: str, fixtures: str):
+    fixture = os.path.join(fixtures, fixture_name(origin, destination, month))
+    flights, _, timings = await scrape_flights(
+        origin, destination, month, fast=True, headless=True, fixture=fixture, record=True
+    )
+    print(f"Recorded {len(flights)} flights into {fixture} ({timings.get('total', 0):.1f}s)")
+
+
+async def replay_runs(fixture: Dict, runs: int, warm: bool) -> List[Dict]:
+    """Scrape one fixture `runs` times; warm runs share one pooled browser."""
+    query = (fixture["origin"], fixture["destination"], fixture["month"])
+    samples = []
+    pool = None
+    if warm:
+        pool = BrowserPool(size=1, max_uses=runs + 1, headless=True)
+        await pool.start()
+    try:
+        for _ in range(runs):
+            started = time.perf_counter()
+            if pool:
+                async with pool.context() as context:
+                    flights, _, timings = await scrape_flights(
+                        *query, context=context, fast=True, fixture=fixture["fixture"]
+                    )
+            else:
+                flights, _, timings = await scrape_flights(
+                    *query, fast=True, headless=True, fixture=fixture["fixture"]
+                )
+            wall = time.perf_counter() - started
+            samples.append({"wall": wall, "rows": len(flights), **timings})
+    finally:
+        if pool:
+            await pool.stop()
+    return samples
+
+
+async def repeat_runs(query, runs: int, profile_dir: Optional[str] = None) -> List[Dict]:
+    """Live scrapes of one query on a single pooled browser, fresh contexts or a persistent profile."""
+    storage_state = os.path.join(profile_dir, "storage_state.json") if profile_dir else None
+    pool = BrowserPool(size=1, max_uses=runs + 1, headless=True,
+                       profile_dir=profile_dir, storage_state=storage_state)
+    await pool.start()
+    samples = []
+    try:
+        for _ in range(runs):
+            started = time.perf_counter()
+            async with pool.context() as context:
+                flights, _, timings = await scrape_flights(*query, context=context, fast=True)
+            samples.append({"wall": time.perf_counter() - started, "rows": len(flights), **timings})
+    finally:
+        await pool.stop()
+    return samples
+
+
+async def repeat(origin: str, destination: str, month: str, runs: int, profile_dir: Optional[str] = None):
+    query = (origin, destination, month)
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        profile_dir = profile_dir or os.path.join(scratch, "profile")
+        for label, profile in (("fresh", None), ("profile", profile_dir)):
+            samples = await repeat_runs(query, runs, profile)
+            # The first profile run fills the cache; repeats are what it should speed up
+            summary = summarize(samples[1:] or samples)
+            print_report(f"{origin} -> {destination} ({month}) [{label}, repeats]", summary)
+            results.append({"query": list(query), "browser": label, "runs": runs, **summary})
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, "scrape.jsonl"), "a", encoding="utf-8") as f:
+        for r in results:
+            f.write(json.dumps({"timestamp": time.time(), "revision": git_revision(), **r}) + "\n")
+
+
+def summarize(samples: List[Dict]) -> Dict:
+    summary = {}
+    for phase in PHASES + ["wall"]:
+        values = [s[phase] for s in samples if phase in s]
+        if values:
+            summary[phase] = {"mean": statistics.mean(values), "p50": statistics.median(values)}
+    rows = sum(s["rows"] for s in samples)
+    wall = sum(s["wall"] for s in samples)
+    summary["rows_per_second"] = rows / wall if wall else 0.0
+    return summary
+
+
+def print_report(label: str, summary: Dict):
+    print(f"\n{label}")
+    for phase in PHASES + ["wall"]:
+        if phase in summary:
+            print(f"  {phase:<10} mean {summary[phase]['mean'] * 1000:9.1f} ms   p50 {summary[phase]['p50'] * 1000:9.1f} ms")
+    print(f"  rows/s     {summary['rows_per_second']:.1f}")
+
+
+async def run(runs: int, mode: str, fixtures: str):
+    found = list_fixtures(fixtures)
+    if not found:
+        print(f"No fixtures under {fixtures}. Record one first.", file=sys.stderr)
+        sys.exit(1)
+
+    results = []
+    for fixture in found:
+        for warm in {"cold": [False], "warm": [True], "both": [False, True]}[mode]:
+            label = f"{os.path.basename(fixture['fixture'])} [{'warm' if warm else 'cold'}]"
+            summary = summarize(await replay_runs(fixture, runs, warm))
+            print_report(label, summary)
+            results.append({"fixture": os.path.basename(fixture["fixture"]),
+                            "browser": "warm" if warm else "cold", "runs": runs, **summary})
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, "scrape.jsonl"), "a", encoding="utf-8") as f:
+        for r in results:
+            f.write(json.dumps({"timestamp": time.time(), "revision": git_revision(), **r}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="fixture directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="record a live query into a fixture")
+    rec.add_argument("origin")
+    rec.add_argument("destination")
+    rec.add_argument("month")
+
+    bench = sub.add_parser("run", help="replay every fixture offline and report timings")
+    bench.add_argument("--runs", type=int, default=5)
+    bench.add_argument("--mode", choices=["cold", "warm", "both"], default="both")
+
+    rep = sub.add_parser("repeat", help="live repeat queries: fresh contexts vs a persistent profile")
+    rep.add_argument("origin")
+    rep.add_argument("destination")
+    rep.add_argument("month")
+    rep.add_argument("--runs", type=int, default=5)
+    rep.add_argument("--profile", help="profile directory to reuse (default: a temporary one)")
+
+    args = parser.parse_args()
+    configure_logging(json_logs=False)
+    if args.command == "record":
+        asyncio.run(record(args.origin, args.destination, args.month, args.fixtures))
+    elif args.command == "repeat":
+        asyncio.run(repeat(args.origin, args.destination, args.month, args.runs, args.profile))
+    else:
+        asyncio.run(run(args.runs, args.mode, args.fixtures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Startup benchmark: import-time report for the API module plus
+time-to-first-request for a fresh uvicorn process.
+
+    python -m benchmarks.startup [--module app] [--top 15] [--no-server]
+
+Each run is appended to benchmarks/results/startup.jsonl so regressions
+show up over time.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def import_times(module: str) -> List[Dict]:
+    """Run `python -X importtime -c 'import <module>'` and parse its report."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return rows
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_request(module: str, timeout: float = 120.0) -> float:
+    """Seconds from spawning uvicorn until GET /healthz answers."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1) as res:
+                    if res.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.05)
+        raise TimeoutError(f"No response from /healthz within {timeout:.0f}s")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app", help="module to import and serve (default: app)")
+    parser.add_argument("--top", type=int, default=15, help="how many top-level imports to list")
+    parser.add_argument("--no-server", action="store_true", help="skip the time-to-first-request run")
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    total_ms = next(r["cumulative_ms"] for r in reversed(rows) if r["module"] == args.module)
+    top = sorted((r for r in rows if r["depth"] == 1), key=lambda r: r["cumulative_ms"], reverse=True)[:args.top]
+
+    print(f"import {args.module}: {total_ms:.1f} ms")
+    for r in top:
+        print(f"  {r['cumulative_ms']:9.1f} ms  {r['module']}")
+
+    result = {
+        "timestamp": time.time(),
+        "revision": git_revision(),
+        "module": args.module,
+        "import_ms": round(total_ms, 1),
+        "top_imports": [{"module": r["module"], "cumulative_ms": r["cumulative_ms"]} for r in top],
+    }
+    if not args.no_server:
+        ttfr = time_to_first_request(args.module)
+        result["time_to_first_request_s"] = round(ttfr, 3)
+        print(f"time to first request: {ttfr:.3f} s")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, "startup.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Response encoding benchmark for multi-route scrape results.
+
+    python -m benchmarks.wire [--routes 1 10 50] [--repeat 20]
+
+Builds a batch-style payload of --routes scrape results from the rows in
+flight_data.json and times FastAPI's default encoder (jsonable_encoder +
+json.dumps) against orjson and MessagePack, full and projected to the six
+columns the frontend shows, plus gzip and zstd on top. Reports encode time
+and bytes on the wire. Results are appended to benchmarks/results/wire.jsonl.
+"""
+import argparse
+import json
+import os
+import time
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.startup import RESULTS_DIR, ROOT, git_revision
+from flights import Flight, dedupe_and_sort
+from wire import compress, dumps, shape_result
+
+FRONTEND_FIELDS = ("airline", "price", "duration", "stops", "departure", "arrival")
+
+
+def payload(routes: int) -> Dict:
+    with open(os.path.join(ROOT, "flight_data.json"), encoding="utf-8") as f:
+        rows = json.load(f)
+    flights = [f.to_dict() for f in dedupe_and_sort(filter(None, map(Flight.from_row, rows)))]
+    results = []
+    for i in range(routes):
+        repriced = [{**f, "price_number": f["price_number"] + i} for f in flights]
+        results.append({"status": "ok", "summary": "", "flights": repriced, "table_flights": repriced[:3]})
+    return {"results": results}
+
+
+def best_ms(fn: Callable, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return min(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows: List[Dict] = []
+    for routes in args.routes:
+        full = payload(routes)
+        projected = {"results": [shape_result(r, FRONTEND_FIELDS) for r in full["results"]]}
+        variants = {
+            "fastapi_json": lambda p: json.dumps(jsonable_encoder(p), ensure_ascii=False).encode("utf-8"),
+            "orjson": lambda p: dumps(p),
+            "msgpack": lambda p: dumps(p, msgpack=True),
+        }
+        for shape, data in (("full", full), ("projected", projected)):
+            for name, encode in variants.items():
+                body = encode(data)
+                row = {"routes": routes, "shape": shape, "format": name,
+                       "encode_ms": best_ms(lambda: encode(data), args.repeat), "bytes": len(body)}
+                for coding in ("gzip", "zstd"):
+                    row[f"{coding}_ms"] = best_ms(lambda: compress(body, coding), args.repeat)
+                    row[f"{coding}_bytes"] = len(compress(body, coding))
+                rows.append(row)
+                print(f"{routes:4d} routes  {shape:>9}  {name:>12}  encode {row['encode_ms']:7.2f} ms  "
+                      f"{row['bytes']:9d} B  gzip {row['gzip_bytes']:8d} B ({row['gzip_ms']:.2f} ms)  "
+                      f"zstd {row['zstd_bytes']:8d} B ({row['zstd_ms']:.2f} ms)")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, "wire.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"timestamp": time.time(), "revision": git_revision(), "results": rows}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from playwright.async_api import async_playwright
+
+from metrics import span
+
+log = logging.getLogger("autoflights.browser_pool")
+
+
+def load_storage_state(path: Optional[str]) -> Optional[Dict]:
+    """Read a saved storage state (cookies + localStorage), or None if there is none yet."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        log.warning(f"Ignoring unreadable storage state {path}: {e}")
+        return None
+
+
+async def save_storage_state(context, path: Optional[str]):
+    """
+    Save a context's cookies (e.g. Google's consent choice) for the next
+    context. Written to a temp file and renamed, so concurrent workers
+    always read a complete file and the last writer wins.
+    """
+    if not path:
+        return
+    tmp = f"{path}.{os.getpid()}.{id(context)}.tmp"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        state = await context.storage_state()
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+    except Exception as e:
+        log.warning(f"Could not save storage state to {path}: {e}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def prepare_profile(profile_root: str, index: int) -> str:
+    """
+    Per-worker copy of a Chromium profile. Chromium locks its user data dir,
+    so workers never share one; a new worker starts from `<root>/seed` when
+    it exists (copy a warmed worker dir there to pre-fill new workers).
+    """
+    target = os.path.join(profile_root, f"worker-{index}")
+    seed = os.path.join(profile_root, "seed")
+    if not os.path.exists(target) and os.path.isdir(seed):
+        shutil.copytree(seed, target, ignore=shutil.ignore_patterns("Singleton*", "*.lock", "lockfile"))
+    os.makedirs(target, exist_ok=True)
+    return target
+
+
+class _Slot:
+    """One pooled browser (or persistent context) and the number of scrapes it has served."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser = None
+        self.context = None
+        self.uses = 0
+
+
+class BrowserPool:
+    """
+    Long-lived pool of headless Chromium browsers owned by the API process.
+    Each request borrows one browser exclusively and gets a fresh, isolated
+    BrowserContext on it. Browsers are recycled after `max_uses` scrapes or
+    as soon as they crash or disconnect.
+
+    With a `profile_dir`, each slot is instead a persistent context on its
+    own copy of the profile, keeping a bounded on-disk HTTP cache between
+    scrapes. With a `storage_state` path, cookies such as the consent
+    choice are restored into every context and saved after each scrape.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_uses: Optional[int] = None,
+        headless: Optional[bool] = None,
+        profile_dir: Optional[str] = None,
+        disk_cache_mb: Optional[int] = None,
+        storage_state: Optional[str] = None,
+    ):
+        self.size = size or int(os.getenv("BROWSER_POOL_SIZE", "2"))
+        self.max_uses = max_uses or int(os.getenv("BROWSER_MAX_USES", "50"))
+        if headless is None:
+            headless = os.getenv("BROWSER_HEADLESS", "1").lower() not in ("0", "false", "no")
+        self.headless = headless
+        self.profile_dir = profile_dir or os.getenv("BROWSER_PROFILE_DIR") or None
+        self.disk_cache_mb = disk_cache_mb or int(os.getenv("BROWSER_DISK_CACHE_MB", "256"))
+        self.storage_state = storage_state or os.getenv("BROWSER_STORAGE_STATE") or None
+        self._playwright = None
+        self._slots: Optional[asyncio.Queue] = None
+        self._all: List[_Slot] = []
+
+    @property
+    def persistent(self) -> bool:
+        return bool(self.profile_dir)
+
+    async def start(self):
+        """Start Playwright once and pre-launch every browser in the pool."""
+        self._playwright = await async_playwright().start()
+        self._slots = asyncio.Queue()
+        for i in range(self.size):
+            slot = _Slot(i)
+            await self._launch(slot)
+            self._all.append(slot)
+            self._slots.put_nowait(slot)
+        mode = f"persistent profiles under {self.profile_dir}" if self.persistent else "fresh contexts"
+        log.info(f"Browser pool ready with {self.size} browser(s) using {mode}.")
+
+    async def stop(self):
+        """Close every browser and shut Playwright down."""
+        for slot in self._all:
+            await self._retire(slot)
+        self._all = []
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _launch(self, slot: _Slot):
+        if self.persistent:
+            context = await self._playwright.chromium.launch_persistent_context(
+                prepare_profile(self.profile_dir, slot.index),
+                headless=self.headless,
+                args=[f"--disk-cache-size={self.disk_cache_mb * 1024 * 1024}"],
+            )
+
+            def on_close(_):
+                # A crashed persistent browser closes its context; relaunch on next borrow
+                if slot.context is context:
+                    slot.context = None
+
+            context.on("close", on_close)
+            state = load_storage_state(self.storage_state)
+            if state and state.get("cookies"):
+                await context.add_cookies(state["cookies"])
+            slot.context = context
+        else:
+            slot.browser = await self._playwright.chromium.launch(headless=self.headless)
+        slot.uses = 0
+
+    async def _retire(self, slot: _Slot):
+        browser, slot.browser = slot.browser, None
+        context, slot.context = slot.context, None
+        try:
+            if context is not None:
+                await context.close()
+            if browser is not None:
+                await browser.close()
+        except Exception as e:
+            log.warning(f"Browser {slot.index} did not close cleanly: {e}")
+
+    def _healthy(self, slot: _Slot) -> bool:
+        if self.persistent:
+            return slot.context is not None
+        return slot.browser is not None and slot.browser.is_connected()
+
+    @asynccontextmanager
+    async def _borrow(self):
+        """Borrow one healthy slot exclusively for the duration of the block."""
+        if self._slots is None:
+            raise RuntimeError("Browser pool has not been started.")
+        with span("pool_wait"):
+            slot = await self._slots.get()
+        try:
+            # Health-check: relaunch browsers that crashed or were retired
+            if not self._healthy(slot):
+                await self._retire(slot)
+                await self._launch(slot)
+            slot.uses += 1
+            yield slot
+        finally:
+            try:
+                if slot.uses >= self.max_uses or not self._healthy(slot):
+                    log.info(f"Recycling browser {slot.index} after {slot.uses} use(s).")
+                    await self._retire(slot)
+            finally:
+                self._slots.put_nowait(slot)
+
+    @asynccontextmanager
+    async def browser(self):
+        """Borrow one healthy browser exclusively for the duration of the block."""
+        if self.persistent:
+            raise RuntimeError("A persistent-profile pool lends contexts, not browsers; use context().")
+        async with self._borrow() as slot:
+            yield slot.browser
+
+    @asynccontextmanager
+    async def context(self, **kwargs):
+        """
+        Borrow a browser and yield a BrowserContext for the block: a fresh one
+        that is closed afterwards, or the slot's own persistent context in
+        profile mode. Cookies are saved back to `storage_state` on success.
+        """
+        async with self._borrow() as slot:
+            if self.persistent:
+                yield slot.context
+                if slot.context is not None:
+                    await save_storage_state(slot.context, self.storage_state)
+                return
+            state = load_storage_state(self.storage_state)
+            if state:
+                kwargs.setdefault("storage_state", state)
+            context = await slot.browser.new_context(**kwargs)
+            try:
+                yield context
+                await save_storage_state(context, self.storage_state)
+            finally:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import logging
+import json
+import os
+import time
+import weakref
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from metrics import Counter, Gauge
+
+log = logging.getLogger("autoflights.cache")
+
+_caches: "weakref.WeakSet[ResultCache]" = weakref.WeakSet()
+
+
+def _lookups():
+    for cache in list(_caches):
+        for result in ("hits", "misses", "coalesced"):
+            yield {"cache": cache.name, "result": result}, getattr(cache, result)
+
+
+def _sizes():
+    for cache in list(_caches):
+        yield {"cache": cache.name}, cache._bytes
+
+
+Counter("autoflights_cache_lookups_total", "Cache lookups by result.", ["cache", "result"], collect=_lookups)
+Gauge("autoflights_cache_bytes", "Approximate bytes held in each memory cache.", ["cache"], collect=_sizes)
+
+
+class _InFlight:
+    """A running computation and how many callers are waiting on it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class ResultCache:
+    """
+    TTL cache for JSON-serialisable results with LRU eviction by memory budget,
+    an optional on-disk backend that survives restarts, and coalescing of
+    concurrent identical requests into a single in-flight computation.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        disk_dir: Optional[str] = None,
+    ):
+        self.name = name
+        self.ttl = ttl if ttl is not None else float(os.getenv("CACHE_TTL", "900"))
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("CACHE_MAX_MB", "64")) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        disk_root = disk_dir if disk_dir is not None else os.getenv("CACHE_DIR")
+        self.disk_dir = os.path.join(disk_root, name) if disk_root else None
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        # key -> (expires_at, size_bytes, value), oldest first
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, _InFlight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        _caches.add(self)
+
+    # Memory tier
+    def get(self, key: str) -> Optional[Any]:
+        """Return a fresh cached value or None; counts a hit when found."""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self._drop(key)
+
+        value = self._disk_get(key, now)
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def has(self, key: str) -> bool:
+        """True when `key` would be answered without computing (fresh or in flight); counts nothing."""
+        entry = self._entries.get(key)
+        if key in self._inflight or (entry is not None and entry[0] > time.time()):
+            return True
+        return self._disk_get(key, time.time()) is not None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._store(key, value, expires_at)
+        self._disk_set(key, value, expires_at)
+
+    def _store(self, key: str, value: Any, expires_at: float):
+        size = len(json.dumps(value, ensure_ascii=False, default=str))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (expires_at, size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    # Disk tier
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _disk_get(self, key: str, now: float) -> Optional[Any]:
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if record.get("key") != key:
+            return None
+        if record["expires_at"] <= now:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        # Promote into memory so the next lookup skips the disk
+        self._store(key, record["value"], record["expires_at"])
+        return record["value"]
+
+    def _disk_set(self, key: str, value: Any, expires_at: float):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "expires_at": expires_at, "value": value}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning(f"Could not write {self.name} cache entry to disk: {e}")
+
+    # Coalescing
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool] = lambda value: True,
+        refresh: bool = False,
+    ) -> Any:
+        """
+        Return the cached value for `key`, or run `compute()` once and share the
+        result with every concurrent caller asking for the same key. The shared
+        computation is cancelled only when all of its waiters have gone away.
+        With `refresh`, a cached value is ignored (and replaced by the new
+        result); an in-flight computation is still joined.
+        """
+        value = None if refresh else self.get(key)
+        if value is not None:
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is None:
+            self.misses += 1
+            pending = _InFlight(asyncio.create_task(compute()))
+            self._inflight[key] = pending
+            pending.task.add_done_callback(partial(self._finish, key, should_cache))
+        else:
+            self.coalesced += 1
+
+        pending.waiters += 1
+        try:
+            return await asyncio.shield(pending.task)
+        except asyncio.CancelledError:
+            if pending.waiters == 1 and not pending.task.done():
+                pending.task.cancel()
+            raise
+        finally:
+            pending.waiters -= 1
+
+    def _finish(self, key: str, should_cache: Callable[[Any], bool], task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        if value is not None and should_cache(value):
+            self.set(key, value)
+
+    def stats(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "in_flight": len(self._inflight),
+            "ttl": self.ttl,
+            "disk": bool(self.disk_dir),
+        }
@@ -0,0 +1,227 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# One translate() pass: unify spaces and dashes, drop stray symbols
+_TRANSLATE = str.maketrans({
+    "\t": " ", "\u202f": " ", "\xa0": " ", "\u2009": " ", "\u2007": " ",
+    "–": "-", "—": "-",
+    "œ": "oe",
+    "†": None, "¤": None, "‰": None, "”": None, "“": None, "‘": None, "’": None, "�": None,
+})
+
+# One re.sub pass: repair UTF-8 read as Latin-1 and collapse whitespace runs
+_MOJIBAKE = {"â€¯": " ", "â€“": "-", "â€”": "-", "Â": "", "Ã": ""}
+_JUNK = re.compile("|".join(map(re.escape, _MOJIBAKE)) + r"| {2,}")
+
+# Only known dollar prefixes, and only at the start of a word: "LHR$500" is plain dollars
+_PRICE = re.compile(r"((?<![A-Za-z])(?:CA|MX|NZ|HK|US|A)\$|[$€£₹¥])\s?(\d[\d,]*)")
+_DURATION = re.compile(r"(\d+)\s*h(?:rs?)?(?:\s*(\d+)\s*m(?:in)?)?|(\d+)\s*m(?:in)?")
+_STOPS = re.compile(r"(\d+)\s*stops?", re.IGNORECASE)
+_AIRPORT = re.compile(r"\b[A-Z]{3}\b")
+_TIME = re.compile(r"(\d{1,2}):(\d{2})\s*([AP]M)(?:\s*([+-]\d))?")
+
+# Time and date text that leaks into the airline cell from a parent row element
+_AIRLINE_PREFIX = re.compile(r"^(?:\s*(?:\d{1,2}:\d{2}\s*[AP]M|[+-]\d|on\s+\w{3},\s+\w{3}\s+\d{1,2}|-))+\s*")
+# Words where carrier names were glued together, e.g. "DeltaKLM", "KLMDelta" or "AirwaysAmerican"
+_GLUED = re.compile(r"[A-Za-z]*(?:[a-z][A-Z]|[A-Z][A-Z][a-z])[A-Za-z]*")
+_GLUE_POINT = re.compile(r"(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_CAMEL_CASE_AIRLINES = {
+    "JetBlue", "WestJet", "AirAsia", "easyJet", "SkyWest", "SpiceJet", "IndiGo",
+    "EgyptAir", "SriLankan", "SunExpress", "airBaltic", "flydubai", "AirBaltic",
+}
+# Those names anywhere in a glued word (longest first), so "JetBlueDelta" keeps "JetBlue" whole
+_CAMEL_CASE_AIRLINE = re.compile(
+    "(?:" + "|".join(map(re.escape, sorted(_CAMEL_CASE_AIRLINES, key=len, reverse=True))) + ")(?![a-z])"
+)
+
+# "US$" comes first so USD prices are still written "$"
+CURRENCIES = {"US$": "USD", "$": "USD", "€": "EUR", "£": "GBP", "₹": "INR", "¥": "JPY",
+              "CA$": "CAD", "A$": "AUD", "MX$": "MXN", "NZ$": "NZD", "HK$": "HKD"}
+_SYMBOLS = {code: symbol for symbol, code in CURRENCIES.items()}
+
+
+def normalize_text(text: str) -> str:
+    """Clean one scraped field with a single translate() and a single regex pass."""
+    if not text:
+        return ""
+    text = text.translate(_TRANSLATE)
+    return _JUNK.sub(lambda m: _MOJIBAKE.get(m.group(), " "), text).strip()
+
+
+def _lines(text: str) -> List[str]:
+    return [ln.strip() for ln in normalize_text(text).splitlines() if ln.strip()]
+
+
+def parse_price(text: str) -> Tuple[Optional[int], str]:
+    """'$1,234' -> (1234, 'USD'); (None, '') when there is no amount."""
+    m = _PRICE.search(normalize_text(text))
+    if not m:
+        return None, ""
+    symbol, amount = m.groups()
+    return int(amount.replace(",", "")), CURRENCIES.get(symbol, symbol)
+
+
+def parse_duration(text: str) -> Optional[int]:
+    """'13 hr 15 min' -> 795 minutes."""
+    m = _DURATION.search(text or "")
+    if not m:
+        return None
+    hours, minutes, only_minutes = m.groups()
+    if hours is None:
+        return int(only_minutes)
+    return int(hours) * 60 + int(minutes or 0)
+
+
+def parse_stops(text: str) -> Tuple[Optional[int], Tuple[str, ...]]:
+    """'Nonstop' -> (0, ()); '1 stop in LHR' -> (1, ('LHR',))."""
+    text = " ".join(_lines(text))
+    if "nonstop" in text.lower():
+        return 0, ()
+    m = _STOPS.search(text)
+    if not m:
+        return None, ()
+    return int(m.group(1)), tuple(_AIRPORT.findall(text[m.end():]))
+
+
+def parse_time(text: str) -> Tuple[str, int]:
+    """'5:30 PM+1' -> ('5:30 PM', 1)."""
+    m = _TIME.search(normalize_text(text))
+    if not m:
+        return "", 0
+    hour, minute, meridiem, offset = m.groups()
+    return f"{int(hour)}:{minute} {meridiem}", int(offset or 0)
+
+
+def _split_glued(word: str) -> str:
+    """'JetBlueDelta' -> 'JetBlue, Delta'; known camel-case carriers are never split themselves."""
+    parts, pos = [], 0
+    for m in _CAMEL_CASE_AIRLINE.finditer(word):
+        parts += _GLUE_POINT.split(word[pos:m.start()]) if m.start() > pos else []
+        parts.append(m.group())
+        pos = m.end()
+    if pos < len(word):
+        parts += _GLUE_POINT.split(word[pos:])
+    return ", ".join(parts)
+
+
+def parse_airline(text: str) -> str:
+    """Last line of the airline cell, without leaked times and with glued carrier names split."""
+    lines = _lines(text)
+    if not lines:
+        return ""
+    name = _AIRLINE_PREFIX.sub("", lines[-1].replace("round trip", "")).strip()
+    name = _GLUED.sub(lambda m: _split_glued(m.group()), name)
+    return name.strip(" ,")
+
+
+def _minute_of_day(clock: str, offset: int) -> int:
+    m = _TIME.match(clock)
+    if not m:
+        return 0
+    hour, minute, meridiem, _ = m.groups()
+    return (int(hour) % 12 + (12 if meridiem == "PM" else 0)) * 60 + int(minute) + offset * 1440
+
+
+@dataclass(slots=True)
+class Flight:
+    """One priced itinerary with parsed, typed fields."""
+    airline: str
+    price: int
+    currency: str
+    duration_minutes: Optional[int]
+    stop_count: Optional[int]
+    stop_airports: Tuple[str, ...]
+    departure: str
+    arrival: str
+    departure_offset: int = 0
+    arrival_offset: int = 0
+
+    @classmethod
+    def from_row(cls, row: Dict[str, str]) -> Optional["Flight"]:
+        """Parse one row of raw field text; None when it has no price or airline."""
+        price, currency = parse_price(row.get("price", ""))
+        airline = parse_airline(row.get("airline", ""))
+        if price is None or airline in ("", "N/A") or airline.isdigit():
+            return None
+        duration_lines = _lines(row.get("duration", ""))
+        stop_count, stop_airports = parse_stops(row.get("stops", ""))
+        departure, departure_offset = parse_time(row.get("departure", ""))
+        arrival, arrival_offset = parse_time(row.get("arrival", ""))
+        return cls(
+            airline=airline,
+            price=price,
+            currency=currency,
+            duration_minutes=parse_duration(duration_lines[0] if duration_lines else ""),
+            stop_count=stop_count,
+            stop_airports=stop_airports,
+            departure=departure,
+            arrival=arrival,
+            departure_offset=departure_offset,
+            arrival_offset=arrival_offset,
+        )
+
+    @property
+    def price_text(self) -> str:
+        return f"{_SYMBOLS.get(self.currency, self.currency)}{self.price:,}"
+
+    @property
+    def duration_text(self) -> str:
+        if self.duration_minutes is None:
+            return ""
+        hours, minutes = divmod(self.duration_minutes, 60)
+        if not hours:
+            return f"{minutes} min"
+        return f"{hours} hr {minutes} min" if minutes else f"{hours} hr"
+
+    @property
+    def stops_text(self) -> str:
+        if self.stop_count is None:
+            return ""
+        if self.stop_count == 0:
+            return "Nonstop"
+        text = f"{self.stop_count} stop{'s' if self.stop_count > 1 else ''}"
+        return f"{text} in {', '.join(self.stop_airports)}" if self.stop_airports else text
+
+    @staticmethod
+    def _clock_text(clock: str, offset: int) -> str:
+        return f"{clock}{offset:+d}" if offset else clock
+
+    @property
+    def key(self) -> Tuple:
+        """Identity for de-duplication: the same itinerary at the same price."""
+        return (self.airline, self.price, self.currency, self.departure, self.departure_offset,
+                self.arrival, self.arrival_offset)
+
+    @property
+    def sort_key(self) -> Tuple:
+        """Cheapest first, then shortest, then earliest departure."""
+        return (self.price,
+                self.duration_minutes if self.duration_minutes is not None else float("inf"),
+                _minute_of_day(self.departure, self.departure_offset))
+
+    def to_dict(self) -> Dict:
+        """Display fields under their original keys, plus the typed values."""
+        return {
+            "airline": self.airline,
+            "price": self.price_text,
+            "price_number": self.price,
+            "duration": self.duration_text,
+            "stops": self.stops_text,
+            "departure": self._clock_text(self.departure, self.departure_offset),
+            "arrival": self._clock_text(self.arrival, self.arrival_offset),
+            "currency": self.currency,
+            "duration_minutes": self.duration_minutes,
+            "stop_count": self.stop_count,
+            "stop_airports": list(self.stop_airports),
+            "departure_offset": self.departure_offset,
+            "arrival_offset": self.arrival_offset,
+        }
+
+
+def dedupe_and_sort(flights: Iterable[Flight]) -> List[Flight]:
+    """Drop repeated itineraries (keeping the first) and order by Flight.sort_key."""
+    unique: Dict[Tuple, Flight] = {}
+    for f in flights:
+        unique.setdefault(f.key, f)
+    return sorted(unique.values(), key=lambda f: f.sort_key)
@@ -1,7 +1,61 @@
-import React, { useState } from "react";
+import React, { useEffect, useState } from "react";
 import "./App.css";
 import ReactMarkdown from "react-markdown";
 
+const API_URL = "http://127.0.0.1:8000";
+
+const inputStyle = {
+  padding: "8px",
+  borderRadius: "5px",
+  border: "1px solid #ccc",
+  width: "200px",
+};
+
+// City/airport input with suggestions from /airports; picking one fills in its IATA code
+function AirportInput({ id, placeholder, value, onChange }) {
+  const [options, setOptions] = useState([]);
+
+  useEffect(() => {
+    const q = value.trim();
+    if (q.length < 2) {
+      setOptions([]);
+      return;
+    }
+    // Debounce keystrokes and drop responses for stale queries
+    const controller = new AbortController();
+    const timer = setTimeout(() => {
+      fetch(`${API_URL}/airports?${new URLSearchParams({ q, limit: 8 })}`, { signal: controller.signal })
+        .then((res) => res.json())
+        .then((data) => setOptions(data.results || []))
+        .catch(() => {});
+    }, 150);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [value]);
+
+  return (
+    <>
+      <input
+        type="text"
+        list={`${id}-options`}
+        placeholder={placeholder}
+        value={value}
+        onChange={(e) => onChange(e.target.value)}
+        style={inputStyle}
+      />
+      <datalist id={`${id}-options`}>
+        {options.map((p) => (
+          <option key={`${p.kind}-${p.code}`} value={p.code}>
+            {`${p.name}, ${p.country}`}
+          </option>
+        ))}
+      </datalist>
+    </>
+  );
+}
+
 function App() {
   // State variables
   const [loading, setLoading] = useState(false);
@@ -19,8 +73,18 @@ function App() {
       .replace(/\*\*Thoughts:\*\*\s*\n+/g, '**Thoughts:**\n')
       .replace(/\n{3,}/g, '\n\n');
 
-  // Function to trigger scraper + summarizer
-  const handleSearchFlights = async () => {
+  // Human-readable progress for scraper phases
+  const phaseLabels = {
+    launch: "Opening a browser page...",
+    goto: "Opening Google Flights...",
+    wait: "Flight results detected! Collecting data...",
+    scroll: "Loading more flights...",
+    extract: "Reading flight rows...",
+    normalise: "Cleaning up results...",
+  };
+
+  // Function to trigger scraper + summarizer, rendering results as they stream in
+  const handleSearchFlights = () => {
     if (!origin || !destination || !month) {
       alert("Please fill in all fields before searching!");
       return;
@@ -29,52 +93,52 @@ function App() {
     setLoading(true);
     setSummary("");
     setFlights([]);
+    setTableFlights([]);
     setLogs("Starting search...\n");
 
-    const timers = [];
-
-    const schedule = (msg, delay) => {
-      const id = setTimeout(() => setLogs(msg), delay);
-      timers.push(id);
+    // Only the columns the tables render
+    const fields = "airline,price,duration,stops,departure,arrival";
+    const params = new URLSearchParams({ origin, destination, month, fields });
+    const source = new EventSource(`${API_URL}/scrape/stream?${params}`);
+    const finish = () => {
+      source.close();
+      setLoading(false);
     };
-    // Simulated progress messages
-    setTimeout(() => setLogs("Launching scraper subprocess..."), 2000);
-    setTimeout(() => setLogs("Opening Google Flights..."), 5000);
-    setTimeout(() => setLogs("Collecting flight data..."), 9000);
-    setTimeout(() => setLogs("Running Autogen + LLM summarizer..."), 13000);
-    setTimeout(() => setLogs("Running Autogen + LLM summarizer..."), 13000);
 
+    source.addEventListener("status", (e) => setLogs(JSON.parse(e.data).message));
+    source.addEventListener("phase", (e) => {
+      const { phase } = JSON.parse(e.data);
+      if (phaseLabels[phase]) setLogs(phaseLabels[phase]);
+    });
+    source.addEventListener("flight", (e) => {
+      const { flight } = JSON.parse(e.data);
+      setFlights((prev) => [...prev, flight]);
+    });
+    source.addEventListener("summary", (e) => {
+      const { text } = JSON.parse(e.data);
+      setSummary((prev) => prev + text);
+    });
+    source.addEventListener("done", (e) => {
+      const { result } = JSON.parse(e.data);
+      if (result.status === "ok") {
+        setFlights(result.flights);
+        setTableFlights(result.table_flights || []);
+        setSummary(result.summary);
+        setLogs("Flights scraped and summarized successfully!");
+      } else {
+        setSummary(result.message || "No flights found.");
+        setLogs(" No results found or an issue occurred.");
+      }
+      finish();
+    });
+    source.onerror = (err) => {
+      // Covers both server 'error' events and dropped connections
+      console.error(err);
+      setLogs("Error scraping flights. Check the cities or airports and try again.");
+      finish();
+    };
+  };
 
-    try{
-      // Send scrape request to FastAPI backend
-      const res = await fetch("http://127.0.0.1:8000/scrape", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ origin, destination, month }),
-      });
-
-      const data = await res.json();
-
-      // Handle API response
-      if (data.status === "ok") { 
-        setFlights(data.flights); 
-        setTableFlights(data.table_flights || []); 
-        setSummary(data.summary);
-        setLogs("Flights scraped and summarized successfully!"); 
-      } else { 
-        setSummary(data.message || "No flights found.");
-        setLogs(" No results found or an issue occurred."); 
-      } 
-    } catch (err) {
-      timers.forEach(clearTimeout); 
-      console.error(err); 
-      setSummary("Error scraping flights.");
-      setLogs("Error scraping flights."); 
-    } finally { 
-      setLoading(false); 
-    } 
-  };                
-  
   // UI
   return (
     <div style={{ padding: "40px", fontFamily: "Arial" }}>
@@ -91,41 +155,24 @@ function App() {
           justifyContent: "center",
         }}
       >
-        <input
-          type="text"
+        <AirportInput
+          id="origin"
           placeholder="From (e.g., Dallas)"
           value={origin}
-          onChange={(e) => setOrigin(e.target.value)}
-          style={{
-            padding: "8px",
-            borderRadius: "5px",
-            border: "1px solid #ccc",
-            width: "200px",
-          }}
+          onChange={setOrigin}
         />
-        <input
-          type="text"
+        <AirportInput
+          id="destination"
           placeholder="To (e.g., Paris)"
           value={destination}
-          onChange={(e) => setDestination(e.target.value)}
-          style={{
-            padding: "8px",
-            borderRadius: "5px",
-            border: "1px solid #ccc",
-            width: "200px",
-          }}
+          onChange={setDestination}
         />
         <input
           type="text"
           placeholder="Month (e.g., Jan 2026)"
           value={month}
           onChange={(e) => setMonth(e.target.value)}
-          style={{
-            padding: "8px",
-            borderRadius: "5px",
-            border: "1px solid #ccc",
-            width: "200px",
-          }}
+          style={inputStyle}
         />
         <button
           onClick={handleSearchFlights}
@@ -5,47 +5,229 @@ import sys
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-import re
-import json
+import calendar
+import logging
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
-from playwright.async_api import async_playwright
+from typing import AsyncIterator, Callable, Iterable, List, Dict, Tuple, Optional
+from urllib.parse import urlparse
+from playwright.async_api import async_playwright, Browser, BrowserContext
 from texttable import Texttable
+from airports import exact_code
+from browser_pool import load_storage_state, save_storage_state
+from flights import Flight, dedupe_and_sort, parse_price
+from replay import attach_fixture, save_snapshot
+
+log = logging.getLogger("autoflights.scraper")
 
 # Helpers
-def first_line(s: str) -> str:
-    """Return only the first non-empty line of text."""
-    return (s or "").strip().splitlines()[0].strip() if s else ""
-
-
-def extract_price(s: str) -> Tuple[str, Optional[int]]:
-    """Find first currency amount like $341 and return both display + numeric."""
-    m = re.search(r'([$€£]\s?\d[\d,]*)', s or "")
-    if not m:
-        return "", None
-    disp = m.group(1).replace(" ", "")
-    val = int(re.sub(r"[^\d]", "", disp))
-    return disp, val
-
-
-def extract_airline(s: str) -> str:
-    """Extract clean airline name (last meaningful line)."""
-    lines = [ln.strip() for ln in (s or "").splitlines() if ln.strip()]
-    if not lines:
-        return "N/A"
-    cand = lines[-1]
-    cand = cand.replace("round trip", "").strip()
-    return cand or "N/A"
+def parse_month(month_input: str) -> str:
+    """Parse 'Jan 2026' or 'January 2026' into YYYY-MM, falling back to the current month."""
+    try:
+        parsed = datetime.strptime(month_input, "%b %Y")
+    except:
+        try:
+            parsed = datetime.strptime(month_input, "%B %Y")
+        except:
+            log.warning("Invalid format. Using current month.")
+            parsed = datetime.now()
+    return parsed.strftime("%Y-%m")
+
+def normalize_place(s: str) -> str:
+    """
+    Canonical key for a place, so 'Dallas ', 'dallas' and 'DFW' compare equal:
+    the lower-cased IATA code when the text exactly names a known airport or
+    city, otherwise the lower-cased text with whitespace collapsed.
+    """
+    code = exact_code(s or "")
+    return code.lower() if code else " ".join((s or "").lower().split())
+
+
+def format_table(flights: List[Dict], limit: int = 10) -> str:
+    """Render the cheapest `limit` flights as an ASCII table for the summarizer."""
+    table = Texttable(max_width=0)
+    table.header(["Airline", "Price", "Duration", "Stops", "Departure", "Arrival"])
+    for f in flights[:limit]:
+        table.add_row([
+            f["airline"], f["price"], f["duration"],
+            f["stops"], f["departure"], f["arrival"]
+        ])
+    return table.draw()
+
+# Selectors for one flight row and each field inside it
+ROW_SELECTOR = 'div[role="listitem"], .pIav2d, .Rk10dc, .zBTtmb'
+FIELD_SELECTORS = {
+    "departure": 'span[aria-label*="Departure time"]',
+    "arrival": 'span[aria-label*="Arrival time"]',
+    "airline": ".sSHqwe, .Ir0Voe",
+    "duration": "div.gvkrdb, .Ak5kof",
+    "stops": "div.hF6lYb span.rGRiKd, .Gwsj3b",
+    "price": "div.FpEdX span, .U3gSDe",
+}
+
+# Runs in the page: reads every row's raw field text in a single round-trip
+EXTRACT_ROWS_JS = """
+({rowSelector, fields, limit}) => {
+    const rows = Array.from(document.querySelectorAll(rowSelector));
+    const text = (row, sel) => {
+        const el = row.querySelector(sel);
+        if (!el) return "N/A";
+        try { return (el.innerText || "").trim(); } catch (e) { return "N/A"; }
+    };
+    return {
+        total: rows.length,
+        rows: rows.slice(0, limit).map(row => {
+            const out = {};
+            for (const [name, sel] of Object.entries(fields)) out[name] = text(row, sel);
+            return out;
+        }),
+    };
+}
+"""
+
+
+async def extract_rows(page, max_rows: int = 20) -> Tuple[List[Dict[str, str]], int]:
+    """Pull raw field text for up to `max_rows` flight rows with one page.evaluate call."""
+    result = await page.evaluate(
+        EXTRACT_ROWS_JS,
+        {"rowSelector": ROW_SELECTOR, "fields": FIELD_SELECTORS, "limit": max_rows},
+    )
+    return result["rows"], result["total"]
+
+
+def clean_rows(rows: List[Dict[str, str]]) -> List[Flight]:
+    """Parse raw row text into typed Flight records, dropping rows without a price or airline."""
+    return [f for f in map(Flight.from_row, rows) if f is not None]
+
+# Fast mode: skip heavy assets and trackers
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+)
+
+# Runs in the page: true once at least one row shows a price
+ROWS_READY_JS = r"""
+({rowSelector, priceSelector}) => Array.from(document.querySelectorAll(rowSelector))
+    .some(row => /\d/.test((row.querySelector(priceSelector) || {}).innerText || ""))
+"""
+
+
+async def block_heavy_resources(route):
+    """Abort images, media, fonts and analytics; let everything else through."""
+    request = route.request
+    host = urlparse(request.url).hostname or ""
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or host.endswith(BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.fallback()
+
+
+async def row_count(page) -> int:
+    return await page.evaluate("sel => document.querySelectorAll(sel).length", ROW_SELECTOR)
+
+
+async def adaptive_scroll(page, max_rows: int, max_scrolls: int = 10, settle: float = 1.0) -> int:
+    """Scroll until `max_rows` rows are loaded or the result list stops growing."""
+    count = await row_count(page)
+    for _ in range(max_scrolls):
+        if count >= max_rows:
+            break
+        await page.mouse.wheel(0, 3000)
+
+        # Give new rows up to `settle` seconds to appear
+        grown = count
+        deadline = time.perf_counter() + settle
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(0.2)
+            grown = await row_count(page)
+            if grown > count:
+                break
+        if grown <= count:
+            break
+        count = grown
+    return count
+
+@asynccontextmanager
+async def open_page(
+    context: Optional[BrowserContext] = None,
+    fast: bool = False,
+    headless: bool = False,
+    fixture: Optional[str] = None,
+    record: bool = False,
+    storage_state: Optional[str] = None,
+):
+    """
+    A page in the pooled `context`, or in a browser launched just for it,
+    with fixture routing and fast-mode blocking attached. On a clean exit
+    a launched browser saves its cookies back to `storage_state`.
+    """
+    playwright = browser = None
+    if context is None:
+        playwright = await async_playwright().start()
+        try:
+            browser = await playwright.chromium.launch(headless=headless, slow_mo=0 if fast else 150)
+            state = load_storage_state(storage_state)
+            page = await browser.new_page(**({"storage_state": state} if state else {}))
+        except BaseException:
+            # No page to hand back, so nothing below would close what was started
+            if browser:
+                await browser.close()
+            await playwright.stop()
+            raise
+    else:
+        page = await context.new_page()
+    try:
+        # Fixture routing goes first so the blocking route below can fall back to it
+        if fixture:
+            await attach_fixture(page, fixture, record)
+        if fast:
+            await page.route("**/*", block_heavy_resources)
+        yield page
+        if browser:
+            await save_storage_state(page.context, storage_state)
+    finally:
+        await page.close()
+        if browser:
+            # Closing the context first flushes any HAR being recorded
+            await page.context.close()
+            await browser.close()
+        if playwright:
+            await playwright.stop()
 
 # Main scraper
 async def scrape_flights(
     origin: Optional[str] = None,
     destination: Optional[str] = None,
-    month_input: Optional[str] = None
-) -> Tuple[List[Dict], str]:
-    """Scrape Google Flights using Playwright and return flight data + ASCII table."""
-
-    print("Launching AutoFlights Google Reader...", file=sys.stderr)
+    month_input: Optional[str] = None,
+    context: Optional[BrowserContext] = None,
+    max_rows: int = 20,
+    fast: bool = False,
+    headless: bool = False,
+    on_event: Optional[Callable[[Dict], None]] = None,
+    fixture: Optional[str] = None,
+    record: bool = False,
+    storage_state: Optional[str] = None
+) -> Tuple[List[Dict], str, Dict[str, float]]:
+    """
+    Scrape Google Flights using Playwright and return flight data, ASCII table
+    and phase timings in seconds. Pass a pooled BrowserContext to skip
+    launching a new browser; `max_rows` caps how many result rows are read.
+    Fast mode blocks heavy resources, waits on real flight rows and stops
+    scrolling once the list stops growing. `on_event` receives a 'phase'
+    event as each phase finishes and a 'flight' event per cleaned row,
+    sent before the browser is closed. A failed page load or scroll keeps
+    whatever rows had loaded. With a `fixture` directory the page is served from a recorded HAR
+    (fully offline), or recorded into it when `record` is set. When this
+    call launches its own browser, `storage_state` names a file to restore
+    cookies (e.g. Google's consent choice) from and save them back to.
+    """
+
+    log.info("Launching AutoFlights Google Reader...")
 
     # Get user input if missing
     if not origin:
@@ -55,185 +237,333 @@ async def scrape_flights(
     if not month_input:
         month_input = input("Enter travel month and year (e.g., Jan 2026): ").strip()
 
-    # Parse month safely
-    try:
-        parsed = datetime.strptime(month_input, "%b %Y")
-    except:
-        try:
-            parsed = datetime.strptime(month_input, "%B %Y")
-        except:
-            print("Invalid format. Using current month.", file=sys.stderr)
-            parsed = datetime.now()
-    date_str = parsed.strftime("%Y-%m")
+    date_str = parse_month(month_input)
+    timings: Dict[str, float] = {}
 
-    # Launch Playwright
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False, slow_mo=150)
-        page = await browser.new_page()
+    def emit(event: Dict):
+        if on_event:
+            on_event(event)
 
-        print(f"Opening Google Flights for {origin} -> {destination} ({date_str})...", file=sys.stderr)
+    def mark(phase: str, started: float) -> float:
+        now = time.perf_counter()
+        timings[phase] = round(now - started, 3)
+        emit({"type": "phase", "phase": phase, "seconds": timings[phase]})
+        return now
+
+    # Launch Playwright unless a pooled context was handed in
+    started = scrape_started = time.perf_counter()
+    async with open_page(context, fast, headless, fixture, record, storage_state) as page:
+        started = mark("launch", started)
+        log.info(f"Opening Google Flights for {origin} -> {destination} ({date_str})...")
         url = f"https://www.google.com/travel/flights?q=flights+from+{origin}+to+{destination}+in+{date_str}"
-        await page.goto(url, timeout=120000)
-        print("Click 'Search' if needed — the script will auto-detect flight results.", file=sys.stderr)
+        try:
+            await page.goto(url, timeout=120000)
+        except Exception as e:
+            # A slow page may still have rendered results; the wait below decides
+            log.warning(f"Page load did not finish ({e}); reading whatever loaded.")
+        started = mark("goto", started)
+        log.info("Click 'Search' if needed — the script will auto-detect flight results.")
 
         # Wait for results 
+        ready = True
         try:
-            await page.wait_for_selector('text=$', timeout=180000)
-            print("Flight results detected! Collecting data...", file=sys.stderr)
-        except:
-            print("No flight results detected within time limit.", file=sys.stderr)
-            await browser.close()
-            return [], ""
-
-        # Scroll to load more
-        print("Scrolling to load more flights...", file=sys.stderr)
-        for _ in range(5):
-            await page.mouse.wheel(0, 3000)
-            await asyncio.sleep(2)
-
-        # Get flight blocks
-        flights = await page.query_selector_all('div[role="listitem"], .pIav2d, .Rk10dc, .zBTtmb')
-        print(f"Found {len(flights)} possible flight entries.", file=sys.stderr)
-
-        flight_data = []
-
-        async def get_text(el):
-            if el:
-                try:
-                    return (await el.inner_text()).strip()
-                except:
-                    return "N/A"
-            return "N/A"
-
-        # Extract data
-        for f in flights[:20]:
-            departure_time = await f.query_selector('span[aria-label*="Departure time"]')
-            arrival_time = await f.query_selector('span[aria-label*="Arrival time"]')
-            airline = await f.query_selector(".sSHqwe, .Ir0Voe")
-            duration = await f.query_selector("div.gvkrdb, .Ak5kof")
-            stops = await f.query_selector("div.hF6lYb span.rGRiKd, .Gwsj3b")
-            price = await f.query_selector("div.FpEdX span, .U3gSDe")
-
-            departure = await get_text(departure_time)
-            arrival = await get_text(arrival_time)
-            airline_raw = await get_text(airline)
-            price_raw = await get_text(price)
-            duration_raw = await get_text(duration)
-            stops_raw = await get_text(stops)
-
-            airline_text = extract_airline(airline_raw)
-            price_disp, price_val = extract_price(price_raw)
-            duration_text = re.sub(r"[A-Z]{3}–[A-Z]{3}", "", first_line(duration_raw)).strip()
-            stops_text = first_line(stops_raw)
-
-            if price_val is None or airline_text in ["", "N/A"] or airline_text.isdigit():
-                continue
-
-            flight_data.append({
-                "airline": airline_text,
-                "price": price_disp,
-                "price_number": price_val,
-                "duration": duration_text,
-                "stops": stops_text,
-                "departure": departure,
-                "arrival": arrival
-            })
-
-        # Duplicate + sort
-        seen = set()
-        deduped = []
+            if fast:
+                await page.wait_for_function(
+                    ROWS_READY_JS,
+                    arg={"rowSelector": ROW_SELECTOR, "priceSelector": FIELD_SELECTORS["price"]},
+                    timeout=60000,
+                )
+            else:
+                await page.wait_for_selector('text=$', timeout=180000)
+            log.info("Flight results detected! Collecting data...")
+        except Exception:
+            ready = False
+            log.info("No flight results detected within time limit.")
+        started = mark("wait", started)
+
+        # Scroll to load more; a failure here keeps the rows already loaded
+        if ready:
+            log.info("Scrolling to load more flights...")
+            try:
+                if fast:
+                    await adaptive_scroll(page, max_rows)
+                else:
+                    for _ in range(5):
+                        await page.mouse.wheel(0, 3000)
+                        await asyncio.sleep(2)
+            except Exception as e:
+                log.warning(f"Scrolling stopped early ({e}); keeping the rows loaded so far.")
+            started = mark("scroll", started)
+
+        # Extract every row in one round-trip and hand the flights out before
+        # teardown, so a hang or crash while closing the browser loses nothing
+        rows, total = await extract_rows(page, max_rows)
+        log.info(f"Found {total} possible flight entries.")
+        started = mark("extract", started)
+        flight_data = [f.to_dict() for f in dedupe_and_sort(clean_rows(rows))]
         for f in flight_data:
-            key = (f["airline"], f["departure"], f["arrival"], f["price"])
-            if key not in seen:
-                seen.add(key)
-                deduped.append(f)
-
-        flight_data = sorted(deduped, key=lambda x: x["price_number"])
-        table_text = ""
-
-        # Output table
-        if not flight_data:
-            print("No priced flights found. Try scrolling or changing filters.", file=sys.stderr)
-        else:
-            print(f"Found {len(flight_data)} priced flights.", file=sys.stderr)
-            table = Texttable(max_width=0)
-            table.header(["Airline", "Price", "Duration", "Stops", "Departure", "Arrival"])
-            for f in flight_data[:10]:
-                table.add_row([
-                    f["airline"], f["price"], f["duration"],
-                    f["stops"], f["departure"], f["arrival"]
-                ])
-            table_text = table.draw()
-            print(table_text, file=sys.stderr)
-
-            # Save files
-            with open("flight_data.json", "w", encoding="utf-8") as fjson:
-                json.dump(flight_data, fjson, ensure_ascii=False, indent=4)
-            with open("flight_results.txt", "w", encoding="utf-8") as ftxt:
-                ftxt.write(table_text)
-
-            print("Saved clean results to flight_results.txt and flight_data.json", file=sys.stderr)
-
-        await browser.close()
-
-    # Normalize text
-    def normalize_spacing(text: str) -> str:
-        """Add missing spaces or commas between AM/PM airport names, times, and cities for readability."""
-        if not text:
-            return ""
-        text = re.sub(r'(?<=\d)(AM|PM)(?=\S)', r' \1 ', text)
-        text = re.sub(r'(?<=\d)\s*(AM|PM)', r' \1', text)
-        text = re.sub(r'(AM|PM)(?=[A-Za-z])', r'\1 ', text)
-
-        text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
-        text = re.sub(r"(\d)([A-Z])", r"\1 \2", text)
-        text = re.sub(r"([A-Z]{3})([A-Z])", r"\1 \2", text)
-        text = re.sub(r"([a-z])([A-Z]{3})", r"\1 \2", text)
-
-        text = text.replace("Airport ", "Airport, ")
-        text = text.replace("min", " min")
-
-        text = text.replace("  ", " ")
-        return text.strip()
-
-    # Clean text fields
-    for f in flight_data:
-        for k in ["departure", "arrival", "airline", "duration", "stops"]:
-            if f.get(k):
-                f[k] = (
-                    f[k]
-                    .encode("latin1", "ignore")
-                    .decode("utf-8", "ignore")
-                    .replace("â€¯", " ")
-                    .replace("â€“", "-")
-                    .replace("â€”", "-")
-                    .replace("Â", "")
-                    .replace("Ã", "")
-                    .replace("\u202f", " ")
-                    .replace("\xa0", " ")
-                    .replace("†", "")
-                    .replace("¤", "")
-                    .replace("‰", "")
-                    .replace("œ", "oe")
-                    .replace("”", "")
-                    .replace("“", "")
-                    .replace("‘", "")
-                    .replace("’", "")
-                    .replace("�", "")
-                    .strip()
+            emit({"type": "flight", "flight": f})
+        started = mark("normalise", started)
+        if fixture and record:
+            await save_snapshot(page, fixture, origin, destination, month_input)
+
+    table_text = ""
+    if not flight_data:
+        log.info("No priced flights found. Try scrolling or changing filters.")
+    else:
+        log.info(f"Found {len(flight_data)} priced flights.")
+        table_text = format_table(flight_data)
+        log.info(table_text)
+    mark("total", scrape_started)
+
+    return flight_data, table_text, timings
+
+
+async def scrape_flights_many(
+    queries: Iterable[Tuple[str, str, str]],
+    browser: Optional[Browser] = None,
+    concurrency: int = 4,
+    context: Optional[BrowserContext] = None,
+    **scrape_kwargs
+) -> AsyncIterator[Dict]:
+    """
+    Scrape many (origin, destination, month) queries concurrently in one browser,
+    each in its own context, and yield one result dict per query as soon as it
+    finishes. A failing query yields status 'error' without affecting the rest.
+    Pass a (persistent) `context` to run every query as a page in it instead.
+    """
+    queries = list(queries)
+    playwright = None
+    if browser is None and context is None:
+        playwright = await async_playwright().start()
+        browser = await playwright.chromium.launch(headless=scrape_kwargs.get("headless", True))
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(index: int, query: Tuple[str, str, str]) -> Dict:
+        origin, destination, month = query
+        result = {"index": index, "origin": origin, "destination": destination, "month": month}
+        if not (origin and destination and month):
+            return {**result, "status": "error", "error": "origin, destination and month are required."}
+        async with slots:
+            query_context = context or await browser.new_context()
+            try:
+                flights, table, timings = await scrape_flights(
+                    origin, destination, month, context=query_context, **scrape_kwargs
                 )
-                f[k] = normalize_spacing(f[k])
+                return {**result, "status": "ok" if flights else "no_results",
+                        "flights": flights, "table": table, "timings": timings}
+            except Exception as e:
+                log.warning(f"Query {index} ({origin} -> {destination}) failed: {e}")
+                return {**result, "status": "error", "error": str(e)}
+            finally:
+                if query_context is not context:
+                    await query_context.close()
+
+    tasks = [asyncio.create_task(run_one(i, q)) for i, q in enumerate(queries)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # Stop outstanding scrapes if the consumer goes away early
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if playwright:
+            await browser.close()
+            await playwright.stop()
+
+
+# Price calendar: the date picker shows each day's lowest fare in its grid cell
+CALENDAR_CELL_SELECTOR = 'div[role="gridcell"][data-iso]'
+DEPARTURE_INPUT_SELECTOR = 'input[aria-label*="Departure"], input[placeholder*="Departure"]'
+CALENDAR_NEXT_SELECTOR = 'div[role="dialog"] button[aria-label*="Next"]'
+CALENDAR_DONE_SELECTOR = 'div[role="dialog"] button:has-text("Done")'
+
+# Runs in the page: date and visible text of every grid cell in one month
+CALENDAR_CELLS_JS = """
+({cellSelector, month}) => Array.from(document.querySelectorAll(cellSelector))
+    .filter(cell => (cell.getAttribute("data-iso") || "").startsWith(month))
+    .map(cell => ({
+        date: cell.getAttribute("data-iso"),
+        text: `${(cell.innerText || "").trim()} ${cell.getAttribute("aria-label") || ""}`,
+    }))
+"""
+
+
+def days_in_month(date_str: str) -> int:
+    """'2026-02' -> 28."""
+    year, month = map(int, date_str.split("-"))
+    return calendar.monthrange(year, month)[1]
+
+
+async def read_calendar(page, date_str: str) -> Dict[int, Tuple[int, str]]:
+    """{day: (lowest price, currency)} for every priced cell of `date_str` in the open date grid."""
+    cells = await page.evaluate(CALENDAR_CELLS_JS, {"cellSelector": CALENDAR_CELL_SELECTOR, "month": date_str})
+    prices = {}
+    for cell in cells:
+        amount, currency = parse_price(cell["text"])
+        if amount is not None:
+            prices[int(cell["date"][8:10])] = (amount, currency)
+    return prices
+
+
+async def open_calendar(page, date_str: str, max_pages: int = 12) -> bool:
+    """Open the departure date grid and page forward until `date_str` is shown."""
+    await page.click(DEPARTURE_INPUT_SELECTOR, timeout=15000)
+    await page.wait_for_selector(CALENDAR_CELL_SELECTOR, timeout=15000)
+    selector = f'{CALENDAR_CELL_SELECTOR}[data-iso^="{date_str}"]'
+    for _ in range(max_pages):
+        if await page.query_selector(selector):
+            return True
+        await page.click(CALENDAR_NEXT_SELECTOR, timeout=5000)
+        await asyncio.sleep(0.3)
+    return await page.query_selector(selector) is not None
+
+
+async def settle_calendar(page, date_str: str, timeout: float = 20.0, settle: float = 1.5) -> Dict[int, Tuple[int, str]]:
+    """Poll the grid as its prices stream in, until every day has one or none arrived for `settle` seconds."""
+    days = days_in_month(date_str)
+    prices: Dict[int, Tuple[int, str]] = {}
+    deadline = time.perf_counter() + timeout
+    last_change = time.perf_counter()
+    while time.perf_counter() < deadline:
+        current = await read_calendar(page, date_str)
+        if len(current) > len(prices):
+            prices, last_change = current, time.perf_counter()
+        if len(prices) >= days or time.perf_counter() - last_change >= settle:
+            break
+        await asyncio.sleep(0.25)
+    return prices
+
+
+async def step_to_day(page, date_str: str, day: int, timeout: float = 30.0) -> Optional[Tuple[int, str]]:
+    """
+    Pick `day` in the date grid and read the cheapest result row once the
+    list refreshes: the same page, no reload.
+    """
+    before, _ = await extract_rows(page, 5)
+    await page.click(DEPARTURE_INPUT_SELECTOR, timeout=15000)
+    await page.click(f'{CALENDAR_CELL_SELECTOR}[data-iso="{date_str}-{day:02d}"]', timeout=10000)
+    await page.click(CALENDAR_DONE_SELECTOR, timeout=5000)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(0.5)
+        rows, _ = await extract_rows(page, 5)
+        if rows and rows != before:
+            flights = clean_rows(rows)
+            if flights:
+                cheapest = min(flights, key=lambda f: f.price)
+                return cheapest.price, cheapest.currency
+    return None
+
+
+async def scrape_calendar(
+    origin: str,
+    destination: str,
+    month_input: str,
+    context: Optional[BrowserContext] = None,
+    fast: bool = False,
+    headless: bool = False,
+    max_steps: int = 10,
+    on_event: Optional[Callable[[Dict], None]] = None,
+    fixture: Optional[str] = None,
+    record: bool = False,
+    storage_state: Optional[str] = None
+) -> Tuple[Dict, Dict[str, float]]:
+    """
+    Lowest fare for every departure day of a month from one page: the
+    results page is loaded once, its date grid is read for per-day prices,
+    and up to `max_steps` days the grid left blank are filled by picking
+    them in place and reading the cheapest result row. Returns the
+    calendar ({'month', 'currency', 'prices'}, with prices[d - 1] for day
+    d and None where no fare was found) and phase timings in seconds.
+    """
+    date_str = parse_month(month_input)
+    days = days_in_month(date_str)
+    timings: Dict[str, float] = {}
+
+    def mark(phase: str, started: float) -> float:
+        now = time.perf_counter()
+        timings[phase] = round(now - started, 3)
+        if on_event:
+            on_event({"type": "phase", "phase": phase, "seconds": timings[phase]})
+        return now
+
+    started = scrape_started = time.perf_counter()
+    prices: Dict[int, Tuple[int, str]] = {}
+    async with open_page(context, fast, headless, fixture, record, storage_state) as page:
+        started = mark("launch", started)
+        log.info(f"Opening the price calendar for {origin} -> {destination} ({date_str})...")
+        url = f"https://www.google.com/travel/flights?q=flights+from+{origin}+to+{destination}+in+{date_str}"
+        try:
+            await page.goto(url, timeout=120000)
+        except Exception as e:
+            # As in scrape_flights: a slow page may still have rendered results
+            log.warning(f"Page load did not finish ({e}); reading whatever loaded.")
+        started = mark("goto", started)
 
-    return flight_data, table_text
+        ready = True
+        try:
+            await page.wait_for_function(
+                ROWS_READY_JS,
+                arg={"rowSelector": ROW_SELECTOR, "priceSelector": FIELD_SELECTORS["price"]},
+                timeout=60000,
+            )
+        except Exception:
+            ready = False
+            log.info("No flight results detected within time limit.")
+        started = mark("wait", started)
+
+        if ready:
+            try:
+                if await open_calendar(page, date_str):
+                    prices = await settle_calendar(page, date_str)
+                await page.keyboard.press("Escape")
+            except Exception as e:
+                log.warning(f"Could not read the date grid: {e}")
+            log.info(f"Date grid priced {len(prices)} of {days} days.")
+            started = mark("grid", started)
+
+            missing = [d for d in range(1, days + 1) if d not in prices]
+            for day in missing[:max_steps]:
+                try:
+                    found = await step_to_day(page, date_str, day)
+                except Exception as e:
+                    log.warning(f"Could not step to {date_str}-{day:02d}: {e}")
+                    break
+                if found:
+                    prices[day] = found
+            if missing:
+                started = mark("step", started)
+        if fixture and record:
+            await save_snapshot(page, fixture, origin, destination, month_input)
+    mark("total", scrape_started)
+
+    currencies = [currency for _, currency in prices.values() if currency]
+    return {
+        "month": date_str,
+        "currency": max(set(currencies), key=currencies.count) if currencies else "",
+        "prices": [prices[d][0] if d in prices else None for d in range(1, days + 1)],
+    }, timings
 
 
 # CLI mode 
 async def main():
-    data, table = await scrape_flights(None, None, None)
+    from history import HistoryStore
+
+    origin = input("Enter departure city or airport (e.g., Dallas): ").strip()
+    destination = input("Enter destination city or airport (e.g., Paris): ").strip()
+    month_input = input("Enter travel month and year (e.g., Jan 2026): ").strip()
+
+    data, table, timings = await scrape_flights(origin, destination, month_input)
     if not table:
-        print("No results.", file=sys.stderr)
+        log.info("No results.")
     else:
-        print("Done.", file=sys.stderr)
+        scrape_id = HistoryStore().record_scrape(origin, destination, month_input, data)
+        log.info(f"Done. Saved as scrape #{scrape_id} in the price-history store.")
 
 if __name__ == "__main__":
+    from logs import configure_logging
+
+    configure_logging(json_logs=False)
     asyncio.run(main())
@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, List, Optional
+
+from googleflights_auto import normalize_place, parse_month
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrapes (
+    id INTEGER PRIMARY KEY,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    month TEXT NOT NULL,
+    scraped_at REAL NOT NULL,
+    flight_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS flights (
+    scrape_id INTEGER NOT NULL REFERENCES scrapes(id) ON DELETE CASCADE,
+    airline TEXT,
+    price TEXT,
+    price_number INTEGER,
+    duration TEXT,
+    stops TEXT,
+    departure TEXT,
+    arrival TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scrapes_route_time ON scrapes(origin, destination, month, scraped_at);
+CREATE INDEX IF NOT EXISTS idx_scrapes_time ON scrapes(scraped_at);
+CREATE INDEX IF NOT EXISTS idx_flights_scrape_price ON flights(scrape_id, price_number);
+CREATE INDEX IF NOT EXISTS idx_flights_price ON flights(price_number);
+"""
+
+FLIGHT_COLUMNS = ["airline", "price", "price_number", "duration", "stops", "departure", "arrival"]
+
+
+class HistoryStore:
+    """
+    Append-only SQLite store of every scrape, so price history survives and
+    concurrent requests never clobber each other's output.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("AUTOFLIGHTS_DB", "autoflights.db")
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @staticmethod
+    def _route(origin: str, destination: str, month: Optional[str]) -> List[str]:
+        route = [normalize_place(origin), normalize_place(destination)]
+        return route + [parse_month(month)] if month else route
+
+    def record_scrape(
+        self,
+        origin: str,
+        destination: str,
+        month: str,
+        flights: List[Dict],
+        scraped_at: Optional[float] = None,
+    ) -> int:
+        """Append one scrape and all of its flights in a single transaction; returns the scrape ID."""
+        scraped_at = scraped_at or time.time()
+        with closing(self._connect()) as conn, conn:
+            cur = conn.execute(
+                "INSERT INTO scrapes (origin, destination, month, scraped_at, flight_count) VALUES (?, ?, ?, ?, ?)",
+                (*self._route(origin, destination, month), scraped_at, len(flights)),
+            )
+            scrape_id = cur.lastrowid
+            conn.executemany(
+                f"INSERT INTO flights (scrape_id, {', '.join(FLIGHT_COLUMNS)}) VALUES (?{', ?' * len(FLIGHT_COLUMNS)})",
+                [(scrape_id, *(f.get(c) for c in FLIGHT_COLUMNS)) for f in flights],
+            )
+        return scrape_id
+
+    def cheapest(self, origin: str, destination: str, month: Optional[str] = None, limit: int = 10) -> List[Dict]:
+        """Cheapest flights ever seen for a route (optionally one month), with when they were seen."""
+        route = self._route(origin, destination, month)
+        month_clause = "AND s.month = ?" if month else ""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"""
+                SELECT f.*, s.month, s.scraped_at FROM flights f
+                JOIN scrapes s ON s.id = f.scrape_id
+                WHERE s.origin = ? AND s.destination = ? {month_clause}
+                ORDER BY f.price_number ASC, s.scraped_at DESC
+                LIMIT ?
+                """,
+                (*route, limit),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def latest_flights(self, origin: str, destination: str, month: Optional[str] = None) -> List[Dict]:
+        """Flights from the most recent non-empty scrape of each month for a route (or one month)."""
+        route = self._route(origin, destination, month)
+        month_clause = "AND month = ?" if month else ""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"""
+                WITH latest AS (
+                    SELECT id, ROW_NUMBER() OVER (PARTITION BY month ORDER BY scraped_at DESC) AS recency
+                    FROM scrapes
+                    WHERE origin = ? AND destination = ? {month_clause} AND flight_count > 0
+                )
+                SELECT f.*, s.month, s.scraped_at FROM latest l
+                JOIN scrapes s ON s.id = l.id
+                JOIN flights f ON f.scrape_id = l.id
+                WHERE l.recency = 1
+                ORDER BY f.price_number ASC
+                """,
+                route,
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def price_over_time(self, origin: str, destination: str, month: Optional[str] = None) -> List[Dict]:
+        """Lowest and average price per scrape for a route, oldest first."""
+        route = self._route(origin, destination, month)
+        month_clause = "AND s.month = ?" if month else ""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"""
+                SELECT s.id AS scrape_id, s.month, s.scraped_at, s.flight_count,
+                       MIN(f.price_number) AS min_price, AVG(f.price_number) AS avg_price
+                FROM scrapes s JOIN flights f ON f.scrape_id = s.id
+                WHERE s.origin = ? AND s.destination = ? {month_clause}
+                GROUP BY s.id
+                ORDER BY s.scraped_at ASC
+                """,
+                route,
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def latest_snapshot(
+        self,
+        origin: Optional[str] = None,
+        destination: Optional[str] = None,
+        month: Optional[str] = None,
+    ) -> Optional[Dict]:
+        """Most recent non-empty scrape for a route (or overall) with its flights sorted by price."""
+        clauses, params = ["s.flight_count > 0"], []
+        if origin and destination:
+            route = self._route(origin, destination, month)
+            clauses.append("s.origin = ? AND s.destination = ?" + (" AND s.month = ?" if month else ""))
+            params.extend(route)
+        with closing(self._connect()) as conn:
+            scrape = conn.execute(
+                f"SELECT * FROM scrapes s WHERE {' AND '.join(clauses)} ORDER BY s.scraped_at DESC LIMIT 1",
+                params,
+            ).fetchone()
+            if scrape is None:
+                return None
+            flights = conn.execute(
+                f"SELECT {', '.join(FLIGHT_COLUMNS)} FROM flights WHERE scrape_id = ? ORDER BY price_number ASC",
+                (scrape["id"],),
+            ).fetchall()
+        return {**dict(scrape), "flights": [dict(f) for f in flights]}
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from admission import Reservation
+
+from metrics import Counter
+
+log = logging.getLogger("autoflights.jobs")
+
+JOBS = Counter("autoflights_jobs_total", "Finished background jobs by outcome.", ["outcome"])
+
+
+@dataclass
+class Job:
+    """One queued scrape and its current state."""
+    id: str
+    params: Dict[str, Any]
+    status: str = "queued"  # queued, running, done, failed, timeout, cancelled
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "timeout", "cancelled")
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobScheduler:
+    """
+    Runs scrape jobs as background asyncio tasks with a concurrency limit and
+    a per-job deadline, so /scrape can return a job ID immediately. A job
+    given an admission `Reservation` gets it as `admit=`; time spent
+    waiting for a browser slot does not count toward the deadline.
+    """
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        deadline: Optional[float] = None,
+        max_finished: int = 500,
+    ):
+        self.concurrency = concurrency or int(os.getenv("SCRAPE_CONCURRENCY", "2"))
+        self.deadline = deadline or float(os.getenv("SCRAPE_JOB_TIMEOUT", "300"))
+        self.max_finished = max_finished
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._jobs: Dict[str, Job] = {}
+
+    def submit(
+        self,
+        fn: Callable[..., Awaitable[Dict]],
+        params: Dict[str, Any],
+        admit: Optional[Reservation] = None,
+    ) -> Job:
+        """Queue `fn(**params)` (plus `admit=admit` if given) and return its Job straight away."""
+        job = Job(id=uuid.uuid4().hex, params=params)
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, fn, admit))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; its browser context is closed on the way out."""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.task.cancel()
+        return True
+
+    async def shutdown(self):
+        """Cancel everything still pending and wait for it to unwind."""
+        tasks = [j.task for j in self._jobs.values() if not j.finished]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job: Job, fn: Callable[..., Awaitable[Dict]], admit: Optional[Reservation]):
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.started_at = time.time()
+                kwargs = {"admit": admit} if admit is not None else {}
+                job.result = await self._within_deadline(fn(**job.params, **kwargs), admit)
+                job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except asyncio.TimeoutError:
+            job.status = "timeout"
+            job.error = f"Job exceeded its {self.deadline:.0f}s deadline."
+        except Exception as e:
+            log.warning(f"Job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.task = None
+            JOBS.inc(outcome=job.status)
+            self._prune()
+
+    async def _within_deadline(self, work: Awaitable[Dict], admit: Optional[Reservation]) -> Dict:
+        """Await `work`, raising TimeoutError once it ran `deadline` seconds besides waiting for admission."""
+        task = asyncio.ensure_future(work)
+        started = time.monotonic()
+        try:
+            while True:
+                waited = admit.waited() if admit is not None else 0.0
+                remaining = started + waited + self.deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                done, _ = await asyncio.wait({task}, timeout=remaining)
+                if done:
+                    return task.result()
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    def _prune(self):
+        # Keep memory bounded by dropping the oldest finished jobs
+        finished = [j for j in self._jobs.values() if j.finished]
+        for j in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[j.id]
@@ -0,0 +1,41 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+from typing import Optional
+
+# Set per HTTP request; background tasks inherit it when they are created
+request_id: contextvars.ContextVar = contextvars.ContextVar("request_id", default="-")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, carrying the current request ID and any `extra={"fields": {...}}`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage().strip(),
+            "request_id": request_id.get(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(json_logs: Optional[bool] = None, level: Optional[str] = None):
+    """
+    Send every `autoflights.*` logger to stderr: JSON lines for the API
+    (LOG_FORMAT=json, the default), plain messages for CLI tools.
+    """
+    if json_logs is None:
+        json_logs = os.getenv("LOG_FORMAT", "json").lower() == "json"
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if json_logs else logging.Formatter("%(message)s"))
+    logger = logging.getLogger("autoflights")
+    logger.handlers = [handler]
+    logger.setLevel(level or os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
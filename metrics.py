@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+log = logging.getLogger("autoflights.metrics")
+
+# Seconds, from sub-ms cache hits up to the 5-minute job deadline
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+Collector = Callable[[], Iterable[Tuple[Dict[str, str], float]]]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _Sampled(_Metric):
+    """Counter/gauge storage, optionally topped up by a callback read at scrape time."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), collect: Optional[Collector] = None):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        if self._collect:
+            items += [(self._key(labels), value) for labels, value in self._collect()]
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, k)} {v}" for k, v in items
+        ]
+
+
+class Counter(_Sampled):
+    """Monotonic counter with labels."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Sampled):
+    """Point-in-time value with labels."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with labels."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v[0]), v[1], v[2]) for k, v in self._values.items()]
+        lines = self.header()
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                labels = _format_labels(self.label_names, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUESTS = Counter("autoflights_requests_total", "HTTP requests by endpoint and outcome.", ["endpoint", "outcome"])
+REQUEST_SECONDS = Histogram("autoflights_request_seconds", "HTTP request latency.", ["endpoint", "outcome"])
+STAGE_SECONDS = Histogram("autoflights_stage_seconds", "Time spent in each /scrape pipeline stage.", ["stage", "outcome"])
+
+
+def observe_stage(stage: str, seconds: float, outcome: str = "ok"):
+    STAGE_SECONDS.observe(seconds, stage=stage, outcome=outcome)
+    log.info(f"{stage} {outcome} in {seconds:.3f}s",
+             extra={"fields": {"stage": stage, "outcome": outcome, "seconds": round(seconds, 4)}})
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block as one pipeline stage, labelled ok, timeout, cancelled or error."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        raise
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - started, outcome)
+
+
+def observe_timings(timings: Dict[str, float], prefix: str = "scrape_"):
+    """Record the scraper's own per-phase timings as pipeline stages."""
+    for phase, seconds in timings.items():
+        observe_stage(prefix + phase, seconds)
+
+
+LOOP_LAG_SECONDS = Histogram(
+    "autoflights_event_loop_lag_seconds", "How late the event loop ran a timer, sampled periodically.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+
+async def monitor_loop_lag(interval: float = 0.05):
+    """Sleep `interval` in a loop and record how late each wake-up was; blocking code shows up as lag."""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        LOOP_LAG_SECONDS.observe(max(0.0, time.perf_counter() - started - interval))
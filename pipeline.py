@@ -0,0 +1,595 @@
+import asyncio
+import hashlib
+import logging
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from admission import Reservation
+from airports import UnknownPlace, resolve_place
+from browser_pool import BrowserPool
+from cache import ResultCache
+from flights import Flight, dedupe_and_sort
+from googleflights_auto import (
+    days_in_month, format_table, normalize_place, parse_month, scrape_calendar, scrape_flights, scrape_flights_many,
+)
+from history import HistoryStore
+from metrics import observe_timings, span
+from scrape_queue import ScrapeQueue
+
+log = logging.getLogger("autoflights.pipeline")
+
+# Block heavy assets and scroll adaptively unless SCRAPE_FAST_MODE=0
+FAST_MODE = os.getenv("SCRAPE_FAST_MODE", "1").lower() not in ("0", "false", "no")
+
+# Where single-route scrapes run: "pool" (warm in-process browsers),
+# "subprocess" (one scrape_runner.py process per scrape, streamed as NDJSON)
+# "queue" (the durable queue served by worker.py processes) or "stub"
+# (recorded rows after a fixed delay, for offline load tests)
+SCRAPE_BACKEND = os.getenv("SCRAPE_BACKEND", "pool").lower()
+SUBPROCESS_TIMEOUT = float(os.getenv("SCRAPE_SUBPROCESS_TIMEOUT", "300"))
+QUEUE_TIMEOUT = float(os.getenv("SCRAPE_QUEUE_TIMEOUT", "600"))
+# A calendar session runs inside its HTTP request, so it gets a /scrape job's budget
+CALENDAR_TIMEOUT = float(os.getenv("SCRAPE_JOB_TIMEOUT", "300"))
+STUB_DATA = os.getenv("SCRAPE_STUB_DATA", os.path.join(os.path.dirname(os.path.abspath(__file__)), "flight_data.json"))
+STUB_LATENCY = float(os.getenv("SCRAPE_STUB_LATENCY", "0.5"))
+RUNNER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scrape_runner.py")
+
+# Max concurrent pages per /scrape/batch request
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# Use the tool-calling agent for summaries instead of the single-completion fast path
+SUMMARY_USE_TOOLS = os.getenv("SUMMARY_USE_TOOLS", "0").lower() in ("1", "true", "yes")
+
+# Recent scrapes keyed on normalised route + month; summaries keyed on a hash of the flight table
+scrape_cache = ResultCache("scrape")
+summary_cache = ResultCache("summary")
+# Per-day price calendars, keyed like scrapes
+calendar_cache = ResultCache("calendar")
+
+# LLM usage actually spent, and what the summary cache saved
+llm_stats = {
+    "calls": 0, "latency": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+    "saved_calls": 0, "saved_latency": 0.0, "saved_tokens": 0,
+}
+
+# Every fresh scrape is appended to the price-history store
+history = HistoryStore()
+
+# Jobs for out-of-process workers when SCRAPE_BACKEND=queue
+scrape_queue = ScrapeQueue() if SCRAPE_BACKEND == "queue" else None
+
+
+def route_key(origin: str, destination: str, month: str) -> str:
+    """Normalise a route so 'Dallas ', 'dallas' and 'DALLAS' share one cache entry."""
+    return f"{normalize_place(origin)}|{normalize_place(destination)}|{parse_month(month)}"
+
+
+def table_hash(table_text: str) -> str:
+    """Content hash of a flight table, so identical result sets share one summary."""
+    return hashlib.sha256(table_text.encode("utf-8")).hexdigest()
+
+
+async def summarize_table(table_text: str, use_tools: bool = SUMMARY_USE_TOOLS) -> str:
+    """Summarize a flight table, calling Groq at most once per distinct table."""
+    computed = False
+
+    async def summarize():
+        nonlocal computed
+        computed = True
+        # Autogen and the OpenAI client load on the first summary, not at API startup
+        from agents import FlightSearchAgent, summarize_flights
+
+        query = build_summary_query(table_text)
+        with span("llm_summary"):
+            if use_tools:
+                started = time.perf_counter()
+                summary = await FlightSearchAgent().run_flight_search(query)
+                usage = {"prompt_tokens": 0, "completion_tokens": 0,
+                         "latency": round(time.perf_counter() - started, 3)}
+            else:
+                summary, usage = await summarize_flights(query)
+        record_llm_usage(usage)
+        return {"summary": summary, "usage": usage}
+
+    cached = await summary_cache.get_or_compute(table_hash(table_text), summarize)
+    if not computed:
+        record_llm_usage(cached["usage"], saved=True)
+    return cached["summary"]
+
+
+async def stream_summary_table(table_text: str) -> AsyncIterator[str]:
+    """Stream summary text for a flight table, replaying the cached summary in one chunk on a hit."""
+    key = table_hash(table_text)
+    cached = summary_cache.get(key)
+    if cached is not None:
+        record_llm_usage(cached["usage"], saved=True)
+        yield cached["summary"]
+        return
+
+    from agents import stream_summary
+
+    chunks, usage = [], None
+    with span("llm_summary"):
+        async for chunk in stream_summary(build_summary_query(table_text)):
+            if isinstance(chunk, str):
+                chunks.append(chunk)
+                yield chunk
+            else:
+                usage = chunk
+    record_llm_usage(usage)
+    summary_cache.set(key, {"summary": "".join(chunks), "usage": usage})
+
+
+def record_llm_usage(usage: Dict, saved: bool = False):
+    """Add one summary's usage to llm_stats, as spent or as saved by the cache."""
+    if saved:
+        llm_stats["saved_calls"] += 1
+        llm_stats["saved_latency"] += usage["latency"]
+        llm_stats["saved_tokens"] += usage["prompt_tokens"] + usage["completion_tokens"]
+    else:
+        llm_stats["calls"] += 1
+        llm_stats["latency"] += usage["latency"]
+        llm_stats["prompt_tokens"] += usage["prompt_tokens"]
+        llm_stats["completion_tokens"] += usage["completion_tokens"]
+
+
+def build_summary_query(table_text: str) -> str:
+    """Wrap a flight table in the summarizer prompt."""
+    return (
+        "You are a precise and funny AI travel assistant. "
+        "Analyze the following flight listings and output two sections.\n\n"
+        "1️ TOP CHEAPEST FLIGHTS — show ONLY a neat table with exactly these columns:\n"
+        "Airline | Price | Duration | Stops | Departure | Arrival\n"
+        "Include only the 3 cheapest flights (even if prices repeat).\n\n"
+        "2️ THOUGHTS SECTION — below the table, add a heading in bold 'Thoughts:'\n"
+        "For each line under Thoughts, start it with a bullet point.\n"
+        "Then give one short, witty line per flight — light humor, friendly tone, no negativity.\n"
+        "Add a blank line before this section so it visually separates from the table.\n"
+        "Keep it conversational like a fun travel buddy.\n\n"
+        f"{table_text}"
+    )
+
+
+async def scrape_route(
+    pool: BrowserPool,
+    origin: str,
+    destination: str,
+    month: str,
+    on_event: Optional[Callable[[Dict], None]] = None,
+    refresh: bool = False,
+    admit: Optional[Reservation] = None,
+) -> Dict:
+    """
+    Cached, coalesced scrape of one route on a pooled browser; fresh results
+    are recorded in history. `refresh` skips the cache but still shares an
+    in-flight scrape. Only an actual scrape takes a slot from `admit`; its
+    unused ticket is handed back once the result is in.
+    """
+    async def scrape():
+        log.info(f" Scraping {origin} -> {destination} ({month}) via the {SCRAPE_BACKEND} backend...")
+        # Only a real scrape waits for (and holds) a browser slot; cache hits never do
+        async with admit.slot() if admit else nullcontext():
+            with span("scrape"):
+                if SCRAPE_BACKEND == "queue":
+                    scraped = await scrape_via_queue(origin, destination, month)
+                elif SCRAPE_BACKEND == "stub":
+                    scraped = await scrape_stub(origin, destination, month, on_event=on_event)
+                elif SCRAPE_BACKEND == "subprocess":
+                    scraped = await scrape_in_subprocess(
+                        origin, destination, month, headless=pool.headless,
+                        storage_state=pool.storage_state, on_event=on_event
+                    )
+                else:
+                    async with pool.context() as context:
+                        flights, table_text, timings = await scrape_flights(
+                            origin, destination, month, context=context, fast=FAST_MODE, on_event=on_event
+                        )
+                    scraped = {"flights": flights, "table": table_text, "timings": timings}
+        observe_timings(scraped["timings"])
+        if scraped["flights"] and not scraped.get("partial"):
+            await record_history(origin, destination, month, scraped["flights"])
+        return scraped
+
+    # Identical concurrent requests share one in-flight scrape; partial results are not cached
+    key = route_key(origin, destination, month)
+    try:
+        return await scrape_cache.get_or_compute(
+            key, scrape, should_cache=lambda r: bool(r["flights"]) and not r.get("partial"), refresh=refresh
+        )
+    finally:
+        if admit:
+            admit.release()
+
+
+def scrape_cached(origin: str, destination: str, month: str) -> bool:
+    """True when scrape_route would answer from the cache or an in-flight scrape, without a browser."""
+    return scrape_cache.has(route_key(origin, destination, month))
+
+
+async def scrape_via_queue(origin: str, destination: str, month: str, timeout: float = QUEUE_TIMEOUT) -> Dict:
+    """
+    Enqueue a scrape for the worker fleet and wait for its result. Giving up
+    (cancelled or timed out) withdraws this caller from the job, which is
+    cancelled, and abandoned by its worker, once no other caller waits on it.
+    """
+    job_id = await asyncio.to_thread(scrape_queue.enqueue, origin, destination, month)
+    log.info(f"Queued scrape job {job_id} for the worker fleet.")
+    try:
+        return await scrape_queue.wait(job_id, timeout)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        # Shielded: a second cancellation must not leave the job running for nobody
+        if await asyncio.shield(asyncio.to_thread(scrape_queue.cancel, job_id)):
+            log.info(f"Cancelled scrape job {job_id}.")
+        raise
+
+
+@lru_cache(maxsize=1)
+def _stub_rows() -> List[Dict]:
+    with open(STUB_DATA, encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def scrape_stub(
+    origin: str,
+    destination: str,
+    month: str,
+    on_event: Optional[Callable[[Dict], None]] = None,
+    latency: float = STUB_LATENCY,
+) -> Dict:
+    """
+    Offline stand-in for a scrape: the rows in SCRAPE_STUB_DATA after
+    `latency` seconds, repriced per route so each route has its own table.
+    Row parsing, events, history and caching downstream all run for real.
+    """
+    started = time.perf_counter()
+    await asyncio.sleep(latency)
+    offset = int(hashlib.sha256(route_key(origin, destination, month).encode("utf-8")).hexdigest(), 16) % 200
+    parsed = [f for f in map(Flight.from_row, _stub_rows()) if f is not None]
+    for f in parsed:
+        f.price += offset
+    flights = [f.to_dict() for f in dedupe_and_sort(parsed)]
+    if on_event:
+        for flight in flights:
+            on_event({"type": "flight", "flight": flight})
+    timings = {"stub": round(latency, 3), "total": round(time.perf_counter() - started, 3)}
+    return {"flights": flights, "table": format_table(flights), "timings": timings}
+
+
+async def calendar_route(
+    pool: BrowserPool,
+    origin: str,
+    destination: str,
+    month: str,
+    admit: Optional[Reservation] = None,
+) -> Dict:
+    """
+    Cached, coalesced per-day price calendar of one route and month, read in
+    one browser session; like scrape_route, only a cache miss uses `admit`.
+    The session is cut off after CALENDAR_TIMEOUT seconds (TimeoutError).
+    """
+    async def scrape():
+        log.info(f" Reading the price calendar for {origin} -> {destination} ({month}) via the {SCRAPE_BACKEND} backend...")
+        if SCRAPE_BACKEND == "queue":
+            raise RuntimeError("Price calendars need a local browser and are not available with SCRAPE_BACKEND=queue.")
+        async def read() -> Tuple[Dict, Dict]:
+            if SCRAPE_BACKEND == "stub":
+                return await calendar_stub(origin, destination, month)
+            async with pool.context() as context:
+                return await scrape_calendar(origin, destination, month, context=context, fast=FAST_MODE)
+
+        async with admit.slot() if admit else nullcontext():
+            with span("calendar"):
+                # The deadline starts once the slot is granted
+                calendar, timings = await asyncio.wait_for(read(), timeout=CALENDAR_TIMEOUT)
+        observe_timings(timings, prefix="calendar_")
+        return {**calendar, "timings": timings}
+
+    key = route_key(origin, destination, month)
+    try:
+        return await calendar_cache.get_or_compute(
+            key, scrape, should_cache=lambda r: any(p is not None for p in r["prices"])
+        )
+    finally:
+        if admit:
+            admit.release()
+
+
+async def calendar_stub(origin: str, destination: str, month: str, latency: float = STUB_LATENCY) -> Tuple[Dict, Dict]:
+    """Offline stand-in for scrape_calendar: the stub scrape's cheapest fare, varied per day."""
+    started = time.perf_counter()
+    await asyncio.sleep(latency)
+    date_str = parse_month(month)
+    key = route_key(origin, destination, month)
+    parsed = [f for f in map(Flight.from_row, _stub_rows()) if f is not None]
+    base = min(f.price for f in parsed)
+    prices = [
+        base + int(hashlib.sha256(f"{key}|{day}".encode("utf-8")).hexdigest(), 16) % 200
+        for day in range(1, days_in_month(date_str) + 1)
+    ]
+    timings = {"stub": round(latency, 3), "total": round(time.perf_counter() - started, 3)}
+    return {"month": date_str, "currency": parsed[0].currency, "prices": prices}, timings
+
+
+async def scrape_in_subprocess(
+    origin: str,
+    destination: str,
+    month: str,
+    headless: bool = True,
+    storage_state: Optional[str] = None,
+    on_event: Optional[Callable[[Dict], None]] = None,
+    timeout: float = SUBPROCESS_TIMEOUT,
+) -> Dict:
+    """
+    Run scrape_runner.py and parse its NDJSON stdout line by line, forwarding
+    'phase' and 'flight' records to `on_event` as they arrive. On timeout
+    or a crash the process is killed and the flights read so far are
+    returned with `partial` set.
+    """
+    args = [sys.executable, RUNNER, origin, destination, month]
+    if FAST_MODE:
+        args.append("--fast")
+    if headless:
+        args.append("--headless")
+    if storage_state:
+        args.append(f"--storage-state={storage_state}")
+    # stderr is inherited so the runner's logs land in the API's own log stream
+    proc = await asyncio.create_subprocess_exec(*args, stdout=asyncio.subprocess.PIPE, limit=1 << 20)
+    flights: List[Dict] = []
+    timings: Dict[str, float] = {}
+    done: Dict = {}
+    timed_out = False
+
+    async def read():
+        async for line in proc.stdout:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                log.warning(f"Ignoring malformed runner output: {line[:200]!r}")
+                continue
+            kind = record.get("type")
+            if kind == "flight":
+                flights.append(record["flight"])
+            elif kind == "phase":
+                timings[record["phase"]] = record["seconds"]
+            elif kind in ("result", "error"):
+                done.update(record)
+                continue
+            if on_event:
+                on_event(record)
+
+    try:
+        await asyncio.wait_for(read(), timeout=timeout)
+        await proc.wait()
+    except asyncio.TimeoutError:
+        timed_out = True
+        log.warning(f"Scraper subprocess timed out after {timeout:.0f}s with {len(flights)} flight(s) read.")
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+    if done.get("type") == "result":
+        return {"flights": flights, "table": done["table"], "timings": done["timings"]}
+    if done.get("type") == "error":
+        log.warning(f"Scraper subprocess failed: {done['message']}")
+    elif proc.returncode and not timed_out:
+        log.warning(f"Scraper subprocess exited with code {proc.returncode}.")
+    if not flights and done.get("type") == "error":
+        raise RuntimeError(done["message"])
+    return {"flights": flights, "table": format_table(flights) if flights else "", "timings": timings, "partial": True}
+
+
+async def record_history(origin: str, destination: str, month: str, flights: List[Dict]):
+    """Append a fresh scrape to the price-history store off the event loop."""
+    with span("history_write"):
+        await asyncio.to_thread(history.record_scrape, origin, destination, month, flights)
+
+
+def apply_ranking(
+    scraped: Dict,
+    weights: Optional[Dict[str, float]] = None,
+    per_airline: Optional[int] = None,
+) -> Dict:
+    """
+    Re-order a scrape by weighted score and attach its Pareto frontier when
+    the caller asked for ranking; the cached scrape itself stays price-ordered.
+    """
+    weights = {k: v for k, v in (weights or {}).items() if v is not None}
+    if not (weights or per_airline) or not scraped["flights"]:
+        return scraped
+    # NumPy loads on the first ranked request, not at API startup
+    from ranking import rank_flights
+
+    ranked = rank_flights(scraped["flights"], weights, per_airline)
+    return {**scraped, "flights": ranked["flights"], "pareto": ranked["pareto"],
+            "table": format_table(ranked["flights"])}
+
+
+def rank_history(
+    origin: str,
+    destination: str,
+    month: Optional[str] = None,
+    weights: Optional[Dict[str, float]] = None,
+    per_airline: Optional[int] = None,
+    limit: int = 50,
+) -> Dict:
+    """Rank the latest recorded flights of every month for a route (blocking; run it in a thread)."""
+    from ranking import rank_flights
+
+    flights = history.latest_flights(origin, destination, month)
+    weights = {k: v for k, v in (weights or {}).items() if v is not None}
+    ranked = rank_flights(flights, weights, per_airline)
+    return {"total": len(flights), "flights": ranked["flights"][:limit], "pareto": ranked["pareto"]}
+
+
+def build_result(scraped: Dict, summary: str) -> Dict:
+    """Shape a scrape and its summary into the /scrape response."""
+    flights = scraped["flights"]
+    if not flights:
+        return {"status": "no_results",
+        "message": "No priced flights found. Try again with different cities or month.",
+        "flights": [], "table": "",
+        "summary": "",
+        "timings": scraped.get("timings", {})
+        }
+    partial = bool(scraped.get("partial"))
+    return {"status": "ok",
+    "message": f"Scraped {len(flights)} flights{' before the scraper stopped' if partial else ' successfully'}.",
+    "flights": flights,
+    "table_flights": flights[:3],
+    "summary": summary,
+    "timings": scraped.get("timings", {}),
+    "partial": partial,
+    **({"pareto": scraped["pareto"]} if "pareto" in scraped else {})
+    }
+
+
+async def run_scrape_pipeline(
+    pool: BrowserPool,
+    origin: str,
+    destination: str,
+    month: str,
+    weights: Optional[Dict[str, float]] = None,
+    per_airline: Optional[int] = None,
+    admit: Optional[Reservation] = None,
+) -> Dict:
+    """
+    Scrape one route on a pooled browser, optionally re-rank it, then
+    summarize the results with Groq. The browser slot from `admit` is held
+    for the scrape only, never for the summary.
+    """
+    scraped = apply_ranking(await scrape_route(pool, origin, destination, month, admit=admit), weights, per_airline)
+    if not scraped["flights"]:
+        log.info(" No flights found by the scraper.")
+        return build_result(scraped, "")
+    log.info(f"Scraper returned {len(scraped['flights'])} flights successfully.")
+
+    # Summarize results with Groq
+    log.info("Running Groq summarizer...")
+    summary = await summarize_table(scraped["table"])
+    return build_result(scraped, summary)
+
+
+async def stream_scrape_pipeline(
+    pool: BrowserPool,
+    origin: str,
+    destination: str,
+    month: str,
+    admit: Optional[Reservation] = None,
+) -> AsyncIterator[Dict]:
+    """
+    Same pipeline as run_scrape_pipeline, as a stream of events: scraper
+    'phase' and 'flight' events while scraping, 'summary' text chunks as the
+    LLM produces them, then one 'done' event carrying the full result.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    scrape_task = asyncio.create_task(
+        scrape_route(pool, origin, destination, month, on_event=events.put_nowait, admit=admit)
+    )
+    streamed_flights = False
+    try:
+        yield {"type": "status", "message": f"Searching {origin} -> {destination} ({month})..."}
+        while not (scrape_task.done() and events.empty()):
+            getter = asyncio.ensure_future(events.get())
+            await asyncio.wait({getter, scrape_task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                event = getter.result()
+                streamed_flights = streamed_flights or event["type"] == "flight"
+                yield event
+            else:
+                getter.cancel()
+        scraped = scrape_task.result()
+    finally:
+        scrape_task.cancel()
+
+    # Cached or coalesced scrapes emit no events of their own
+    if not streamed_flights:
+        for flight in scraped["flights"]:
+            yield {"type": "flight", "flight": flight}
+
+    summary = ""
+    if scraped["flights"]:
+        yield {"type": "status", "message": "Running Groq summarizer..."}
+        chunks = []
+        async for chunk in stream_summary_table(scraped["table"]):
+            chunks.append(chunk)
+            yield {"type": "summary", "text": chunk}
+        summary = "".join(chunks)
+    yield {"type": "done", "result": build_result(scraped, summary)}
+
+
+async def run_batch_pipeline(
+    pool: BrowserPool,
+    queries: List[Tuple[str, str, str]],
+    concurrency: int = BATCH_CONCURRENCY,
+    admit: Optional[Reservation] = None,
+) -> AsyncIterator[Dict]:
+    """
+    Yield one scrape result per (origin, destination, month) query as it finishes.
+    Places are resolved to IATA codes where the index knows them; a blank one fails its own query.
+    Cached routes are answered immediately; the rest share one pooled browser, and
+    one slot from `admit`, taken only when some query missed the cache.
+    """
+    try:
+        pending = []
+        for index, (origin, destination, month) in enumerate(queries):
+            try:
+                origin, destination = resolve_place(origin), resolve_place(destination)
+            except UnknownPlace as e:
+                yield {"index": index, "origin": origin, "destination": destination, "month": month,
+                       "status": "error", "error": str(e), "cached": False}
+                continue
+            cached = scrape_cache.get(route_key(origin, destination, month))
+            if cached is not None:
+                yield {"index": index, "origin": origin, "destination": destination, "month": month,
+                       "status": "ok", "cached": True, **cached}
+            else:
+                pending.append((index, (origin, destination, month)))
+        if pending:
+            async with admit.slot() if admit else nullcontext():
+                async for result in _scrape_batch(pool, pending, concurrency):
+                    yield result
+    finally:
+        if admit:
+            admit.release()
+
+
+async def _scrape_batch(pool: BrowserPool, pending: List, concurrency: int) -> AsyncIterator[Dict]:
+    """Scrape a batch's uncached (index, query) pairs, yielding each result as it finishes."""
+    if SCRAPE_BACKEND in ("queue", "stub"):
+        # No local browser to share: every query is its own scrape (a queued job for the worker fleet)
+        async def run(index: int, query: Tuple[str, str, str]) -> Dict:
+            result = {"index": index, "origin": query[0], "destination": query[1], "month": query[2]}
+            try:
+                return {**result, "status": "ok", "cached": False, **await scrape_route(pool, *query)}
+            except Exception as e:
+                return {**result, "status": "error", "error": str(e), "cached": False}
+
+        for done in asyncio.as_completed([run(index, query) for index, query in pending]):
+            yield await done
+        return
+
+    concurrency = max(1, min(concurrency, BATCH_CONCURRENCY))
+    # A persistent-profile pool lends one warm context; queries run as pages in it
+    borrow = pool.context() if pool.persistent else pool.browser()
+    async with borrow as borrowed:
+        shared = {"context": borrowed} if pool.persistent else {"browser": borrowed}
+        results = scrape_flights_many(
+            [q for _, q in pending], concurrency=concurrency, fast=FAST_MODE, **shared
+        )
+        async for result in results:
+            # Map back to the caller's query index
+            result["index"] = pending[result["index"]][0]
+            if result["status"] == "ok":
+                observe_timings(result["timings"])
+                await record_history(result["origin"], result["destination"], result["month"], result["flights"])
+                scrape_cache.set(
+                    route_key(result["origin"], result["destination"], result["month"]),
+                    {"flights": result["flights"], "table": result["table"], "timings": result["timings"]},
+                )
+            yield {**result, "cached": False}
@@ -0,0 +1,134 @@
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+
+from flights import parse_duration, parse_stops
+
+# Relative weight of each criterion in the combined score; lower scores rank first
+DEFAULT_WEIGHTS = {"price": 1.0, "duration": 0.3, "stops": 0.2}
+CRITERIA = tuple(DEFAULT_WEIGHTS)
+
+
+def to_columns(flights: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Pull the ranking criteria out of flight dicts into NumPy columns. Rows
+    without the typed fields (e.g. from the history store) are parsed from
+    their display text; unknown durations and stop counts rank last.
+    """
+    n = len(flights)
+    airlines, airline_codes = np.unique(
+        np.array([f.get("airline", "") for f in flights], dtype=object), return_inverse=True
+    )
+    return {
+        "price": np.fromiter((f["price_number"] for f in flights), dtype=np.float64, count=n),
+        "duration": _fill_worst(np.fromiter(map(_duration, flights), dtype=np.float64, count=n)),
+        "stops": _fill_worst(np.fromiter(map(_stops, flights), dtype=np.float64, count=n)),
+        "airline": airline_codes.astype(np.int64),
+        "airlines": airlines,
+    }
+
+
+def _duration(flight: Dict) -> float:
+    minutes = flight.get("duration_minutes")
+    if minutes is None:
+        minutes = parse_duration(flight.get("duration", ""))
+    return np.nan if minutes is None else minutes
+
+
+def _stops(flight: Dict) -> float:
+    count = flight.get("stop_count")
+    if count is None:
+        count = parse_stops(flight.get("stops", ""))[0]
+    return np.nan if count is None else count
+
+
+def _fill_worst(column: np.ndarray) -> np.ndarray:
+    missing = np.isnan(column)
+    if missing.any():
+        column = column.copy()
+        column[missing] = np.nanmax(column) + 1 if not missing.all() else 0
+    return column
+
+
+def weighted_scores(columns: Mapping[str, np.ndarray], weights: Optional[Mapping[str, float]] = None) -> np.ndarray:
+    """Min-max scale each criterion to [0, 1] and combine them with normalised weights."""
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    total = sum(max(0.0, float(weights[c])) for c in CRITERIA) or 1.0
+    score = np.zeros(len(columns["price"]), dtype=np.float64)
+    for criterion in CRITERIA:
+        w = max(0.0, float(weights[criterion])) / total
+        if not w:
+            continue
+        col = columns[criterion]
+        span = np.ptp(col) if col.size else 0.0
+        if span:
+            score += w * (col - col.min()) / span
+    return score
+
+
+def pareto_frontier(price: np.ndarray, duration: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """
+    Indices of flights no other flight beats on price, duration and stops at
+    once (no worse on all three, better on at least one); identical flights
+    are all kept. Rows are sorted by (price, duration, stops); then, per stops
+    level, a running minimum of duration over cheaper rows with no more stops
+    marks every dominated row in one vectorised pass. O(n log n + n * levels).
+    """
+    if not len(price):
+        return np.empty(0, dtype=np.int64)
+    order = np.lexsort((stops, duration, price))
+    p, d, s = price[order], duration[order], stops[order]
+    # Exact ties sort next to each other and must not dominate one another, so
+    # each row only looks at rows before the start of its run of equal tuples
+    index = np.arange(len(order))
+    new_tuple = np.r_[True, (p[1:] != p[:-1]) | (d[1:] != d[:-1]) | (s[1:] != s[:-1])]
+    run_start = np.maximum.accumulate(np.where(new_tuple, index, 0))
+    dominated = np.zeros(len(order), dtype=bool)
+    for level in np.unique(s):
+        eligible = np.where(s <= level, d, np.inf)
+        # Best duration among earlier (cheaper or equal) rows with <= `level` stops
+        best_before = np.concatenate(([np.inf], np.minimum.accumulate(eligible)))[run_start]
+        dominated |= (s == level) & (best_before <= d)
+    return np.sort(order[~dominated])
+
+
+def top_k_per_airline(airline: np.ndarray, score: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` best-scoring flights for each airline, best first overall."""
+    if not len(score) or k <= 0:
+        return np.empty(0, dtype=np.int64)
+    order = np.lexsort((score, airline))
+    grouped = airline[order]
+    starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+    rank_in_group = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    keep = order[rank_in_group < k]
+    return keep[np.argsort(score[keep], kind="stable")]
+
+
+def rank_flights(
+    flights: List[Dict],
+    weights: Optional[Mapping[str, float]] = None,
+    per_airline: Optional[int] = None,
+) -> Dict[str, List[Dict]]:
+    """
+    Order flights by weighted score (each gets a `score` and a `pareto` flag)
+    and return them with the Pareto frontier. With `per_airline`, only the
+    best `per_airline` flights of each airline are kept.
+    """
+    if not flights:
+        return {"flights": [], "pareto": []}
+    columns = to_columns(flights)
+    score = weighted_scores(columns, weights)
+    on_frontier = np.zeros(len(flights), dtype=bool)
+    on_frontier[pareto_frontier(columns["price"], columns["duration"], columns["stops"])] = True
+
+    if per_airline:
+        order = top_k_per_airline(columns["airline"], score, per_airline)
+    else:
+        order = np.argsort(score, kind="stable")
+    frontier = np.flatnonzero(on_frontier)
+    frontier = frontier[np.argsort(score[frontier], kind="stable")]
+
+    def row(i: int) -> Dict:
+        return {**flights[i], "score": round(float(score[i]), 4), "pareto": bool(on_frontier[i])}
+
+    return {"flights": [row(i) for i in order.tolist()], "pareto": [row(i) for i in frontier.tolist()]}
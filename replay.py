@@ -0,0 +1,62 @@
+import json
+import os
+import re
+import time
+from typing import Dict, List
+
+HAR_NAME = "network.har.zip"
+HTML_NAME = "page.html"
+QUERY_NAME = "query.json"
+
+
+def fixture_name(origin: str, destination: str, month: str) -> str:
+    """Filesystem-safe fixture directory name for one query."""
+    slug = f"{origin}-{destination}-{month}".lower()
+    return re.sub(r"[^a-z0-9]+", "-", slug).strip("-")
+
+
+async def attach_fixture(page, fixture_dir: str, record: bool = False):
+    """
+    Route the page through a HAR fixture. In record mode every response is
+    saved to the fixture when the context closes; in replay mode responses
+    are served from it and anything not recorded is aborted, so the page
+    never touches the network.
+    """
+    har_path = os.path.join(fixture_dir, HAR_NAME)
+    if record:
+        os.makedirs(fixture_dir, exist_ok=True)
+    elif not os.path.exists(har_path):
+        raise FileNotFoundError(f"No recorded fixture at {har_path}")
+    await page.route_from_har(
+        har_path,
+        not_found="fallback" if record else "abort",
+        update=record,
+        update_content="attach",
+        update_mode="minimal",
+    )
+
+
+async def save_snapshot(page, fixture_dir: str, origin: str, destination: str, month: str):
+    """Save the rendered HTML and the query next to the HAR."""
+    with open(os.path.join(fixture_dir, HTML_NAME), "w", encoding="utf-8") as f:
+        f.write(await page.content())
+    with open(os.path.join(fixture_dir, QUERY_NAME), "w", encoding="utf-8") as f:
+        json.dump({"origin": origin, "destination": destination, "month": month,
+                   "recorded_at": time.time()}, f, indent=2)
+
+
+def list_fixtures(root: str) -> List[Dict]:
+    """Every recorded query under `root`, with its fixture directory."""
+    fixtures = []
+    if not os.path.isdir(root):
+        return fixtures
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        try:
+            with open(os.path.join(path, QUERY_NAME), encoding="utf-8") as f:
+                query = json.load(f)
+        except (FileNotFoundError, NotADirectoryError, ValueError):
+            continue
+        if os.path.exists(os.path.join(path, HAR_NAME)):
+            fixtures.append({**query, "fixture": path})
+    return fixtures
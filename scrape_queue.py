@@ -0,0 +1,287 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from contextlib import closing
+from typing import Dict, Optional
+
+from googleflights_auto import normalize_place, parse_month
+from metrics import Gauge
+
+log = logging.getLogger("autoflights.queue")
+
+_queues: "weakref.WeakSet[ScrapeQueue]" = weakref.WeakSet()
+
+
+def _depth():
+    # Runs on the event loop during /metrics: last known counts only, never a SQLite query
+    for queue in list(_queues):
+        for status, count in queue.depth().items():
+            yield {"status": status}, count
+
+
+Gauge("autoflights_scrape_queue_jobs", "Jobs waiting in or leased from the durable scrape queue.", ["status"], collect=_depth)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_queue (
+    id TEXT PRIMARY KEY,
+    route TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    month TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    waiters INTEGER NOT NULL DEFAULT 1,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_queue_status_created ON scrape_queue(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_queue_route_status ON scrape_queue(route, status);
+"""
+
+# queued -> leased -> done | failed; an expired lease goes back to queued, and a
+# pending job nobody waits for any more is cancelled
+PENDING = ("queued", "leased")
+FINISHED = ("done", "failed", "cancelled")
+
+
+class JobFailed(RuntimeError):
+    """A queued scrape ran out of attempts or was cancelled; the message is its last error."""
+
+
+class ScrapeQueue:
+    """
+    Durable SQLite queue between the API and scrape workers. The API only
+    enqueues and reads results; workers (`worker.py`) claim jobs under a
+    time-limited lease, extend it with heartbeats while scraping and write
+    the result back. A job whose worker crashed or hung is claimed again
+    once its lease expires, up to `max_attempts` times. A job every API
+    caller gave up on is cancelled, and its worker abandons it at the next
+    heartbeat. Claims run in an IMMEDIATE transaction, so any number of
+    worker processes can share one database file.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_attempts: Optional[int] = None):
+        self.path = path or os.getenv("SCRAPE_QUEUE_DB") or os.getenv("AUTOFLIGHTS_DB", "autoflights.db")
+        self.max_attempts = max_attempts or int(os.getenv("SCRAPE_QUEUE_ATTEMPTS", "3"))
+        self._depth = {status: 0 for status in PENDING}
+        self._depth_at = 0.0
+        self._depth_refreshing = False
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            if "waiters" not in {r["name"] for r in conn.execute("PRAGMA table_info(scrape_queue)")}:
+                conn.execute("ALTER TABLE scrape_queue ADD COLUMN waiters INTEGER NOT NULL DEFAULT 1")
+        _queues.add(self)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # API side
+    def enqueue(self, origin: str, destination: str, month: str) -> str:
+        """Queue a scrape and return its ID; an identical pending scrape is reused (and gains a waiter)."""
+        route = f"{normalize_place(origin)}|{normalize_place(destination)}|{parse_month(month)}"
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM scrape_queue WHERE route = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                    (route, *PENDING),
+                ).fetchone()
+                if row:
+                    job_id = row["id"]
+                    conn.execute("UPDATE scrape_queue SET waiters = waiters + 1 WHERE id = ?", (job_id,))
+                else:
+                    job_id = uuid.uuid4().hex
+                    conn.execute(
+                        "INSERT INTO scrape_queue (id, route, origin, destination, month, status, max_attempts, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+                        (job_id, route, origin, destination, month, self.max_attempts, time.time()),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Drop one waiter from a pending job, cancelling it once none are left.
+        True when the job was cancelled by this call.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE scrape_queue SET waiters = waiters - 1 WHERE id = ? AND status IN (?, ?)", (job_id, *PENDING)
+                )
+                cancelled = conn.execute(
+                    "UPDATE scrape_queue SET status = 'cancelled', finished_at = ?, lease_until = NULL, "
+                    "error = 'Cancelled: no caller is waiting for the result.' "
+                    "WHERE id = ? AND waiters <= 0 AND status IN (?, ?)",
+                    (time.time(), job_id, *PENDING),
+                ).rowcount == 1
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return cancelled
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM scrape_queue WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    async def wait(self, job_id: str, timeout: float, poll: float = 0.5) -> Dict:
+        """Poll until the job finishes and return its result; raises JobFailed or TimeoutError."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await asyncio.to_thread(self.get, job_id)
+            if job is None:
+                raise JobFailed(f"Scrape job {job_id} disappeared from the queue.")
+            if job["status"] == "done":
+                return job["result"]
+            if job["status"] in ("failed", "cancelled"):
+                raise JobFailed(job["error"] or f"Scrape {job['status']}.")
+            if time.monotonic() >= deadline:
+                raise asyncio.TimeoutError(f"Scrape job {job_id} still {job['status']} after {timeout:.0f}s.")
+            await asyncio.sleep(poll)
+
+    def stats(self) -> Dict:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            counts = {r["status"]: r["n"] for r in conn.execute(
+                "SELECT status, COUNT(*) AS n FROM scrape_queue GROUP BY status"
+            )}
+            workers = conn.execute(
+                "SELECT COUNT(DISTINCT worker) FROM scrape_queue WHERE status = 'leased' AND lease_until > ?", (now,)
+            ).fetchone()[0]
+            oldest = conn.execute(
+                "SELECT MIN(created_at) FROM scrape_queue WHERE status = 'queued'"
+            ).fetchone()[0]
+        return {
+            **{s: counts.get(s, 0) for s in (*PENDING, *FINISHED)},
+            "busy_workers": workers,
+            "oldest_queued_seconds": round(now - oldest, 3) if oldest else 0.0,
+        }
+
+    def depth(self, max_age: float = 5.0) -> Dict[str, int]:
+        """
+        Last known queued/leased counts, for metrics. When older than
+        `max_age` seconds they are refreshed in a background thread, so the
+        caller never waits on a database a worker may be holding locked.
+        """
+        if time.monotonic() - self._depth_at > max_age and not self._depth_refreshing:
+            self._depth_refreshing = True
+            threading.Thread(target=self._refresh_depth, name="scrape-queue-depth", daemon=True).start()
+        return self._depth
+
+    def _refresh_depth(self):
+        try:
+            stats = self.stats()
+            self._depth = {status: stats[status] for status in PENDING}
+        except sqlite3.Error as e:
+            log.warning(f"Could not read scrape queue depth: {e}")
+        finally:
+            self._depth_at = time.monotonic()
+            self._depth_refreshing = False
+
+    # Worker side
+    def claim(self, worker: str, lease: float) -> Optional[Dict]:
+        """
+        Lease the oldest runnable job to `worker`: a queued one, or a leased
+        one whose lease expired. Expired jobs out of attempts are failed.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE scrape_queue SET status = 'failed', finished_at = ?, "
+                    "error = COALESCE(error, 'Worker lease expired.') || ' (out of attempts)' "
+                    "WHERE status = 'leased' AND lease_until < ? AND attempts >= max_attempts",
+                    (now, now),
+                )
+                row = conn.execute(
+                    "SELECT * FROM scrape_queue WHERE status = 'queued' "
+                    "OR (status = 'leased' AND lease_until < ?) ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    if row["status"] == "leased":
+                        log.warning(f"Reclaiming job {row['id']} from {row['worker']} after its lease expired.")
+                    conn.execute(
+                        "UPDATE scrape_queue SET status = 'leased', worker = ?, lease_until = ?, "
+                        "attempts = attempts + 1, started_at = ? WHERE id = ?",
+                        (worker, now + lease, now, row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return dict(row) if row is not None else None
+
+    def heartbeat(self, job_id: str, worker: str, lease: float) -> bool:
+        """Extend a lease; False means the job was reclaimed or cancelled and the worker should stop."""
+        return self._update(
+            job_id, worker, "UPDATE scrape_queue SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (time.time() + lease,),
+        )
+
+    def complete(self, job_id: str, worker: str, result: Dict) -> bool:
+        return self._update(
+            job_id, worker,
+            "UPDATE scrape_queue SET status = 'done', finished_at = ?, result = ?, lease_until = NULL "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (time.time(), json.dumps(result, ensure_ascii=False)),
+        )
+
+    def fail(self, job_id: str, worker: str, error: str) -> bool:
+        """Record a failed attempt: back to the queue while attempts remain, else failed."""
+        return self._update(
+            job_id, worker,
+            "UPDATE scrape_queue SET error = ?, lease_until = NULL, worker = NULL, "
+            "status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+            "finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (error, time.time()),
+        )
+
+    def release(self, job_id: str, worker: str) -> bool:
+        """Hand a job back untried (e.g. on shutdown) without using up an attempt."""
+        return self._update(
+            job_id, worker,
+            "UPDATE scrape_queue SET status = 'queued', attempts = attempts - 1, worker = NULL, lease_until = NULL "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (),
+        )
+
+    def prune(self, older_than: float) -> int:
+        """Delete finished jobs older than `older_than` seconds."""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "DELETE FROM scrape_queue WHERE status IN (?, ?, ?) AND finished_at < ?",
+                (*FINISHED, time.time() - older_than),
+            ).rowcount
+
+    def _update(self, job_id: str, worker: str, sql: str, params: tuple) -> bool:
+        with closing(self._connect()) as conn:
+            return conn.execute(sql, (*params, job_id, worker)).rowcount == 1
+
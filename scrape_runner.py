@@ -1,6 +1,7 @@
 import sys, io
 import json, asyncio
 from googleflights_auto import scrape_flights
+from logs import configure_logging
 
 # Ensure UTF-8 output for subprocess logs
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
@@ -13,21 +14,36 @@ if sys.platform == "win32":
     except Exception as e:
         print("Warning: Could not set Windows event loop policy:", e, file=sys.stderr)
 
+def write_record(record: dict):
+    """Write one NDJSON record and flush it so the reader sees it immediately."""
+    sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
 async def run():
-    # Read CLI args: origin, destination, month
+    # Read CLI args: origin, destination, month [--fast] [--headless] [--storage-state=PATH]
+    flags = {a for a in sys.argv[1:] if a.startswith("--")}
+    storage_state = next((a.split("=", 1)[1] for a in flags if a.startswith("--storage-state=")), None)
     try:
-        origin, destination, month = sys.argv[1:4]
+        origin, destination, month = [a for a in sys.argv[1:] if not a.startswith("--")][:3]
     except ValueError:
         print("Error: Please provide origin, destination, and month.", file=sys.stderr)
         sys.exit(1)
-        
-    # Run scraper and return JSON
+
+    # Stream 'phase' and 'flight' records as they happen, then one 'result'
+    # record with the table and timings. A reader that stops early keeps
+    # every flight it has already seen.
     try:
-        data, table = await scrape_flights(origin, destination, month)
-        print(json.dumps({"flights": data, "table": table}, ensure_ascii=False), file=sys.stdout)
+        data, table, timings = await scrape_flights(
+            origin, destination, month,
+            fast="--fast" in flags, headless="--headless" in flags,
+            storage_state=storage_state, on_event=write_record
+        )
+        write_record({"type": "result", "count": len(data), "table": table, "timings": timings})
     except Exception as e:
+        write_record({"type": "error", "message": str(e)})
         print(f"Scraping failed: {e}", file=sys.stderr)
         sys.exit(1)
 
 if __name__ == "__main__":
+    configure_logging(json_logs=False)
     asyncio.run(run())
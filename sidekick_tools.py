@@ -1,38 +1,54 @@
-from langchain_community.utilities import GoogleSerperAPIWrapper
-from langchain_core.tools import Tool
-from langchain_community.agent_toolkits import FileManagementToolkit
-from autogen_ext.tools.langchain import LangChainToolAdapter
-from langchain_groq import ChatGroq
 from dotenv import load_dotenv
+from typing import Callable, Dict, List
 import os
 
 # Load environment variables
 load_dotenv()
 
+# LangChain, Groq and Autogen are imported inside the factories below, so
+# importing this module stays cheap until an agent actually needs its tools.
 
-# Search Tool (Serper)
-serper = GoogleSerperAPIWrapper(serper_api_key=os.getenv("SERPER_API_KEY"))
-search_tool = Tool(
-    name="internet_search",
-    func=serper.run,
-    description="Useful for searching flight or travel information online."
-)
-autogen_search_tool = LangChainToolAdapter(search_tool)
-
-# Groq Analyzer Tool 
+
+class ToolRegistry:
+    """Named tool factories, each built once on first use."""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], List]] = {}
+        self._built: Dict[str, List] = {}
+
+    def register(self, name: str, factory: Callable[[], List]):
+        self._factories[name] = factory
+
+    def names(self) -> List[str]:
+        return list(self._factories)
+
+    def get(self, name: str) -> List:
+        if name not in self._built:
+            self._built[name] = self._factories[name]()
+        return self._built[name]
+
+    def all(self) -> List:
+        return [tool for name in self._factories for tool in self.get(name)]
+
+
+registry = ToolRegistry()
+
+
+# Groq Analyzer Tool
 def analyze_flights_with_groq(dummy: str=None):
     """
-    Reads 'flight_results.txt' and uses Groq's Llama 3.1 model to summarize
-    the top cheapest flights.
+    Reads the latest scrape from the price-history store and uses Groq's
+    Llama 3.1 model to summarize the top cheapest flights.
     """
-    try:
-        with open("flight_results.txt", "r", encoding="utf-8") as f:
-            data = f.read()
-    except FileNotFoundError:
-        return "No flight_results.txt found. Please run googleflights_auto.py first."
+    from langchain_groq import ChatGroq
+    from googleflights_auto import format_table
+    from history import HistoryStore
+
+    snapshot = HistoryStore().latest_snapshot()
+    if snapshot is None:
+        return "No recorded flights found. Please run googleflights_auto.py first."
 
-    if not data.strip():
-        return "The flight_results.txt file is empty."
+    data = format_table(snapshot["flights"])
 
     llm = ChatGroq(
         model="llama-3.1-8b-instant",
@@ -51,15 +67,52 @@ def analyze_flights_with_groq(dummy: str=None):
     return response.content if hasattr(response, "content") else str(response)
 
 # Wrap Groq analysis for Autogen
-groq_analysis_tool = Tool(
-    name="analyze_flights_with_groq",
-    func=analyze_flights_with_groq,
-    description="Analyzes flight_results.txt using Groq to find and summarize the cheapest flights."
-)
-autogen_groq_tool = LangChainToolAdapter(groq_analysis_tool)
+def build_groq_tools() -> List:
+    from langchain_core.tools import Tool
+    from autogen_ext.tools.langchain import LangChainToolAdapter
+
+    groq_analysis_tool = Tool(
+        name="analyze_flights_with_groq",
+        func=analyze_flights_with_groq,
+        description="Analyzes the latest recorded flight search using Groq to find and summarize the cheapest flights."
+    )
+    return [LangChainToolAdapter(groq_analysis_tool)]
+
+# Search Tool (Serper)
+def build_search_tools() -> List:
+    from langchain_community.utilities import GoogleSerperAPIWrapper
+    from langchain_core.tools import Tool
+    from autogen_ext.tools.langchain import LangChainToolAdapter
+
+    serper = GoogleSerperAPIWrapper(serper_api_key=os.getenv("SERPER_API_KEY"))
+    search_tool = Tool(
+        name="internet_search",
+        func=serper.run,
+        description="Useful for searching flight or travel information online."
+    )
+    return [LangChainToolAdapter(search_tool)]
 
 # File Management Tools
-file_tools = FileManagementToolkit(root_dir=".").get_tools()
+def build_file_tools() -> List:
+    from langchain_community.agent_toolkits import FileManagementToolkit
+    from autogen_ext.tools.langchain import LangChainToolAdapter
+
+    file_tools = FileManagementToolkit(root_dir=".").get_tools()
+    return [LangChainToolAdapter(t) for t in file_tools]
+
+
+registry.register("analyze_flights_with_groq", build_groq_tools)
+registry.register("internet_search", build_search_tools)
+registry.register("file_management", build_file_tools)
+
+
+def get_autogen_tools() -> List:
+    """Combine tools for Autogen, building them on first call."""
+    return registry.all()
+
 
-#Combine tools for Autogen
-autogen_tools = [autogen_groq_tool, autogen_search_tool] + [LangChainToolAdapter(t) for t in file_tools]
+def __getattr__(name):
+    # Keep `from sidekick_tools import autogen_tools` working, built lazily
+    if name == "autogen_tools":
+        return get_autogen_tools()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,35 @@
+import pytest
+
+from flights import parse_airline, parse_price
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Delta", "Delta"),
+    ("DeltaKLM", "Delta, KLM"),
+    ("KLMDelta", "KLM, Delta"),
+    ("AirwaysAmerican", "Airways, American"),
+    ("JetBlue", "JetBlue"),
+    ("JetBlueDelta", "JetBlue, Delta"),
+    ("DeltaJetBlue", "Delta, JetBlue"),
+    ("easyJetRyanair", "easyJet, Ryanair"),
+    ("KLMeasyJet", "KLM, easyJet"),
+    ("United, Air Canada", "United, Air Canada"),
+    ("Operated by SkyWest DBA United Express", "Operated by SkyWest DBA United Express"),
+    ("5:30 PM+1 IndiGo", "IndiGo"),
+])
+def test_parse_airline_splits_glued_names(text, expected):
+    assert parse_airline(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("$1,234", (1234, "USD")),
+    ("CA$ 500", (500, "CAD")),
+    ("A$500", (500, "AUD")),
+    ("US$500", (500, "USD")),
+    ("€89", (89, "EUR")),
+    ("LHR$500", (500, "USD")),
+    ("JFK €120", (120, "EUR")),
+    ("no price", (None, "")),
+])
+def test_parse_price_currency_prefixes(text, expected):
+    assert parse_price(text) == expected
@@ -0,0 +1,28 @@
+import numpy as np
+
+from ranking import pareto_frontier
+
+
+def brute_force(price, duration, stops):
+    rows = list(zip(price, duration, stops))
+    return [
+        i for i, a in enumerate(rows)
+        if not any(all(x <= y for x, y in zip(b, a)) and b != a for b in rows)
+    ]
+
+
+def test_duplicate_tuples_are_all_kept():
+    price = np.array([100.0, 100.0, 120.0, 100.0])
+    duration = np.array([300.0, 300.0, 200.0, 400.0])
+    stops = np.array([1, 1, 0, 1])
+    assert pareto_frontier(price, duration, stops).tolist() == [0, 1, 2]
+
+
+def test_matches_brute_force_with_ties():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n = int(rng.integers(1, 30))
+        price = rng.integers(0, 5, n).astype(float)
+        duration = rng.integers(0, 5, n).astype(float)
+        stops = rng.integers(0, 3, n)
+        assert pareto_frontier(price, duration, stops).tolist() == brute_force(price, duration, stops)
@@ -0,0 +1,72 @@
+import pytest
+
+from scrape_queue import ScrapeQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return ScrapeQueue(str(tmp_path / "queue.db"), max_attempts=2)
+
+
+def enqueue(queue):
+    return queue.enqueue("JFK", "LAX", "Dec 2026")
+
+
+def test_expired_lease_is_reclaimed(queue):
+    job_id = enqueue(queue)
+    assert queue.claim("w1", lease=-1)["id"] == job_id
+    reclaimed = queue.claim("w2", lease=60)
+    assert reclaimed["id"] == job_id and reclaimed["worker"] == "w1"
+    job = queue.get(job_id)
+    assert (job["status"], job["worker"], job["attempts"]) == ("leased", "w2", 2)
+    # The first worker lost the job and cannot heartbeat or finish it any more
+    assert not queue.heartbeat(job_id, "w1", 60)
+    assert not queue.complete(job_id, "w1", {"flights": []})
+    assert queue.complete(job_id, "w2", {"flights": []})
+    assert queue.get(job_id)["status"] == "done"
+
+
+def test_expired_lease_out_of_attempts_fails(queue):
+    job_id = enqueue(queue)
+    queue.claim("w1", lease=-1)
+    queue.claim("w2", lease=-1)
+    assert queue.claim("w3", lease=60) is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert "out of attempts" in job["error"]
+
+
+def test_failed_attempts_requeue_until_exhausted(queue):
+    job_id = enqueue(queue)
+    queue.claim("w1", lease=60)
+    assert queue.fail(job_id, "w1", "boom")
+    assert queue.get(job_id)["status"] == "queued"
+    queue.claim("w1", lease=60)
+    assert queue.fail(job_id, "w1", "boom again")
+    job = queue.get(job_id)
+    assert (job["status"], job["error"]) == ("failed", "boom again")
+
+
+def test_cancelled_once_no_waiter_is_left(queue):
+    job_id = enqueue(queue)
+    assert enqueue(queue) == job_id  # a second caller shares the pending job
+    queue.claim("w1", lease=60)
+    assert not queue.cancel(job_id)
+    assert queue.heartbeat(job_id, "w1", 60)
+    assert queue.cancel(job_id)
+    assert queue.get(job_id)["status"] == "cancelled"
+    # The worker learns at its next heartbeat and cannot write a result
+    assert not queue.heartbeat(job_id, "w1", 60)
+    assert not queue.complete(job_id, "w1", {"flights": []})
+    assert queue.claim("w2", lease=-1) is None
+    assert queue.stats()["cancelled"] == 1
+
+
+def test_release_does_not_use_an_attempt(queue):
+    job_id = enqueue(queue)
+    queue.claim("w1", lease=60)
+    assert queue.release(job_id, "w1")
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["worker"]) == ("queued", 0, None)
+    assert queue.claim("w2", lease=60)["attempts"] == 0
+    assert queue.get(job_id)["attempts"] == 1
@@ -0,0 +1,350 @@
+import asyncio
+import heapq
+import inspect
+import ipaddress
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from metrics import Counter
+
+log = logging.getLogger("autoflights.watches")
+
+# Comma-separated webhook hosts allowed even on private addresses; when set, no other host is accepted
+WEBHOOK_ALLOWLIST = {h.strip().lower() for h in os.getenv("WATCH_WEBHOOK_ALLOWLIST", "").split(",") if h.strip()}
+
+WATCH_CHECKS = Counter("autoflights_watch_checks_total", "Background watch checks by outcome.", ["outcome"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watches (
+    id TEXT PRIMARY KEY,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    month TEXT NOT NULL,
+    webhook TEXT,
+    interval REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_checked REAL,
+    last_changed REAL,
+    checks INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0,
+    snapshot TEXT
+);
+"""
+
+
+def flight_key(flight: Dict) -> str:
+    """Identity of an itinerary across scrapes, independent of its price."""
+    return " | ".join(str(flight.get(k, "")) for k in ("airline", "departure", "arrival", "stops"))
+
+
+def diff_snapshots(old: Optional[Dict[str, int]], new: Dict[str, int]) -> Optional[Dict]:
+    """
+    Compare two {itinerary: price} snapshots. Returns None when nothing
+    changed (or there was no previous snapshot to compare against).
+    """
+    if old is None:
+        return None
+    added = sorted(k for k in new if k not in old)
+    removed = sorted(k for k in old if k not in new)
+    changed = [{"flight": k, "old": old[k], "new": new[k]} for k in sorted(new) if k in old and old[k] != new[k]]
+    old_min, new_min = min(old.values(), default=None), min(new.values(), default=None)
+    if not (added or removed or changed or old_min != new_min):
+        return None
+    return {
+        "min_price": {"old": old_min, "new": new_min},
+        "added": [{"flight": k, "price": new[k]} for k in added],
+        "removed": [{"flight": k, "price": old[k]} for k in removed],
+        "changed": changed,
+    }
+
+
+@dataclass
+class Watch:
+    """One watched route/month and its adaptive polling state."""
+    id: str
+    origin: str
+    destination: str
+    month: str
+    interval: float
+    webhook: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    last_checked: Optional[float] = None
+    last_changed: Optional[float] = None
+    checks: int = 0
+    changes: int = 0
+    snapshot: Optional[Dict[str, int]] = field(default=None, repr=False)
+    next_run: float = 0.0
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data.pop("snapshot")
+        data["watch_id"] = data.pop("id")
+        data["min_price"] = min(self.snapshot.values(), default=None) if self.snapshot else None
+        return data
+
+
+class WatchStore:
+    """Watches persisted next to the price history, so they survive restarts."""
+
+    COLUMNS = ["id", "origin", "destination", "month", "webhook", "interval", "created_at",
+               "last_checked", "last_changed", "checks", "changes", "snapshot"]
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("AUTOFLIGHTS_DB", "autoflights.db")
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def load(self) -> List[Watch]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM watches").fetchall()
+        watches = []
+        for r in rows:
+            data = dict(r)
+            data["snapshot"] = json.loads(data["snapshot"]) if data["snapshot"] else None
+            watches.append(Watch(**data))
+        return watches
+
+    def save(self, watch: Watch):
+        values = [getattr(watch, c) for c in self.COLUMNS]
+        values[-1] = json.dumps(watch.snapshot) if watch.snapshot is not None else None
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO watches ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                values,
+            )
+
+    def delete(self, watch_id: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM watches WHERE id = ?", (watch_id,))
+
+
+class _Budget:
+    """Token bucket capping how many watch scrapes start per hour."""
+
+    def __init__(self, per_hour: float):
+        self.rate = per_hour / 3600.0
+        self.capacity = max(1.0, per_hour / 12)  # at most five minutes' worth in a burst
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+ChangeCallback = Callable[[Watch, Dict], Any]
+
+
+class WatchScheduler:
+    """
+    Polls watched routes in the background and reports price changes.
+
+    Each watch has its own interval: halved (down to `min_interval`) after a
+    check that found changes, stretched by half (up to `max_interval`) after
+    one that did not. Due times carry random jitter, new and restored watches
+    start at a random point in their first interval, a token bucket caps
+    scrapes per hour across all watches and at most `concurrency` checks run
+    at once, so many watches never stampede the browser pool.
+    """
+
+    def __init__(
+        self,
+        scrape: Callable[[str, str, str], Awaitable[Dict]],
+        store: Optional[WatchStore] = None,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        budget_per_hour: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        jitter: float = 0.1,
+    ):
+        self.scrape = scrape
+        self.store = store or WatchStore()
+        self.min_interval = min_interval or float(os.getenv("WATCH_MIN_INTERVAL", "900"))
+        self.max_interval = max_interval or float(os.getenv("WATCH_MAX_INTERVAL", "21600"))
+        self.budget = _Budget(budget_per_hour or float(os.getenv("WATCH_SCRAPES_PER_HOUR", "60")))
+        self.concurrency = concurrency or int(os.getenv("WATCH_CONCURRENCY", "1"))
+        self.jitter = jitter
+        self.callbacks: List[ChangeCallback] = []
+        self._watches: Dict[str, Watch] = {}
+        self._due: List = []  # heap of (next_run, watch_id)
+        self._wake = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._loop: Optional[asyncio.Task] = None
+        self._running: set = set()
+
+    async def start(self):
+        for watch in await asyncio.to_thread(self.store.load):
+            self._schedule(watch, first=True)
+        self._loop = asyncio.create_task(self._run())
+        log.info(f"Watch scheduler started with {len(self._watches)} watch(es).")
+
+    async def stop(self):
+        tasks = [t for t in (self._loop, *self._running) if t]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop = None
+
+    def on_change(self, callback: ChangeCallback):
+        """Register `callback(watch, diff)` (sync or async) for every detected change."""
+        self.callbacks.append(callback)
+
+    async def add(self, origin: str, destination: str, month: str, webhook: Optional[str] = None) -> Watch:
+        watch = Watch(id=uuid.uuid4().hex, origin=origin, destination=destination, month=month,
+                      interval=self.min_interval, webhook=webhook)
+        await asyncio.to_thread(self.store.save, watch)
+        self._schedule(watch, first=True)
+        return watch
+
+    async def remove(self, watch_id: str) -> bool:
+        if self._watches.pop(watch_id, None) is None:
+            return False
+        # Its heap entry is skipped lazily when it comes due
+        await asyncio.to_thread(self.store.delete, watch_id)
+        return True
+
+    def get(self, watch_id: str) -> Optional[Watch]:
+        return self._watches.get(watch_id)
+
+    def list(self) -> List[Watch]:
+        return sorted(self._watches.values(), key=lambda w: w.created_at)
+
+    def _schedule(self, watch: Watch, first: bool = False):
+        if first:
+            # Spread new and restored watches over their first interval
+            delay = random.uniform(0, min(watch.interval, self.min_interval))
+        else:
+            delay = watch.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        watch.next_run = time.time() + delay
+        self._watches[watch.id] = watch
+        heapq.heappush(self._due, (watch.next_run, watch.id))
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            if not self._due:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            next_run, watch_id = self._due[0]
+            watch = self._watches.get(watch_id)
+            if watch is None or watch.next_run != next_run:
+                heapq.heappop(self._due)  # removed or rescheduled
+                continue
+            delay = next_run - time.time()
+            if delay > 0:
+                # Sleep until due, or until an earlier watch is added
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._due)
+            await self.budget.acquire()
+            await self._slots.acquire()
+            task = asyncio.create_task(self._check(watch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _check(self, watch: Watch):
+        try:
+            scraped = await self.scrape(watch.origin, watch.destination, watch.month)
+            snapshot = {flight_key(f): f["price_number"] for f in scraped["flights"]}
+            diff = diff_snapshots(watch.snapshot, snapshot) if snapshot else None
+            watch.checks += 1
+            watch.last_checked = time.time()
+            if snapshot:
+                watch.snapshot = snapshot
+            if diff:
+                watch.changes += 1
+                watch.last_changed = watch.last_checked
+                watch.interval = max(self.min_interval, watch.interval / 2)
+                WATCH_CHECKS.inc(outcome="changed")
+                await self._notify(watch, diff)
+            else:
+                watch.interval = min(self.max_interval, watch.interval * 1.5)
+                WATCH_CHECKS.inc(outcome="unchanged" if snapshot else "no_results")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            WATCH_CHECKS.inc(outcome="error")
+            log.warning(f"Watch {watch.id} ({watch.origin} -> {watch.destination}) failed: {e}")
+        finally:
+            self._slots.release()
+        if watch.id in self._watches:
+            await asyncio.to_thread(self.store.save, watch)
+            self._schedule(watch)
+
+    async def _notify(self, watch: Watch, diff: Dict):
+        log.info(f"Price change on {watch.origin} -> {watch.destination} ({watch.month}).",
+                 extra={"fields": {"watch_id": watch.id, "min_price": diff["min_price"]}})
+        for callback in self.callbacks:
+            try:
+                result = callback(watch, diff)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                log.warning(f"Watch callback failed: {e}")
+        if watch.webhook:
+            await post_webhook(watch.webhook, {"watch": watch.to_dict(), "diff": diff})
+
+
+async def check_webhook(url: str):
+    """
+    Raise ValueError unless `url` is an http(s) URL whose host is on
+    WATCH_WEBHOOK_ALLOWLIST or, with no allowlist, resolves only to public
+    addresses (no loopback, private, link-local, reserved or multicast).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("Webhook must be an http(s) URL.")
+    host = parts.hostname.lower()
+    if WEBHOOK_ALLOWLIST:
+        if host not in WEBHOOK_ALLOWLIST:
+            raise ValueError(f"Webhook host {host} is not on WATCH_WEBHOOK_ALLOWLIST.")
+        return
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None)
+    except OSError as e:
+        raise ValueError(f"Webhook host {host} does not resolve: {e}")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        address = getattr(address, "ipv4_mapped", None) or address
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"Webhook host {host} resolves to a non-public address ({address}).")
+
+
+async def post_webhook(url: str, payload: Dict, timeout: float = 10.0):
+    """POST a change notification; failures are logged, never raised."""
+    try:
+        # Re-checked on every delivery: DNS may have changed since the watch was created
+        await check_webhook(url)
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.post(url, json=payload)
+            response.raise_for_status()
+    except Exception as e:
+        log.warning(f"Webhook {url} failed: {e}")
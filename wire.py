@@ -0,0 +1,163 @@
+import asyncio
+import base64
+import gzip
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import orjson
+import ormsgpack
+import zstandard
+from fastapi import Request
+from fastapi.responses import Response
+
+from metrics import Counter
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+NDJSON = "application/x-ndjson"
+_MSGPACK_TYPES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+
+# Smaller bodies go out uncompressed: the header overhead outweighs the saving
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+# Bodies above this are compressed in a worker thread, off the event loop
+OFFLOAD_BYTES = 256 * 1024
+
+# Keys of a flight row (Flight.to_dict), the only names `fields=` accepts
+FLIGHT_FIELDS = (
+    "airline", "price", "price_number", "duration", "stops", "departure", "arrival", "currency",
+    "duration_minutes", "stop_count", "stop_airports", "departure_offset", "arrival_offset",
+)
+
+RESPONSE_BYTES = Counter(
+    "autoflights_response_bytes_total", "Negotiated response body bytes by format and content coding.",
+    ["format", "encoding"],
+)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """'airline, price' -> ('airline', 'price'); None keeps every field. Raises ValueError on unknown names."""
+    if not fields:
+        return None
+    names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in names if f not in FLIGHT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown flight field(s): {', '.join(unknown)}. Choose from {', '.join(FLIGHT_FIELDS)}.")
+    return names or None
+
+
+def project(rows: Iterable[Dict], fields: Optional[Sequence[str]]) -> List[Dict]:
+    if fields is None:
+        return list(rows)
+    return [{f: row[f] for f in fields if f in row} for row in rows]
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Offset behind an opaque cursor from encode_cursor; raises ValueError on anything else."""
+    if not cursor:
+        return 0
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        tag, offset = text.split(":", 1)
+        if tag == "o" and int(offset) >= 0:
+            return int(offset)
+    except (ValueError, UnicodeDecodeError):
+        pass
+    raise ValueError("Invalid cursor.")
+
+
+def shape_result(
+    result: Dict,
+    fields: Optional[Sequence[str]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    paged: bool = True,
+) -> Dict:
+    """
+    Apply a `fields` projection and limit/cursor paging to the flights of a
+    scrape result. `table_flights` (the top three of `flights`) only comes
+    with the first page. Paged results carry `total_flights` and a
+    `next_cursor`, null on the last page. With `paged=False` (routes that
+    take no cursor) `limit` only truncates, and just `total_flights` is added.
+    """
+    if not isinstance(result.get("flights"), list) or (fields is None and limit is None and not cursor):
+        return result
+    flights = result["flights"]
+    start = decode_cursor(cursor)
+    end = len(flights) if limit is None else start + limit
+    shaped = {**result, "flights": project(flights[start:end], fields)}
+    if "table_flights" in result:
+        if start:
+            del shaped["table_flights"]
+        else:
+            shaped["table_flights"] = project(result["table_flights"], fields)
+    if limit is not None or cursor:
+        shaped["total_flights"] = len(flights)
+        if paged:
+            shaped["next_cursor"] = encode_cursor(end) if end < len(flights) else None
+    return shaped
+
+
+def _preferred(header: Optional[str], options: Sequence[str], default: str) -> str:
+    """The option with the highest q-value in an Accept-style header; ties go to the earlier option."""
+    best, best_q = default, 0.0
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name in ("*", "*/*"):
+            name = default
+        if name in options and (q > best_q or q == best_q > 0 and options.index(name) < options.index(best)):
+            best, best_q = name, q
+    return best
+
+
+def wants_msgpack(request: Request) -> bool:
+    return _preferred(request.headers.get("accept"), (*_MSGPACK_TYPES, JSON), JSON) != JSON
+
+
+def dumps(payload, msgpack: bool = False) -> bytes:
+    if msgpack:
+        return ormsgpack.packb(payload, option=ormsgpack.OPT_NON_STR_KEYS)
+    return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "zstd":
+        # A compressor per call: they are not thread-safe and this may run in a worker thread
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if coding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+async def negotiate(request: Request, payload, status_code: int = 200) -> Response:
+    """
+    Encode `payload` as the client asked: MessagePack when Accept prefers
+    it, else orjson-encoded JSON; zstd or gzip when Accept-Encoding allows.
+    Large bodies are compressed in a worker thread to keep the event loop free.
+    """
+    msgpack = wants_msgpack(request)
+    body = dumps(payload, msgpack)
+    coding = _preferred(request.headers.get("accept-encoding"), ("zstd", "gzip", "identity"), "identity")
+    if len(body) < COMPRESS_MIN_BYTES:
+        coding = "identity"
+    if coding != "identity":
+        body = await asyncio.to_thread(compress, body, coding) if len(body) > OFFLOAD_BYTES else compress(body, coding)
+    RESPONSE_BYTES.inc(len(body), format="msgpack" if msgpack else "json", encoding=coding)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    return Response(content=body, status_code=status_code, media_type=MSGPACK if msgpack else JSON, headers=headers)
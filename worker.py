@@ -0,0 +1,162 @@
+"""
+Scrape worker fleet fed by the durable queue in scrape_queue.py.
+
+    python worker.py [--workers N] [--lease 60] [--poll 1]
+
+Starts N worker processes (default: WORKER_PROCESSES or the CPU count).
+Each one owns a one-browser pool, claims jobs from the queue, heartbeats
+its lease while scraping and writes results back for the API to read.
+Crashed workers are restarted; their jobs are retried once the lease runs
+out. Run it on as many hosts as share the queue database.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from browser_pool import BrowserPool
+from googleflights_auto import scrape_flights
+from logs import configure_logging
+from scrape_queue import ScrapeQueue
+
+log = logging.getLogger("autoflights.worker")
+
+# Block heavy assets and scroll adaptively unless SCRAPE_FAST_MODE=0
+FAST_MODE = os.getenv("SCRAPE_FAST_MODE", "1").lower() not in ("0", "false", "no")
+# Finished jobs are kept this long so the API can read their results
+RETENTION = float(os.getenv("SCRAPE_QUEUE_RETENTION", "86400"))
+
+
+async def work(index: int, lease: float, poll: float, stopping: asyncio.Event):
+    """Claim and run jobs until `stopping` is set."""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    queue = ScrapeQueue()
+    # Chromium locks its profile, so every worker process gets its own subtree
+    profile_dir = os.getenv("BROWSER_PROFILE_DIR")
+    pool = BrowserPool(size=1, profile_dir=os.path.join(profile_dir, f"process-{index}") if profile_dir else None)
+    await pool.start()
+    log.info(f"Worker {worker_id} ready.")
+    last_prune = 0.0
+    try:
+        while not stopping.is_set():
+            if time.monotonic() - last_prune > 3600:
+                last_prune = time.monotonic()
+                await asyncio.to_thread(queue.prune, RETENTION)
+            job = await asyncio.to_thread(queue.claim, worker_id, lease)
+            if job is None:
+                try:
+                    await asyncio.wait_for(stopping.wait(), timeout=poll)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await run_job(queue, pool, worker_id, job, lease, stopping)
+    finally:
+        await pool.stop()
+
+
+async def run_job(queue: ScrapeQueue, pool: BrowserPool, worker_id: str, job: dict, lease: float, stopping: asyncio.Event):
+    """Scrape one claimed job while a heartbeat keeps its lease alive."""
+    log.info(f"Job {job['id']}: {job['origin']} -> {job['destination']} ({job['month']}), attempt {job['attempts'] + 1}.")
+
+    async def scrape():
+        async with pool.context() as context:
+            return await scrape_flights(job["origin"], job["destination"], job["month"], context=context, fast=FAST_MODE)
+
+    task = asyncio.create_task(scrape())
+    stop = asyncio.create_task(stopping.wait())
+    try:
+        while not task.done():
+            await asyncio.wait({task, stop}, timeout=lease / 3, return_when=asyncio.FIRST_COMPLETED)
+            if stop.done() and not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await asyncio.to_thread(queue.release, job["id"], worker_id)
+                log.info(f"Job {job['id']} handed back on shutdown.")
+                return
+            if not task.done() and not await asyncio.to_thread(queue.heartbeat, job["id"], worker_id, lease):
+                log.warning(f"Job {job['id']} was cancelled or lost its lease; abandoning it.")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return
+        flights, table, timings = task.result()
+    except Exception as e:
+        log.warning(f"Job {job['id']} failed: {e}")
+        await asyncio.to_thread(queue.fail, job["id"], worker_id, str(e))
+        return
+    finally:
+        stop.cancel()
+    result = {"flights": flights, "table": table, "timings": timings}
+    if not await asyncio.to_thread(queue.complete, job["id"], worker_id, result):
+        log.warning(f"Job {job['id']} finished after its lease was taken over; result dropped.")
+
+
+def run_process(index: int, lease: float, poll: float):
+    """Entry point of one worker process."""
+    configure_logging()
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+    async def main():
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, stopping.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        await work(index, lease, poll, stopping)
+
+    asyncio.run(main())
+
+
+def supervise(workers: int, lease: float, poll: float):
+    """Keep `workers` processes running until SIGTERM/SIGINT, restarting any that die."""
+    ctx = multiprocessing.get_context("spawn")
+    procs = {}
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while not stopping:
+        for i in range(workers):
+            proc = procs.get(i)
+            if proc is None or not proc.is_alive():
+                if proc is not None:
+                    log.warning(f"Worker process {i} exited with code {proc.exitcode}; restarting.")
+                procs[i] = ctx.Process(target=run_process, args=(i, lease, poll), name=f"scrape-worker-{i}")
+                procs[i].start()
+        time.sleep(1)
+    log.info("Stopping workers...")
+    for proc in procs.values():
+        if proc.is_alive():
+            proc.terminate()
+    for proc in procs.values():
+        proc.join(timeout=lease)
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKER_PROCESSES", "0")) or os.cpu_count() or 1)
+    parser.add_argument("--lease", type=float, default=float(os.getenv("WORKER_LEASE_SECONDS", "60")),
+                        help="seconds a claim stays valid without a heartbeat")
+    parser.add_argument("--poll", type=float, default=float(os.getenv("WORKER_POLL_INTERVAL", "1")),
+                        help="seconds between queue checks when idle")
+    args = parser.parse_args()
+    configure_logging()
+    supervise(args.workers, args.lease, args.poll)
+
+
+if __name__ == "__main__":
+    main()